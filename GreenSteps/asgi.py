@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "GreenSteps.settings")
+# Read by the settings: persistent database connections are turned off under ASGI
+os.environ.setdefault("GREENSTEPS_SERVER", "asgi")
 
 application = get_asgi_application()
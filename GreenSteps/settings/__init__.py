@@ -0,0 +1,16 @@
+"""
+GREENSTEPS_ENV selects the settings module: 'dev' (the default) for local
+work and tests, 'prod' for deployments.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+GREENSTEPS_ENV = os.environ.get('GREENSTEPS_ENV', 'dev')
+
+if GREENSTEPS_ENV == 'prod':
+    from .prod import *  # noqa: F401,F403
+elif GREENSTEPS_ENV == 'dev':
+    from .dev import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured("GREENSTEPS_ENV must be 'dev' or 'prod'")
@@ -0,0 +1,231 @@
+"""
+Settings shared by every environment. dev.py and prod.py build on these;
+GreenSteps/settings/__init__.py picks one through GREENSTEPS_ENV.
+"""
+from pathlib import Path
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+SECRET_KEY = 'django-insecure-your-secret-key-change-in-production'
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['localhost', '127.0.0.1']
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'tracker',
+]
+
+# Opt-in request instrumentation (tracker.perf): per-view query count, DB and
+# template time and latency, shown to staff at /perf/stats/. Requests over
+# the query budget log a warning; GREENSTEPS_PERF_LOG names a JSON-lines file
+# that manage.py perf_report summarises.
+GREENSTEPS_PERF = os.environ.get('GREENSTEPS_PERF', '') == '1'
+GREENSTEPS_PERF_BUFFER_SIZE = 1000
+GREENSTEPS_PERF_QUERY_BUDGET = 20
+GREENSTEPS_PERF_LOG = os.environ.get('GREENSTEPS_PERF_LOG')
+
+MIDDLEWARE = [
+    'tracker.perf.PerformanceMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'GreenSteps.urls'
+
+TEMPLATES = [
+    {
+        # The timed backend only adds render time to tracker.perf records
+        'BACKEND': (
+            'tracker.perf.TimedDjangoTemplates' if GREENSTEPS_PERF
+            else 'django.template.backends.django.DjangoTemplates'
+        ),
+        'DIRS': [BASE_DIR / 'templates'],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'GreenSteps.wsgi.application'
+ASGI_APPLICATION = 'GreenSteps.asgi.application'
+
+# Serve home, dashboard, the activities list and the weekly data API from
+# tracker.async_views. Only worth it under an ASGI server (uvicorn, daphne);
+# under WSGI each async view pays for its own event loop.
+GREENSTEPS_ASYNC_VIEWS = os.environ.get('GREENSTEPS_ASYNC_VIEWS', '') == '1'
+
+# The kind of server loading these settings, 'wsgi' or 'asgi'
+SERVERS = ('wsgi', 'asgi')
+GREENSTEPS_SERVER = os.environ.get('GREENSTEPS_SERVER', 'wsgi')
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    }
+}
+
+# SQLite connection profiles, picked with GREENSTEPS_DB_PROFILE.
+# 'tuned' is for serving concurrent users: WAL lets readers run alongside the
+# writer, synchronous=NORMAL is durable in WAL mode while fsyncing less,
+# IMMEDIATE transactions take the write lock up front (so concurrent writers
+# queue on the busy timeout instead of failing with "database is locked"),
+# and connections are kept open across requests.
+#
+# Persistent connections only work under WSGI. Under ASGI every request runs
+# its ORM calls on a different thread, so each one would leave a connection
+# open that is never reused; GREENSTEPS_SERVER (set by GreenSteps/asgi.py and
+# GreenSteps/wsgi.py, or by hand for manage.py) turns CONN_MAX_AGE off there.
+# GREENSTEPS_CONN_MAX_AGE overrides the profile's value under WSGI.
+GREENSTEPS_DB_PROFILES = {
+    'default': {},
+    'tuned': {
+        'OPTIONS': {
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=134217728;'
+                'PRAGMA cache_size=-20000;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+            'transaction_mode': 'IMMEDIATE',
+            # Busy timeout in seconds
+            'timeout': 20,
+        },
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    },
+}
+
+
+def database_settings(profile, server='wsgi'):
+    """DATABASES with the named GREENSTEPS_DB_PROFILES entry applied"""
+    if profile not in GREENSTEPS_DB_PROFILES:
+        raise ImproperlyConfigured(
+            f'GREENSTEPS_DB_PROFILE must be one of {", ".join(GREENSTEPS_DB_PROFILES)}'
+        )
+    if server not in SERVERS:
+        raise ImproperlyConfigured(f'GREENSTEPS_SERVER must be one of {", ".join(SERVERS)}')
+    database = {**DATABASES['default'], **GREENSTEPS_DB_PROFILES[profile]}
+    if server == 'asgi':
+        database['CONN_MAX_AGE'] = 0
+    elif os.environ.get('GREENSTEPS_CONN_MAX_AGE'):
+        database['CONN_MAX_AGE'] = int(os.environ['GREENSTEPS_CONN_MAX_AGE'])
+    return {'default': database}
+
+
+GREENSTEPS_DB_PROFILE = os.environ.get('GREENSTEPS_DB_PROFILE', 'default')
+DATABASES = database_settings(GREENSTEPS_DB_PROFILE, GREENSTEPS_SERVER)
+
+# Version stamps, the factor catalogue stamp and per-user page caches live in
+# the default cache. Local memory suits development and tests; deployments
+# running several worker processes need a shared backend so stamp bumps reach
+# every process: GREENSTEPS_CACHE=db (run createcachetable first) or
+# GREENSTEPS_CACHE=file (GREENSTEPS_CACHE_LOCATION is the directory).
+#
+# Stamps must not be evicted: a culled stamp comes back as a new value, so
+# nothing stale is served, but every page built from it is rebuilt and a
+# culled catalogue stamp reloads the factor catalogue in every process.
+# Django's default MAX_ENTRIES of 300 is reached with about a hundred active
+# users, so the shared backends are sized well above the expected number of
+# entries (a few per active user plus sessions). The database backend drops
+# expired page entries before anything else; the file backend culls at random
+# and lists its whole directory on every set, so it only suits small sites.
+GREENSTEPS_CACHE_MAX_ENTRIES = int(os.environ.get('GREENSTEPS_CACHE_MAX_ENTRIES', 100000))
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'greensteps',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('GREENSTEPS_CACHE_LOCATION', BASE_DIR / '.cache'),
+        'OPTIONS': {'MAX_ENTRIES': GREENSTEPS_CACHE_MAX_ENTRIES},
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'greensteps_cache',
+        'OPTIONS': {'MAX_ENTRIES': GREENSTEPS_CACHE_MAX_ENTRIES},
+    },
+}
+
+def cache_settings(backend):
+    if backend not in CACHE_BACKENDS:
+        raise ImproperlyConfigured(f'GREENSTEPS_CACHE must be one of {", ".join(CACHE_BACKENDS)}')
+    return {'default': CACHE_BACKENDS[backend]}
+
+
+GREENSTEPS_CACHE = os.environ.get('GREENSTEPS_CACHE', 'locmem')
+CACHES = cache_settings(GREENSTEPS_CACHE)
+
+# Upper bound (seconds) on how long superseded per-user page data is kept
+GREENSTEPS_PAGE_CACHE_TIMEOUT = 60 * 60
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+LANGUAGE_CODE = 'en-us'
+TIME_ZONE = 'UTC'
+USE_I18N = True
+USE_TZ = True
+
+STATIC_URL = '/static/'
+STATICFILES_DIRS = [
+    BASE_DIR / 'static',
+]
+
+# Serve collected files from STATIC_ROOT through tracker.assets.serve, which
+# picks the precompressed copy and sends far-future cache headers. Leave off
+# when a front-end server handles STATIC_URL.
+GREENSTEPS_SERVE_STATIC = os.environ.get('GREENSTEPS_SERVE_STATIC', '') == '1'
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# How stored activity CO2 snapshots react to an EmissionFactor edit:
+# 'all' re-prices existing activities, 'none' only affects new ones.
+GREENSTEPS_FACTOR_REPRICING = 'all'
+
+# Background jobs (tracker.jobs) are run by manage.py run_worker. Inline jobs
+# run in the process that queued them as soon as its transaction commits.
+GREENSTEPS_JOBS_INLINE = os.environ.get('GREENSTEPS_JOBS_INLINE', '') == '1'
+# Seconds without a progress report before a running job counts as abandoned
+GREENSTEPS_JOB_TIMEOUT = 60 * 60
+
+# Uploaded import files wait here until a worker processes them
+MEDIA_ROOT = os.environ.get('GREENSTEPS_MEDIA_ROOT', BASE_DIR / 'media')
+
+LOGIN_REDIRECT_URL = '/'
+LOGOUT_REDIRECT_URL = '/'
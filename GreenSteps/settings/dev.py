@@ -0,0 +1,8 @@
+import os
+
+from .base import *  # noqa: F401,F403
+
+DEBUG = True
+
+# No worker needed while developing: jobs run when the request commits
+GREENSTEPS_JOBS_INLINE = os.environ.get('GREENSTEPS_JOBS_INLINE', '1') == '1'
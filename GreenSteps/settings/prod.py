@@ -0,0 +1,76 @@
+"""
+Production settings: no debug, cached templates, compressed and
+conditional responses and persistent database connections. Every default
+here can still be overridden through the same environment variables as in
+development; the tracker.checks system checks report anything left hostile to
+performance.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import (
+    BASE_DIR, GREENSTEPS_SERVER, MIDDLEWARE, TEMPLATES, cache_settings, database_settings,
+)
+
+DEBUG = False
+
+SECRET_KEY = os.environ.get('GREENSTEPS_SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('GREENSTEPS_SECRET_KEY must be set in production')
+
+ALLOWED_HOSTS = [
+    host.strip() for host in os.environ.get('GREENSTEPS_ALLOWED_HOSTS', '').split(',') if host.strip()
+]
+
+# WAL, busy timeout and, under WSGI, persistent connections (CONN_MAX_AGE) by default
+GREENSTEPS_DB_PROFILE = os.environ.get('GREENSTEPS_DB_PROFILE', 'tuned')
+DATABASES = database_settings(GREENSTEPS_DB_PROFILE, GREENSTEPS_SERVER)
+
+# Shared between worker processes so version stamp bumps reach all of them;
+# needs the table from manage.py createcachetable
+GREENSTEPS_CACHE = os.environ.get('GREENSTEPS_CACHE', 'db')
+CACHES = cache_settings(GREENSTEPS_CACHE)
+
+# cached_db reads sessions from the cache but writes them to the database as
+# well. With the database cache that saves no queries and doubles the writes,
+# so sessions only go through the cache when it is another backend.
+if GREENSTEPS_CACHE == 'db':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Compiled templates are kept for the life of the process
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+# GZip as early as possible so it sees the final body; ConditionalGet answers
+# If-None-Match / If-Modified-Since for any response carrying an ETag.
+MIDDLEWARE = list(MIDDLEWARE)
+MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+                  'django.middleware.gzip.GZipMiddleware')
+MIDDLEWARE.insert(MIDDLEWARE.index('django.contrib.sessions.middleware.SessionMiddleware') + 1,
+                  'django.middleware.http.ConditionalGetMiddleware')
+
+# collectstatic writes content-hashed, precompressed bundles here
+STATIC_ROOT = os.environ.get('GREENSTEPS_STATIC_ROOT', BASE_DIR / 'staticfiles')
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'tracker.assets.CompressedManifestStaticFilesStorage'},
+}
+GREENSTEPS_SERVE_STATIC = os.environ.get('GREENSTEPS_SERVE_STATIC', '1') == '1'
+
+SESSION_COOKIE_SECURE = os.environ.get('GREENSTEPS_INSECURE_COOKIES', '') != '1'
+CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
@@ -1,7 +1,11 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.contrib.staticfiles.urls import staticfiles_urlpatterns
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from tracker import assets
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -9,5 +13,9 @@ urlpatterns = [
     path('accounts/', include('django.contrib.auth.urls')),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0])
+if settings.GREENSTEPS_SERVE_STATIC:
+    urlpatterns += [
+        re_path(rf'^{re.escape(settings.STATIC_URL.lstrip("/"))}(?P<path>.*)$', assets.serve),
+    ]
+elif settings.DEBUG:
+    urlpatterns += staticfiles_urlpatterns()
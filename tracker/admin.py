@@ -1,5 +1,27 @@
-from django.contrib import admin
-from .models import EmissionFactor, Activity, UserProfile
+from django.contrib import admin, messages
+from django.utils import timezone
+from django.utils.html import format_html
+from . import exporters, jobs
+from .models import (
+    EmissionFactor, EmissionFactorVersion, RegionalFactor, Activity, UserProfile, DailyEmission, GoalMonth, GoalStreak, Job, LeaderboardCohort, Tip,
+)
+
+class EmissionFactorVersionInline(admin.TabularInline):
+    model = EmissionFactorVersion
+    extra = 0
+    fields = ['valid_from', 'valid_to', 'co2_per_unit', 'source']
+
+class RegionalFactorInline(admin.TabularInline):
+    model = RegionalFactor
+    extra = 0
+    fields = ['region', 'co2_per_unit', 'source']
+
+@admin.register(RegionalFactor)
+class RegionalFactorAdmin(admin.ModelAdmin):
+    list_display = ['region', 'factor', 'co2_per_unit', 'source']
+    list_filter = ['region', 'factor__category']
+    list_select_related = ['factor']
+    search_fields = ['region', 'factor__name']
 
 @admin.register(EmissionFactor)
 class EmissionFactorAdmin(admin.ModelAdmin):
@@ -7,21 +29,131 @@ class EmissionFactorAdmin(admin.ModelAdmin):
     list_filter = ['category']
     search_fields = ['name', 'description']
     ordering = ['category', 'name']
+    inlines = [EmissionFactorVersionInline, RegionalFactorInline]
+
+    actions = ['reprice_activities']
+
+    @admin.action(description='Re-price activities of selected factors (background job)')
+    def reprice_activities(self, request, queryset):
+        for factor in queryset:
+            jobs.enqueue('reprice_factor', {'factor_id': factor.pk}, key=jobs.key_for('reprice_factor', factor.pk))
+        self.message_user(request, f'Queued re-pricing for {queryset.count()} factors.', messages.SUCCESS)
 
 @admin.register(Activity)
 class ActivityAdmin(admin.ModelAdmin):
-    list_display = ['user', 'emission_factor', 'quantity', 'co2_emissions', 'date']
+    list_display = ['user', 'emission_factor', 'quantity', 'co2_display', 'date']
     list_filter = ['emission_factor__category', 'date', 'emission_factor']
+    list_select_related = ['user', 'emission_factor']
     search_fields = ['user__username', 'emission_factor__name', 'notes']
     date_hierarchy = 'date'
-    readonly_fields = ['co2_emissions', 'created_at']
+    readonly_fields = ['co2_display', 'created_at']
+
+    actions = ['export_csv', 'export_ndjson']
 
-    def co2_emissions(self, obj):
+    @admin.display(description='CO₂ Emissions', ordering='co2_emissions')
+    def co2_display(self, obj):
         return f"{obj.co2_emissions:.2f} kg"
-    co2_emissions.short_description = 'CO₂ Emissions'
+
+    @admin.action(description='Export selected activities as CSV')
+    def export_csv(self, request, queryset):
+        return exporters.export_response(queryset, 'csv', include_user=True)
+
+    @admin.action(description='Export selected activities as NDJSON')
+    def export_ndjson(self, request, queryset):
+        return exporters.export_response(queryset, 'ndjson', include_user=True)
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'daily_goal', 'location', 'created_at']
     search_fields = ['user__username', 'user__email', 'location']
     readonly_fields = ['created_at']
+
+    actions = ['rebuild_rollups']
+
+    @admin.action(description='Rebuild rollups and goals of selected users (background job)')
+    def rebuild_rollups(self, request, queryset):
+        user_ids = sorted(queryset.values_list('user_id', flat=True))
+        job = jobs.enqueue('rebuild_rollups', {'user_ids': user_ids}, key=jobs.key_for('rebuild_rollups', *user_ids))
+        self.message_user(request, f'Queued rollup rebuild as job {job.pk}.', messages.SUCCESS)
+
+@admin.register(DailyEmission)
+class DailyEmissionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'category', 'total_co2', 'activity_count']
+    list_filter = ['category', 'date']
+    search_fields = ['user__username']
+    date_hierarchy = 'date'
+    readonly_fields = ['user', 'date', 'category', 'total_co2', 'activity_count']
+
+@admin.register(GoalMonth)
+class GoalMonthAdmin(admin.ModelAdmin):
+    list_display = ['user', 'month', 'hit_days', 'tracked_days']
+    list_filter = ['month']
+    search_fields = ['user__username']
+    readonly_fields = ['user', 'month', 'tracked_days', 'hit_days']
+
+@admin.register(GoalStreak)
+class GoalStreakAdmin(admin.ModelAdmin):
+    list_display = ['user', 'length', 'start', 'end']
+    search_fields = ['user__username']
+    ordering = ['-length']
+    readonly_fields = ['user', 'start', 'end', 'length']
+
+@admin.register(LeaderboardCohort)
+class LeaderboardCohortAdmin(admin.ModelAdmin):
+    list_display = ['period', 'start', 'location', 'size', 'refreshed_at']
+    list_filter = ['period']
+    search_fields = ['location']
+    date_hierarchy = 'start'
+    readonly_fields = ['period', 'start', 'location', 'size', 'refreshed_at']
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'progress_display', 'attempts', 'user', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind']
+    list_select_related = ['user']
+    search_fields = ['key', 'user__username']
+    readonly_fields = [
+        'kind', 'key', 'payload', 'user', 'status', 'attempts', 'max_attempts', 'run_after',
+        'progress_display', 'message', 'result', 'error', 'worker',
+        'created_at', 'started_at', 'heartbeat_at', 'finished_at',
+    ]
+    exclude = ['progress_done', 'progress_total']
+
+    actions = ['retry_jobs', 'cancel_jobs']
+
+    @admin.display(description='Progress')
+    def progress_display(self, obj):
+        if obj.progress_total:
+            percent = min(100, round(100 * obj.progress_done / obj.progress_total))
+            return format_html(
+                '<progress value="{}" max="100"></progress> {}/{} {}',
+                percent, obj.progress_done, obj.progress_total, obj.message,
+            )
+        return f'{obj.progress_done} {obj.message}'.strip() if obj.progress_done or obj.message else '—'
+
+    @admin.action(description='Retry selected failed jobs')
+    def retry_jobs(self, request, queryset):
+        retried = 0
+        for job in queryset.filter(status=Job.FAILED):
+            jobs.enqueue(job.kind, job.payload, key=job.key, user=job.user, max_attempts=job.max_attempts)
+            retried += 1
+        self.message_user(request, f'Queued {retried} jobs again.', messages.SUCCESS)
+
+    @admin.action(description='Cancel selected queued jobs')
+    def cancel_jobs(self, request, queryset):
+        cancelled = queryset.filter(status=Job.QUEUED).update(
+            status=Job.FAILED, error='Cancelled from the admin', finished_at=timezone.now(),
+        )
+        self.message_user(request, f'Cancelled {cancelled} jobs.', messages.SUCCESS)
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(Tip)
+class TipAdmin(admin.ModelAdmin):
+    list_display = ['text', 'category', 'emission_factor', 'order', 'is_active']
+    list_filter = ['category', 'is_active']
+    list_editable = ['order', 'is_active']
+    list_select_related = ['emission_factor']
+    search_fields = ['text']
+    autocomplete_fields = ['emission_factor']
@@ -0,0 +1,194 @@
+"""
+Analytics computed from the DailyEmission rollup.
+
+Everything the dashboard shows for a user (the 7-day series, the 30-day
+category breakdown and the today/this-week totals) is derived from a single
+grouped query over the user's last 30 days of rollup buckets. timeseries()
+serves arbitrary ranges at day/week/month/year granularity the same way: one
+Trunc-grouped query, with empty buckets filled in Python.
+
+The a-prefixed variants run the same queries through the async ORM for the
+views in tracker.async_views.
+"""
+from datetime import date, timedelta
+
+from django.db.models import Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek, TruncYear
+
+from .models import DailyEmission, EmissionFactor
+
+CHART_DAYS = 7
+WEEK_DAYS = 7
+CATEGORY_WINDOW_DAYS = 30
+
+GRANULARITIES = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'year': TruncYear,
+}
+# Upper bound on buckets per series, e.g. ten years of days
+MAX_BUCKETS = 3660
+
+
+def _daily_category_rows(user, start, end=None):
+    buckets = DailyEmission.objects.filter(user=user, date__gte=start)
+    if end is not None:
+        buckets = buckets.filter(date__lte=end)
+    return buckets.order_by().values('date', 'category').annotate(total=Sum('total_co2'))
+
+
+def daily_category_totals(user, start, end=None):
+    """Return {(date, category): kg CO2} for the user's buckets from start"""
+    rows = _daily_category_rows(user, start, end)
+    return {(row['date'], row['category']): row['total'] or 0 for row in rows}
+
+
+async def adaily_category_totals(user, start, end=None):
+    rows = _daily_category_rows(user, start, end)
+    return {(row['date'], row['category']): row['total'] or 0 async for row in rows}
+
+
+def _dashboard_window_start(today):
+    return today - timedelta(days=max(CATEGORY_WINDOW_DAYS, WEEK_DAYS, CHART_DAYS - 1))
+
+
+def dashboard_summary(user, today=None):
+    """Weekly series, category breakdown and headline totals for the dashboard"""
+    if today is None:
+        today = date.today()
+    return _summarize(daily_category_totals(user, _dashboard_window_start(today)), today)
+
+
+async def adashboard_summary(user, today=None):
+    if today is None:
+        today = date.today()
+    return _summarize(await adaily_category_totals(user, _dashboard_window_start(today)), today)
+
+
+def _summarize(totals, today):
+    per_day = {}
+    per_category = {}
+    category_start = today - timedelta(days=CATEGORY_WINDOW_DAYS)
+    for (day, category), total in totals.items():
+        per_day[day] = per_day.get(day, 0) + total
+        if day >= category_start:
+            per_category[category] = per_category.get(category, 0) + total
+
+    weekly_data = []
+    for offset in range(CHART_DAYS - 1, -1, -1):
+        target_date = today - timedelta(days=offset)
+        weekly_data.append({
+            'date': target_date.strftime('%a'),
+            'iso_date': target_date.isoformat(),
+            'emissions': round(per_day.get(target_date, 0), 2),
+        })
+
+    category_data = []
+    for category, label in EmissionFactor.CATEGORY_CHOICES:
+        total = per_category.get(category, 0)
+        if total > 0:
+            category_data.append({
+                'category': category.title(),
+                'total': round(total, 2),
+            })
+
+    week_start = today - timedelta(days=WEEK_DAYS)
+    week_emissions = sum(total for day, total in per_day.items() if day >= week_start)
+
+    return {
+        'weekly_data': weekly_data,
+        'category_data': category_data,
+        'today_emissions': per_day.get(today, 0),
+        'week_emissions': week_emissions,
+    }
+
+
+def bucket_start(day, granularity):
+    """First day of the bucket containing day (weeks start on Monday)"""
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+
+def next_bucket(start, granularity):
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return (start + timedelta(days=32)).replace(day=1)
+    return start.replace(year=start.year + 1)
+
+
+def bucket_count(start, end, granularity):
+    start = bucket_start(start, granularity)
+    if granularity == 'day':
+        return (end - start).days + 1
+    if granularity == 'week':
+        return (end - start).days // 7 + 1
+    if granularity == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    return end.year - start.year + 1
+
+
+def _timeseries_rows(user, start, end, granularity, by_category):
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'granularity must be one of {", ".join(GRANULARITIES)}')
+    if start > end:
+        raise ValueError('start must not be after end')
+    if bucket_count(start, end, granularity) > MAX_BUCKETS:
+        raise ValueError(f'Range too large: at most {MAX_BUCKETS} buckets per series')
+
+    group_by = ['bucket', 'category'] if by_category else ['bucket']
+    return DailyEmission.objects.filter(
+        user=user, date__gte=start, date__lte=end
+    ).order_by().annotate(
+        bucket=GRANULARITIES[granularity]('date')
+    ).values(*group_by).annotate(total=Sum('total_co2'))
+
+
+def _fill_series(rows, start, end, granularity, by_category):
+    totals = {}
+    categories = {}
+    for row in rows:
+        totals[row['bucket']] = totals.get(row['bucket'], 0) + (row['total'] or 0)
+        if by_category:
+            categories.setdefault(row['bucket'], {})[row['category']] = row['total'] or 0
+
+    series = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        point = {
+            'start': current.isoformat(),
+            'total': round(totals.get(current, 0), 3),
+        }
+        if by_category:
+            point['categories'] = {
+                value: round(categories.get(current, {}).get(value, 0), 3)
+                for value, label in EmissionFactor.CATEGORY_CHOICES
+            }
+        series.append(point)
+        try:
+            current = next_bucket(current, granularity)
+        except (OverflowError, ValueError):
+            break  # the bucket ends at date.max
+    return series
+
+
+def timeseries(user, start, end, granularity='day', by_category=False):
+    """
+    Gap-filled CO2 totals for start..end (inclusive) in day/week/month/year
+    buckets, optionally split by category, from a single grouped query.
+    """
+    rows = _timeseries_rows(user, start, end, granularity, by_category)
+    return _fill_series(list(rows), start, end, granularity, by_category)
+
+
+async def atimeseries(user, start, end, granularity='day', by_category=False):
+    rows = _timeseries_rows(user, start, end, granularity, by_category)
+    return _fill_series([row async for row in rows], start, end, granularity, by_category)
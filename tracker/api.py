@@ -0,0 +1,272 @@
+"""
+Versioned JSON API (v1) for activities, summaries and the factor catalogue.
+
+Read endpoints answer conditional GETs through tracker.conditional, so a
+client polling unchanged data gets a 304 after a cache lookup without any
+query being run to build the payload. Summaries are set-based aggregates over
+the DailyEmission rollup.
+"""
+import json
+from datetime import date, timedelta
+from functools import wraps
+
+from django.db.models import Sum
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_http_methods
+
+from .analytics import GRANULARITIES, timeseries as build_timeseries
+from .catalogue import get_catalogue, region_for
+from .conditional import catalogue_condition, user_data_condition
+from .forms import ActivityForm
+from .goals import history as goal_history, status as goal_status
+from .leaderboard import DEFAULT_LIMIT as LEADERBOARD_LIMIT, leaderboard as build_leaderboard
+from .models import Activity, DailyEmission, Job
+from .pagination import paginate, page_size_from
+from .projections import parse_swaps, projection as build_projection
+from .regions import normalise_location
+from .views import filter_activities
+
+SUMMARY_PERIODS = ('daily', 'weekly', 'monthly')
+MAX_GOAL_HISTORY_DAYS = 3660
+
+
+def api_login_required(view):
+    """Like login_required, but answers 401 JSON instead of redirecting"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+    return request.POST
+
+
+@api_login_required
+@require_http_methods(['GET', 'POST'])
+def activities(request):
+    """GET a keyset page of activities, or POST a new one"""
+    if request.method == 'POST':
+        return _create_activity(request)
+    return _list_activities(request)
+
+
+@user_data_condition
+def _list_activities(request):
+    try:
+        activities, _ = filter_activities(request, Activity.objects.filter(user=request.user))
+        page, next_cursor = paginate(activities, request.GET.get('cursor'), page_size_from(request))
+    except ValueError as exc:
+        # InvalidCursor is a ValueError too
+        return JsonResponse({'error': str(exc)}, status=400)
+    get_catalogue().attach(page)
+    return JsonResponse({
+        'results': [activity.as_dict() for activity in page],
+        'next_cursor': next_cursor,
+    })
+
+
+def _create_activity(request):
+    data = _request_data(request)
+    if data is None:
+        return JsonResponse({'error': 'Request body is not valid JSON'}, status=400)
+    form = ActivityForm(data, region=region_for(request.user))
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+    activity = form.save(commit=False)
+    activity.user = request.user
+    activity.save()
+    return JsonResponse(activity.as_dict(), status=201)
+
+
+@api_login_required
+@require_http_methods(['GET', 'DELETE'])
+def activity_detail(request, activity_id):
+    """GET or DELETE one of the user's activities"""
+    activity = get_object_or_404(Activity, id=activity_id, user=request.user)
+    if request.method == 'DELETE':
+        activity.delete()
+        return HttpResponse(status=204)
+    get_catalogue().attach([activity])
+    return JsonResponse(activity.as_dict())
+
+
+def _period_window(period, today):
+    if period == 'daily':
+        return today, today
+    if period == 'weekly':
+        start = today - timedelta(days=today.weekday())
+        return start, start + timedelta(days=6)
+    start = today.replace(day=1)
+    next_month = (start + timedelta(days=32)).replace(day=1)
+    return start, next_month - timedelta(days=1)
+
+
+@api_login_required
+@require_http_methods(['GET'])
+@user_data_condition
+def summary(request):
+    """Totals for the current day, week (Mon-Sun) or month, by category"""
+    period = request.GET.get('period', 'daily')
+    if period not in SUMMARY_PERIODS:
+        return JsonResponse(
+            {'error': f'period must be one of {", ".join(SUMMARY_PERIODS)}'}, status=400
+        )
+
+    start, end = _period_window(period, date.today())
+    rows = DailyEmission.objects.filter(
+        user=request.user, date__gte=start, date__lte=end
+    ).order_by().values('category').annotate(
+        total=Sum('total_co2'), activities=Sum('activity_count')
+    )
+
+    by_category = {
+        row['category']: {'total': round(row['total'] or 0, 3), 'activities': row['activities']}
+        for row in rows
+    }
+    return JsonResponse({
+        'period': period,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'total': round(sum(item['total'] for item in by_category.values()), 3),
+        'activities': sum(item['activities'] for item in by_category.values()),
+        'by_category': by_category,
+    })
+
+
+@require_http_methods(['GET'])
+@catalogue_condition
+def factors(request):
+    """
+    The emission factor catalogue, grouped by category, with the values of
+    ?region= (a profile location) where it has its own
+    """
+    # The region comes from the URL rather than the user, so the catalogue
+    # ETag still holds and the response can be cached per region
+    catalogue = get_catalogue(normalise_location(request.GET.get('region')))
+    return JsonResponse({
+        'region': catalogue.region,
+        'categories': [
+            {
+                'category': value,
+                'label': label,
+                'factors': [
+                    {
+                        'id': factor.pk,
+                        'name': factor.name,
+                        'unit': factor.unit,
+                        'co2_per_unit': factor.co2_per_unit,
+                        'description': factor.description,
+                    }
+                    for factor in catalogue.by_category[value]
+                ],
+            }
+            for value, label in catalogue.category_choices
+        ],
+    })
+
+
+@api_login_required
+@require_http_methods(['GET'])
+@user_data_condition
+def timeseries(request):
+    """CO2 totals between start and end, bucketed by day, week, month or year"""
+    today = date.today()
+    granularity = request.GET.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return JsonResponse(
+            {'error': f'granularity must be one of {", ".join(GRANULARITIES)}'}, status=400
+        )
+
+    by_category = request.GET.get('by_category') in ('1', 'true', 'yes')
+
+    # parse_date() raises ValueError for well-formed dates that do not
+    # exist, such as 2025-02-30, and date arithmetic can overflow
+    try:
+        end = parse_date(request.GET.get('end', '')) if request.GET.get('end') else today
+        start = parse_date(request.GET.get('start', '')) if request.GET.get('start') else end - timedelta(days=6)
+        if start is None or end is None:
+            raise ValueError('start and end must be dates (YYYY-MM-DD)')
+        series = build_timeseries(request.user, start, end, granularity, by_category)
+    except (ValueError, OverflowError) as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    return JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': granularity,
+        'series': series,
+    })
+
+
+@api_login_required
+@require_http_methods(['GET'])
+@user_data_condition
+def projections(request):
+    """
+    Daily series with rolling averages, the year-end projection and the
+    effect of ?swap=from_id:to_id[:share] factor substitutions
+    """
+    try:
+        swaps = parse_swaps(request.GET.getlist('swap'))
+        result = build_projection(request.user, swaps)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(result)
+
+
+@api_login_required
+@require_http_methods(['GET'])
+@user_data_condition
+def goals(request):
+    """Daily goal status, streaks, badges and, with ?days=N, per-day goal history"""
+    today = date.today()
+    result = goal_status(request.user, today)
+    if request.GET.get('days'):
+        try:
+            days = int(request.GET['days'])
+        except ValueError:
+            days = 0
+        if not 1 <= days <= MAX_GOAL_HISTORY_DAYS:
+            return JsonResponse(
+                {'error': f'days must be between 1 and {MAX_GOAL_HISTORY_DAYS}'}, status=400
+            )
+        result['history'] = goal_history(request.user, today - timedelta(days=days - 1), today)
+    return JsonResponse(result)
+
+
+@api_login_required
+@require_http_methods(['GET'])
+def leaderboard(request):
+    """Latest weekly or monthly ranking: the user's rank and percentile plus the top N"""
+    try:
+        limit = int(request.GET.get('limit', LEADERBOARD_LIMIT))
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    try:
+        result = build_leaderboard(
+            request.user,
+            request.GET.get('period', 'week'),
+            request.GET.get('scope', 'all'),
+            limit,
+        )
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(result)
+
+
+@api_login_required
+@require_http_methods(['GET'])
+def job_detail(request, job_id):
+    """Status, progress and result of one of the user's background jobs"""
+    job = get_object_or_404(Job, pk=job_id, user=request.user)
+    return JsonResponse(job.as_dict())
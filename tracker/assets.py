@@ -0,0 +1,110 @@
+"""
+Hashed, precompressed static assets.
+
+CompressedManifestStaticFilesStorage gives every collected file a
+content-hashed name (css/tips.3f1c2a9b.css) and, at collectstatic time,
+writes .gz and (when the optional brotli package is installed) .br copies of
+the compressible ones next to it. serve() hands out the best encoding the
+client accepts; hashed names can never change content, so they are sent with
+a one-year immutable Cache-Control and repeat page loads only fetch the HTML.
+A front-end server can do the same from STATIC_ROOT (nginx gzip_static /
+brotli_static) and leave GREENSTEPS_SERVE_STATIC off.
+"""
+import gzip
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import require_safe
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.svg', '.txt', '.html', '.map'}
+# Below this the compressed file plus its headers saves nothing
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+MUTABLE_MAX_AGE = 60 * 5
+
+# (Accept-Encoding token, file suffix), preferred first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def compress(content):
+    """{suffix: bytes} for each encoding that makes content smaller"""
+    compressed = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressed['.br'] = brotli.compress(content, quality=11)
+    return {suffix: data for suffix, data in compressed.items() if len(data) < len(content)}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes .gz/.br copies of hashed files"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if os.path.splitext(name)[1] not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            path = self.path(name)
+            with open(path, 'rb') as handle:
+                content = handle.read()
+            if len(content) < MIN_COMPRESS_SIZE:
+                continue
+            for suffix, data in compress(content).items():
+                with open(path + suffix, 'wb') as handle:
+                    handle.write(data)
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        token, _, params = item.partition(';')
+        name, _, quality = params.strip().partition('=')
+        try:
+            if name == 'q' and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(token.strip().lower())
+    return accepted
+
+
+@require_safe
+def serve(request, path):
+    """Serve a collected file from STATIC_ROOT, precompressed when possible"""
+    try:
+        fullpath = safe_join(settings.STATIC_ROOT, path)
+    except ValueError:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+    encoding = None
+    accepted = _accepted_encodings(request)
+    for token, suffix in ENCODINGS:
+        if token in accepted and os.path.isfile(fullpath + suffix):
+            fullpath += suffix
+            encoding = token
+            break
+
+    response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    patch_vary_headers(response, ['Accept-Encoding'])
+
+    hashed_names = getattr(staticfiles_storage, 'hashed_files', {}).values()
+    if path in hashed_names:
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=MUTABLE_MAX_AGE)
+    return response
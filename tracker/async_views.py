@@ -0,0 +1,114 @@
+"""
+Async versions of the read-heavy views, for ASGI deployments.
+
+tracker/urls.py routes home, dashboard, the activities list and the weekly
+data API here when GREENSTEPS_ASYNC_VIEWS is on. Each view builds the same
+context as its counterpart in tracker.views, but through the async ORM, so
+an ASGI worker keeps serving other requests while it waits on the database.
+Independent queries are started together with asyncio.gather. Template
+rendering runs in a worker thread because templates may touch the session and
+cache backends synchronously.
+"""
+import asyncio
+from datetime import date, timedelta
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render
+
+from .analytics import adashboard_summary, atimeseries
+from .catalogue import aget_catalogue
+from .conditional import user_data_condition
+from .models import Activity, UserProfile
+from .pagecache import acached_context
+from .pagination import InvalidCursor, apaginate, decode_cursor, page_size_from
+from .views import (
+    ACTIVITY_TOTALS, activities_list_context, dashboard_context, filter_activities,
+    home_stats_context, weekly_data_response, weekly_days,
+)
+
+arender = sync_to_async(render)
+
+
+async def _user(request):
+    # Resolve the user on the event loop once; request.user is then a plain
+    # attribute, so templates can read it without querying again
+    request.user = await request.auser()
+    return request.user
+
+
+async def home(request):
+    """Homepage with overview stats"""
+    context = {}
+    user = await _user(request)
+    if user.is_authenticated:
+        context = await acached_context(user, 'home', lambda: _home_stats(user))
+    return await arender(request, 'tracker/home.html', context)
+
+
+async def _home_stats(user):
+    profile, created = await UserProfile.objects.aget_or_create(user=user)
+    today_emissions, week_emissions = await asyncio.gather(
+        profile.aget_daily_emissions(), profile.aget_weekly_emissions()
+    )
+    return home_stats_context(profile, today_emissions, week_emissions)
+
+
+@login_required
+async def dashboard(request):
+    """Main dashboard with detailed analytics"""
+    user = await _user(request)
+    context = await acached_context(user, 'dashboard', lambda: _dashboard_context(user))
+    return await arender(request, 'tracker/dashboard.html', context)
+
+
+async def _dashboard_context(user):
+    catalogue, (profile, created), recent_activities, summary = await asyncio.gather(
+        aget_catalogue(),
+        UserProfile.objects.aget_or_create(user=user),
+        _recent_activities(user),
+        adashboard_summary(user),
+    )
+    return dashboard_context(profile, catalogue.attach(recent_activities), summary)
+
+
+async def _recent_activities(user, limit=10):
+    return [activity async for activity in Activity.objects.filter(user=user)[:limit]]
+
+
+@login_required
+async def activities_list(request):
+    """List user activities with filtering, one keyset page at a time"""
+    user = await _user(request)
+    catalogue = await aget_catalogue()
+    activities, filters = filter_activities(
+        request, Activity.objects.filter(user=user), catalogue, ignore_invalid=True
+    )
+
+    cursor = request.GET.get('cursor')
+    try:
+        if cursor:
+            decode_cursor(cursor)
+    except InvalidCursor:
+        cursor = None
+
+    # The totals and the page do not depend on each other
+    totals, (page, next_cursor) = await asyncio.gather(
+        activities.aaggregate(**ACTIVITY_TOTALS),
+        apaginate(activities, cursor, page_size_from(request)),
+    )
+    catalogue.attach(page)
+
+    context = activities_list_context(request, page, next_cursor, totals, filters, catalogue)
+    return await arender(request, 'tracker/activities_list.html', context)
+
+
+@login_required
+@user_data_condition
+async def api_weekly_data(request):
+    """API endpoint for daily emissions over the last week (or ?days=N)"""
+    user = await _user(request)
+    days = weekly_days(request)
+    end = date.today()
+    series = await atimeseries(user, end - timedelta(days=days - 1), end, 'day')
+    return weekly_data_response(series)
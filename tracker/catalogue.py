@@ -0,0 +1,189 @@
+"""
+Process-local cache of the EmissionFactor catalogue.
+
+The factor table is small and rarely changes, so each worker process keeps
+one FactorCatalogue in memory and reuses it across requests. The cached copy
+is tagged with the 'factor-catalogue' version stamp; saving or deleting a
+factor (or running populate_emission_factors) bumps the stamp and processes
+reload on their next lookup. A lookup therefore costs one cache read instead
+of a database query. The bump only reaches other processes when the default
+cache is shared between them (GREENSTEPS_CACHE=db or file): with the
+process-local LocMemCache, a worker and the web processes each keep their own
+stamp and go on serving their copy after another process changes a factor.
+
+The catalogue also holds every factor's EmissionFactorVersion ranges as a
+sorted interval index, so value_on() finds the value valid on a date with
+one bisect.
+
+RegionalFactor values are loaded with the rest and applied per region:
+get_catalogue(region) returns a catalogue whose factors carry that region's
+values, derived in memory from the global one the first time the region is
+asked for and kept until the next reload. Regions without overrides share
+the global catalogue. Callers resolve the user's region once with
+region_for() and use that catalogue for every activity, so the number of
+regions never adds queries.
+"""
+import copy
+import threading
+from bisect import bisect_right
+
+from asgiref.sync import sync_to_async
+
+from . import versioning
+from .models import EmissionFactor, EmissionFactorVersion, RegionalFactor, UserProfile
+
+VERSION_KEY = 'factor-catalogue'
+
+_lock = threading.Lock()
+_cached = None
+
+
+class FactorCatalogue:
+    """Immutable snapshot of all emission factors with lookup indexes"""
+
+    def __init__(self, factors, version=None, versions=(), regional_values=(), region=''):
+        self.version = version
+        self.region = region
+        self.factors = sorted(factors, key=lambda factor: (factor.category, factor.name))
+        self.by_id = {factor.pk: factor for factor in self.factors}
+        self.by_name = {factor.name.lower(): factor for factor in self.factors}
+        self.by_category = {}
+        self.by_kind = {}
+        for factor in self.factors:
+            self.by_category.setdefault(factor.category, []).append(factor)
+            self.by_kind.setdefault((factor.category, factor.unit), []).append(factor)
+        for factors in self.by_kind.values():
+            factors.sort(key=lambda factor: factor.co2_per_unit)
+        # factor id -> (valid_from dates, valid_to dates, values), sorted by valid_from
+        self.versions = {}
+        for factor_version in sorted(versions, key=lambda v: (v.factor_id, v.valid_from)):
+            starts, ends, values = self.versions.setdefault(factor_version.factor_id, ([], [], []))
+            starts.append(factor_version.valid_from)
+            ends.append(factor_version.valid_to)
+            values.append(factor_version.co2_per_unit)
+        # region -> {factor id: value}; overrides holds this catalogue's own region
+        self.regional_values = {}
+        for regional in regional_values:
+            self.regional_values.setdefault(regional.region, {})[regional.factor_id] = regional.co2_per_unit
+        self.overrides = self.regional_values.get(region, {})
+        self._regions = {}
+
+    def __len__(self):
+        return len(self.factors)
+
+    def get(self, pk):
+        return self.by_id.get(pk)
+
+    def find(self, name):
+        """Look a factor up by name, ignoring case and surrounding spaces"""
+        return self.by_name.get(name.strip().lower())
+
+    def for_region(self, region):
+        """This catalogue with region's values in place of the global ones"""
+        if region == self.region or region not in self.regional_values:
+            return self
+        catalogue = self._regions.get(region)
+        if catalogue is None:
+            overrides = self.regional_values[region]
+            factors = []
+            for factor in self.factors:
+                if factor.pk in overrides:
+                    factor = copy.copy(factor)
+                    factor.co2_per_unit = overrides[factor.pk]
+                factors.append(factor)
+            catalogue = FactorCatalogue(factors, version=self.version, region=region)
+            catalogue.overrides = overrides
+            # Version ranges do not depend on the region, so the index is shared
+            catalogue.versions = self.versions
+            self._regions[region] = catalogue
+        return catalogue
+
+    def value_on(self, factor, day):
+        """
+        factor's CO2 per unit on day: the regional value if this catalogue's
+        region has one, else the version whose range covers day, else
+        factor.co2_per_unit
+        """
+        if factor.pk in self.overrides:
+            return self.overrides[factor.pk]
+        index = self.versions.get(factor.pk)
+        if index is not None:
+            starts, ends, values = index
+            position = bisect_right(starts, day) - 1
+            if position >= 0 and (ends[position] is None or day < ends[position]):
+                return values[position]
+        return factor.co2_per_unit
+
+    def ids_for_category(self, category):
+        return [factor.pk for factor in self.by_category.get(category, [])]
+
+    def alternatives(self, factor):
+        """Lower-emission factors measured in the same category and unit, lowest first"""
+        return [
+            other for other in self.by_kind.get((factor.category, factor.unit), [])
+            if other.co2_per_unit < factor.co2_per_unit
+        ]
+
+    @property
+    def category_choices(self):
+        """CATEGORY_CHOICES limited to categories that have factors"""
+        return [
+            (value, label) for value, label in EmissionFactor.CATEGORY_CHOICES
+            if value in self.by_category
+        ]
+
+    def attach(self, activities):
+        """Populate activity.emission_factor from the catalogue instead of a join"""
+        for activity in activities:
+            factor = self.by_id.get(activity.emission_factor_id)
+            if factor is not None:
+                activity.emission_factor = factor
+        return activities
+
+
+def get_catalogue(region=''):
+    """
+    Return this process's catalogue for region (blank for the global values),
+    reloading it if the version moved on
+    """
+    global _cached
+    version = versioning.get_version(VERSION_KEY)
+    catalogue = _cached
+    if catalogue is not None and catalogue.version == version:
+        return catalogue.for_region(region)
+
+    with _lock:
+        if _cached is None or _cached.version != version:
+            _cached = FactorCatalogue(
+                EmissionFactor.objects.all(), version=version,
+                versions=EmissionFactorVersion.objects.all(), regional_values=RegionalFactor.objects.all(),
+            )
+        return _cached.for_region(region)
+
+
+async def aget_catalogue(region=''):
+    """get_catalogue() for async views; only a reload leaves the event loop"""
+    catalogue = _cached
+    if catalogue is not None and catalogue.version == await versioning.aget_version(VERSION_KEY):
+        return catalogue.for_region(region)
+    return await sync_to_async(get_catalogue)(region)
+
+
+def region_for(user):
+    """
+    The region get_catalogue() should use for user: their profile's
+    region. Only queried when some region has overrides, and then once per
+    user object, so once per request for request.user.
+    """
+    if user is None or not user.is_authenticated or not get_catalogue().regional_values:
+        return ''
+    region = getattr(user, '_factor_region', None)
+    if region is None:
+        region = UserProfile.objects.filter(user_id=user.pk).values_list('region', flat=True).first()
+        region = user._factor_region = region or ''
+    return region
+
+
+def invalidate():
+    """Force every process to reload the catalogue on its next lookup"""
+    versioning.bump_version(VERSION_KEY)
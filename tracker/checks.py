@@ -0,0 +1,144 @@
+"""
+System checks for settings that hurt performance in production.
+
+They run at startup whenever GREENSTEPS_ENV is 'prod' (runserver, migrate,
+check), and can be run on their own with manage.py check --tag performance.
+The development profile deliberately keeps several of these defaults, so
+nothing is reported there.
+"""
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestFilesMixin
+from django.core.checks import Tags, Warning, register
+from django.utils.module_loading import import_string
+
+PERFORMANCE = 'performance'
+
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+DATABASE_CACHE = 'django.core.cache.backends.db.DatabaseCache'
+# Below this a shared cache starts culling version stamps once a few thousand
+# users are active; Django's own default is 300
+MIN_CACHE_ENTRIES = 10000
+
+
+def _template_loaders(template_settings):
+    for loader in template_settings.get('OPTIONS', {}).get('loaders') or []:
+        yield loader[0] if isinstance(loader, (list, tuple)) else loader
+
+
+@register(PERFORMANCE, Tags.caches, Tags.database, Tags.templates)
+def check_production_performance(app_configs, **kwargs):
+    if getattr(settings, 'GREENSTEPS_ENV', 'dev') != 'prod':
+        return []
+    messages = []
+
+    if settings.DEBUG:
+        messages.append(Warning(
+            'DEBUG is on: every query is kept in memory and errors render full tracebacks.',
+            hint='Set DEBUG = False.',
+            id='greensteps.W001',
+        ))
+
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        messages.append(Warning(
+            f'The default cache ({backend}) is not shared between worker processes, '
+            'so version stamp bumps and cached pages are per process.',
+            hint='Use GREENSTEPS_CACHE=file or GREENSTEPS_CACHE=db.',
+            id='greensteps.W002',
+        ))
+    else:
+        max_entries = settings.CACHES.get('default', {}).get('OPTIONS', {}).get('MAX_ENTRIES', 300)
+        if max_entries < MIN_CACHE_ENTRIES:
+            messages.append(Warning(
+                f'The default cache keeps at most {max_entries} entries, so version stamps '
+                'and cached pages are culled and rebuilt under normal load.',
+                hint='Raise GREENSTEPS_CACHE_MAX_ENTRIES.',
+                id='greensteps.W011',
+            ))
+
+    # Only a shared cache other than the database can take session reads off it
+    session_cache = backend not in PROCESS_LOCAL_CACHES and backend != DATABASE_CACHE
+    if settings.SESSION_ENGINE == 'django.contrib.sessions.backends.db' and session_cache:
+        messages.append(Warning(
+            'Sessions are read from the database on every request.',
+            hint="Use 'django.contrib.sessions.backends.cached_db' or 'signed_cookies'.",
+            id='greensteps.W003',
+        ))
+    elif settings.SESSION_ENGINE == 'django.contrib.sessions.backends.cached_db' and backend == DATABASE_CACHE:
+        messages.append(Warning(
+            'Sessions are cached in the database cache, so every session write goes to the '
+            'database twice and reads save no queries.',
+            hint="Use 'django.contrib.sessions.backends.db', or a file cache for cached_db.",
+            id='greensteps.W013',
+        ))
+
+    asgi = getattr(settings, 'GREENSTEPS_SERVER', 'wsgi') == 'asgi'
+    for alias, database in settings.DATABASES.items():
+        if asgi and database.get('CONN_MAX_AGE'):
+            messages.append(Warning(
+                f'Database {alias!r} keeps connections open under ASGI, where each request '
+                'runs on a new thread and leaves its own connection behind.',
+                hint='Set CONN_MAX_AGE = 0 when serving through GreenSteps.asgi.',
+                id='greensteps.W012',
+            ))
+        elif not asgi and not database.get('CONN_MAX_AGE'):
+            messages.append(Warning(
+                f'Database {alias!r} opens a new connection for every request.',
+                hint='Set CONN_MAX_AGE, e.g. with GREENSTEPS_DB_PROFILE=tuned.',
+                id='greensteps.W004',
+            ))
+        init_command = database.get('OPTIONS', {}).get('init_command', '')
+        if database['ENGINE'].endswith('sqlite3') and 'journal_mode=WAL' not in init_command:
+            messages.append(Warning(
+                f'SQLite database {alias!r} is not in WAL mode: readers block on '
+                'writers and concurrent writes fail with "database is locked".',
+                hint='Use GREENSTEPS_DB_PROFILE=tuned.',
+                id='greensteps.W005',
+            ))
+
+    for template_settings in settings.TEMPLATES:
+        loaders = list(_template_loaders(template_settings))
+        if loaders and 'django.template.loaders.cached.Loader' not in loaders:
+            messages.append(Warning(
+                f'Templates for {template_settings["BACKEND"]} are parsed again on every render.',
+                hint="Wrap the loaders in 'django.template.loaders.cached.Loader'.",
+                id='greensteps.W006',
+            ))
+
+    if getattr(settings, 'GREENSTEPS_PERF', False):
+        messages.append(Warning(
+            'Request instrumentation (GREENSTEPS_PERF) is on and wraps every query.',
+            hint='Only enable it while investigating a problem.',
+            id='greensteps.W007',
+        ))
+
+    for middleware, effect in (
+        ('django.middleware.gzip.GZipMiddleware', 'Responses are sent uncompressed.'),
+        ('django.middleware.http.ConditionalGetMiddleware',
+         'ETag and Last-Modified requests are never answered with 304.'),
+    ):
+        if middleware not in settings.MIDDLEWARE:
+            messages.append(Warning(
+                effect,
+                hint=f'Add {middleware} to MIDDLEWARE.',
+                id='greensteps.W008',
+            ))
+
+    storage = settings.STORAGES.get('staticfiles', {}).get('BACKEND')
+    if storage and not issubclass(import_string(storage), ManifestFilesMixin):
+        messages.append(Warning(
+            'Static files keep their names between deploys, so they cannot be cached long term.',
+            hint="Use 'tracker.assets.CompressedManifestStaticFilesStorage'.",
+            id='greensteps.W009',
+        ))
+
+    if getattr(settings, 'GREENSTEPS_JOBS_INLINE', False):
+        messages.append(Warning(
+            'Background jobs run inline, inside the request that queued them.',
+            hint='Set GREENSTEPS_JOBS_INLINE=0 and run manage.py run_worker.',
+            id='greensteps.W010',
+        ))
+    return messages
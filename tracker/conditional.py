@@ -0,0 +1,81 @@
+"""
+Conditional GET support driven by version stamps.
+
+ETag and Last-Modified values are computed from the user's data stamp and the
+factor catalogue stamp (see tracker.versioning), so deciding whether to answer
+304 Not Modified costs cache lookups only and never a database query.
+"""
+from datetime import date, datetime, time, timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.views.decorators.http import condition
+
+from . import versioning
+from .catalogue import VERSION_KEY as CATALOGUE_VERSION_KEY
+from .pagecache import user_data_version
+
+ETAG_PREFIX = 'v1'
+
+
+def _stamp_datetime(stamp):
+    return datetime.fromtimestamp(stamp / 1_000_000, tz=timezone.utc)
+
+
+def user_data_etag(request, *args, **kwargs):
+    if not request.user.is_authenticated:
+        return None
+    # Windows such as "today" and "this week" move at midnight even when the
+    # data does not, so the version token includes the date
+    return f'{ETAG_PREFIX}-{user_data_version(request.user.pk)}'
+
+
+def user_data_last_modified(request, *args, **kwargs):
+    if not request.user.is_authenticated:
+        return None
+    midnight = datetime.combine(date.today(), time.min, tzinfo=timezone.utc)
+    return max(midnight, _stamp_datetime(max(
+        versioning.get_user_version(request.user.pk),
+        versioning.get_version(CATALOGUE_VERSION_KEY),
+    )))
+
+
+def catalogue_etag(request, *args, **kwargs):
+    return f'{ETAG_PREFIX}-{versioning.get_version(CATALOGUE_VERSION_KEY)}'
+
+
+def catalogue_last_modified(request, *args, **kwargs):
+    return _stamp_datetime(versioning.get_version(CATALOGUE_VERSION_KEY))
+
+
+def _condition(etag_func, last_modified_func):
+    """
+    condition() that also accepts async views. Django calls the header
+    functions synchronously even for async views, and they may load the user
+    or read a database-backed cache, so for async views they are evaluated in
+    a worker thread first.
+    """
+    sync_decorator = condition(etag_func=etag_func, last_modified_func=last_modified_func)
+
+    def decorator(view):
+        if not iscoroutinefunction(view):
+            return sync_decorator(view)
+
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            # Load the user on the event loop so the thread does not query again
+            request.user = await request.auser()
+            etag = await sync_to_async(etag_func)(request, *args, **kwargs)
+            last_modified = await sync_to_async(last_modified_func)(request, *args, **kwargs)
+            decorated = condition(
+                etag_func=lambda *a, **kw: etag,
+                last_modified_func=lambda *a, **kw: last_modified,
+            )(view)
+            return await decorated(request, *args, **kwargs)
+        return inner
+    return decorator
+
+
+# Decorators for views whose response depends on the user's data / the catalogue
+user_data_condition = _condition(user_data_etag, user_data_last_modified)
+catalogue_condition = _condition(catalogue_etag, catalogue_last_modified)
@@ -0,0 +1,69 @@
+"""
+Streaming export of activity history as CSV or NDJSON.
+
+Rows are read with QuerySet.iterator() and encoded one at a time, so memory
+use stays flat however long the history is. The columns match what
+tracker.importers accepts, so an export can be imported again.
+"""
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+CHUNK_SIZE = 2000
+FIELDS = ['date', 'factor', 'category', 'quantity', 'unit', 'co2_emissions', 'notes']
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def _rows(activities, include_user):
+    activities = activities.select_related('emission_factor').order_by('date', 'created_at', 'id')
+    if include_user:
+        activities = activities.select_related('user')
+    for activity in activities.iterator(chunk_size=CHUNK_SIZE):
+        factor = activity.emission_factor
+        row = {
+            'date': activity.date.isoformat(),
+            'factor': factor.name,
+            'category': factor.category,
+            'quantity': activity.quantity,
+            'unit': factor.unit,
+            'co2_emissions': round(activity.co2_emissions, 6),
+            'notes': activity.notes,
+        }
+        if include_user:
+            row['username'] = activity.user.username
+        yield row
+
+
+def iter_csv(activities, include_user=False):
+    fields = (['username'] if include_user else []) + FIELDS
+    writer = csv.DictWriter(_Echo(), fieldnames=fields)
+    yield writer.writerow(dict(zip(fields, fields)))
+    for row in _rows(activities, include_user):
+        yield writer.writerow(row)
+
+
+def iter_ndjson(activities, include_user=False):
+    for row in _rows(activities, include_user):
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def export_response(activities, fmt='csv', include_user=False, filename='greensteps-activities'):
+    """StreamingHttpResponse with the activities encoded as fmt"""
+    content_type, extension = FORMATS[fmt]
+    rows = iter_csv(activities, include_user) if fmt == 'csv' else iter_ndjson(activities, include_user)
+    response = StreamingHttpResponse(rows, content_type=f'{content_type}; charset=utf-8')
+    stamp = timezone.now().date().isoformat()
+    response['Content-Disposition'] = f'attachment; filename="{filename}-{stamp}.{extension}"'
+    return response
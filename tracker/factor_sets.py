@@ -0,0 +1,281 @@
+"""
+Emission factor data files and the idempotent loader behind populate_emission_factors.
+
+A factor set is a JSON or CSV file in DATA_DIR (or anywhere else, given a
+path). JSON files hold an object with ``name``, ``version`` and a
+``factors`` list; CSV files have one factor per row and take their name
+from the file name. Each factor needs ``category``, ``name``, ``unit`` and
+``co2_per_unit``; ``description`` is optional.
+
+Regional datasets use the same format with a ``region`` (a top-level key in
+JSON, a column in CSV). Their rows give the factor's value for users in that
+region and become RegionalFactor rows: ``category`` and ``name`` must name a
+factor from a global set or the database, and ``unit``, when given, must
+match it.
+
+load() matches the factors in the files to the database by their natural
+key, (category, name) compared without case, or (region, category, name)
+for regional values, and applies only the differences: new rows with
+bulk_create, changed ones with bulk_update, all in a single transaction.
+Rows are never deleted and recreated, so activities keep pointing at the
+same factors. Because the bulk operations skip model signals, load() itself
+queues re-pricing for factors whose CO2 value changed in any region and
+invalidates the catalogue. Each file's checksum is recorded in
+EmissionFactorDataset, so a file that has not changed since it was last
+loaded is skipped.
+"""
+import csv
+import hashlib
+import json
+from pathlib import Path
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import catalogue, jobs, pricing
+from .models import Activity, EmissionFactor, EmissionFactorDataset, RegionalFactor
+from .regions import normalise_location
+
+DATA_DIR = Path(__file__).resolve().parent / 'data' / 'emission_factors'
+EXTENSIONS = ('.json', '.csv')
+# Fields a data file sets; category and name are the natural key
+FIELDS = ('unit', 'co2_per_unit', 'description')
+BATCH_SIZE = 500
+
+
+class FactorSet:
+    def __init__(self, name, version, checksum, rows, regional_rows=()):
+        self.name = name
+        self.version = version
+        self.checksum = checksum
+        self.rows = rows
+        self.regional_rows = list(regional_rows)
+
+
+class LoadResult:
+    def __init__(self):
+        self.created = []
+        self.updated = []
+        self.unchanged = 0
+        self.repriced = []
+        self.removed = []
+        self.kept = []
+        self.skipped_sets = []
+        # RegionalFactor rows
+        self.regional_created = []
+        self.regional_updated = []
+        self.regional_removed = []
+
+    @property
+    def changed(self):
+        return bool(
+            self.created or self.updated or self.removed
+            or self.regional_created or self.regional_updated or self.regional_removed
+        )
+
+
+def default_paths():
+    return sorted(path for path in DATA_DIR.iterdir() if path.suffix.lower() in EXTENSIONS)
+
+
+def _clean_row(row, where, region=''):
+    """Validate one factor from a data file into a dict of model field values"""
+    categories = dict(EmissionFactor.CATEGORY_CHOICES)
+    category = str(row.get('category') or '').strip().lower()
+    if category not in categories:
+        raise ValueError(f'{where}: unknown category {row.get("category")!r}')
+    region = normalise_location(str(row.get('region') or region))
+    name = str(row.get('name') or '').strip()
+    unit = str(row.get('unit') or '').strip()
+    if not name or not (unit or region):
+        raise ValueError(f'{where}: name and unit are required')
+    try:
+        co2_per_unit = float(row.get('co2_per_unit'))
+    except (TypeError, ValueError):
+        raise ValueError(f'{where}: co2_per_unit must be a number')
+    if co2_per_unit < 0:
+        raise ValueError(f'{where}: co2_per_unit cannot be negative')
+    if region:
+        return {'region': region, 'category': category, 'name': name, 'unit': unit, 'co2_per_unit': co2_per_unit}
+    return {
+        'category': category,
+        'name': name,
+        'unit': unit,
+        'co2_per_unit': co2_per_unit,
+        'description': str(row.get('description') or '').strip(),
+    }
+
+
+def read_factor_set(path):
+    """Parse and validate a JSON or CSV factor file, returns a FactorSet"""
+    path = Path(path)
+    raw = path.read_bytes()
+    checksum = hashlib.sha256(raw).hexdigest()
+    text = raw.decode('utf-8-sig')
+    name, version, region = path.stem, '', ''
+
+    if path.suffix.lower() == '.json':
+        try:
+            data = json.loads(text)
+        except ValueError as exc:
+            raise ValueError(f'{path.name}: {exc}')
+        if isinstance(data, dict):
+            name = data.get('name') or name
+            version = str(data.get('version') or '')
+            region = str(data.get('region') or '')
+            data = data.get('factors')
+        if not isinstance(data, list):
+            raise ValueError(f'{path.name}: expected a list of factors')
+        rows = [
+            _clean_row(row if isinstance(row, dict) else {}, f'{path.name} factor {index}', region)
+            for index, row in enumerate(data, 1)
+        ]
+    elif path.suffix.lower() == '.csv':
+        reader = csv.DictReader(text.splitlines())
+        rows = [_clean_row(row, f'{path.name} line {reader.line_num}') for row in reader]
+    else:
+        raise ValueError(f'{path.name}: factor files must be {" or ".join(EXTENSIONS)}')
+
+    seen = set()
+    for row in rows:
+        key = (row.get('region', ''), row['category'], row['name'].lower())
+        if key in seen:
+            raise ValueError(f'{path.name}: {_describe(row)} is listed twice')
+        seen.add(key)
+    return FactorSet(
+        name, version, checksum,
+        [row for row in rows if 'region' not in row], [row for row in rows if 'region' in row],
+    )
+
+
+def _describe(row):
+    described = f'{row["category"]} factor {row["name"]!r}'
+    return f'{described} in {row["region"]}' if 'region' in row else described
+
+
+def load(paths=None, prune=False, force=False, dry_run=False):
+    """
+    Bring the factor table and regional values in line with the factor files
+    at paths (default: every file in DATA_DIR). With prune, factors missing
+    from every file are deleted unless activities use them, and so are
+    regional values missing from every file. Returns a LoadResult.
+    """
+    factor_sets = [read_factor_set(path) for path in (paths or default_paths())]
+    names = [factor_set.name for factor_set in factor_sets]
+    if len(set(names)) != len(names):
+        raise ValueError('Two factor files have the same set name')
+
+    result = LoadResult()
+    loaded = dict(EmissionFactorDataset.objects.values_list('name', 'checksum'))
+    if not force and not prune:
+        result.skipped_sets = [fs.name for fs in factor_sets if loaded.get(fs.name) == fs.checksum]
+        factor_sets = [fs for fs in factor_sets if fs.name not in result.skipped_sets]
+        if not factor_sets:
+            return result
+
+    wanted = {}
+    wanted_regional = {}
+    for factor_set in factor_sets:
+        for rows, by_key in ((factor_set.rows, wanted), (factor_set.regional_rows, wanted_regional)):
+            for row in rows:
+                key = (row.get('region', ''), row['category'], row['name'].lower())
+                if key in by_key:
+                    raise ValueError(f'{_describe(row)} is in both {by_key[key][0]} and {factor_set.name}')
+                by_key[key] = (factor_set.name, row)
+
+    existing = {}
+    for factor in EmissionFactor.objects.all():
+        key = ('', factor.category, factor.name.lower())
+        if key in existing:
+            raise ValueError(
+                f'{factor.category} factors {existing[key].name!r} and {factor.name!r} differ only in case'
+            )
+        existing[key] = factor
+    for key, (set_name, row) in wanted.items():
+        factor = existing.get(key)
+        if factor is None:
+            result.created.append(EmissionFactor(**row))
+            continue
+        changes = [field for field in FIELDS if getattr(factor, field) != row[field]]
+        if factor.name != row['name']:
+            changes.append('name')  # only the case differs
+        if not changes:
+            result.unchanged += 1
+            continue
+        if 'co2_per_unit' in changes:
+            result.repriced.append(factor)
+        for field in changes:
+            setattr(factor, field, row[field])
+        result.updated.append(factor)
+
+    # Regional values attach to the factors above, including ones created by this load
+    factors = {**existing, **{('', factor.category, factor.name.lower()): factor for factor in result.created}}
+    existing_regional = {
+        (regional.region, regional.factor.category, regional.factor.name.lower()): regional
+        for regional in RegionalFactor.objects.select_related('factor')
+    }
+    for (region, category, name), (set_name, row) in wanted_regional.items():
+        factor = factors.get(('', category, name))
+        if factor is None:
+            raise ValueError(f'{set_name}: {_describe(row)} has no global factor to override')
+        if row['unit'] and row['unit'] != factor.unit:
+            raise ValueError(f'{set_name}: {_describe(row)} is in {row["unit"]}, the factor in {factor.unit}')
+        regional = existing_regional.get((region, category, name))
+        if regional is None:
+            result.regional_created.append(
+                RegionalFactor(region=region, factor=factor, co2_per_unit=row['co2_per_unit'])
+            )
+        elif regional.co2_per_unit != row['co2_per_unit']:
+            regional.co2_per_unit = row['co2_per_unit']
+            result.regional_updated.append(regional)
+
+    if prune:
+        missing = [factor for key, factor in existing.items() if key not in wanted]
+        used = set(
+            Activity.objects.filter(emission_factor__in=missing).order_by()
+            .values_list('emission_factor_id', flat=True).distinct()
+        ) if missing else set()
+        result.removed = [factor for factor in missing if factor.pk not in used]
+        result.kept = [factor for factor in missing if factor.pk in used]
+        removed_ids = {factor.pk for factor in result.removed}
+        # Values of removed factors go with them
+        result.regional_removed = [
+            regional for key, regional in existing_regional.items()
+            if key not in wanted_regional and regional.factor_id not in removed_ids
+        ]
+
+    if dry_run:
+        return result
+
+    now = timezone.now()
+    with transaction.atomic():
+        EmissionFactor.objects.bulk_create(result.created, batch_size=BATCH_SIZE)
+        if result.updated:
+            EmissionFactor.objects.bulk_update(result.updated, FIELDS + ('name',), batch_size=BATCH_SIZE)
+        RegionalFactor.objects.bulk_create(result.regional_created, batch_size=BATCH_SIZE)
+        if result.regional_updated:
+            RegionalFactor.objects.bulk_update(result.regional_updated, ['co2_per_unit'], batch_size=BATCH_SIZE)
+        if result.regional_removed:
+            RegionalFactor.objects.filter(pk__in=[regional.pk for regional in result.regional_removed]).delete()
+        if result.removed:
+            EmissionFactor.objects.filter(pk__in=[factor.pk for factor in result.removed]).delete()
+        for factor_set in factor_sets:
+            EmissionFactorDataset.objects.update_or_create(name=factor_set.name, defaults={
+                'version': factor_set.version,
+                'checksum': factor_set.checksum,
+                'factor_count': len(factor_set.rows) + len(factor_set.regional_rows),
+                'loaded_at': now,
+            })
+
+        # The bulk writes skip the signals that would do these; one job
+        # covers every repriced factor rather than a row per factor. Deleting
+        # regional values does send them, and queues those factors itself.
+        factor_ids = sorted((
+            {factor.pk for factor in result.repriced}
+            | {regional.factor_id for regional in result.regional_created + result.regional_updated}
+        ) - {regional.factor_id for regional in result.regional_removed})
+        if factor_ids and pricing.repricing_policy() == pricing.REPRICE_ALL:
+            jobs.enqueue('reprice_factors', {'factor_ids': factor_ids}, key=jobs.key_for('reprice_factors', *factor_ids))
+        if result.changed:
+            transaction.on_commit(catalogue.invalidate)
+    return result
@@ -1,9 +1,55 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from .catalogue import get_catalogue
 from .models import Activity, EmissionFactor
 
+class CatalogueChoiceIterator(forms.models.ModelChoiceIterator):
+    """Yield factor choices from the in-process catalogue instead of a query"""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for factor in self.field.catalogue().factors:
+            yield self.choice(factor)
+
+    def __len__(self):
+        return len(self.field.catalogue()) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(len(self.field.catalogue()))
+
+class FactorChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField backed by the factor catalogue of the field's region"""
+    iterator = CatalogueChoiceIterator
+    region = ''
+
+    def catalogue(self):
+        return get_catalogue(self.region)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            factor = self.catalogue().get(int(value))
+        except (TypeError, ValueError):
+            factor = None
+        if factor is None:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        return factor
+
 class ActivityForm(forms.ModelForm):
+    emission_factor = FactorChoiceField(
+        queryset=EmissionFactor.objects.all(),
+        widget=forms.Select(attrs={
+            'class': 'form-select'
+        })
+    )
+
     class Meta:
         model = Activity
         fields = ['emission_factor', 'quantity', 'date', 'notes']
@@ -23,21 +69,80 @@ class ActivityForm(forms.ModelForm):
                 'rows': 3,
                 'placeholder': 'Optional notes about this activity'
             }),
-            'emission_factor': forms.Select(attrs={
-                'class': 'form-select'
-            })
         }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, region='', **kwargs):
         super().__init__(*args, **kwargs)
-        # Group emission factors by category for better UX
-        self.fields['emission_factor'].queryset = EmissionFactor.objects.all()
+        # Choices come from the cached factor catalogue, ordered by category,
+        # with the values of the user's region (see catalogue.region_for)
         self.fields['emission_factor'].empty_label = "Select an activity"
+        self.fields['emission_factor'].region = region
 
         # Add helpful labels
         self.fields['quantity'].help_text = "Amount will depend on the activity selected"
         self.fields['emission_factor'].help_text = "Choose the activity that best matches what you did"
 
+class ActivityImportForm(forms.Form):
+    FORMAT_CHOICES = [
+        ('', 'Detect from file name'),
+        ('csv', 'CSV'),
+        ('json', 'JSON / NDJSON'),
+    ]
+
+    file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={'class': 'form-input'}),
+        help_text="Columns: factor, quantity, date (YYYY-MM-DD) and optional notes"
+    )
+    format = forms.ChoiceField(
+        choices=FORMAT_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+class ScenarioForm(forms.Form):
+    """One "what if" factor swap for the projections page"""
+    swap_from = FactorChoiceField(
+        queryset=EmissionFactor.objects.all(),
+        label="Instead of",
+        empty_label="Select an activity",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    swap_to = FactorChoiceField(
+        queryset=EmissionFactor.objects.all(),
+        label="I would use",
+        empty_label="Select an activity",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    share = forms.IntegerField(
+        min_value=1,
+        max_value=100,
+        initial=100,
+        help_text="Percentage of the activity to swap",
+        widget=forms.NumberInput(attrs={'class': 'form-input'})
+    )
+
+    def __init__(self, *args, region='', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['swap_from'].region = region
+        self.fields['swap_to'].region = region
+
+    def clean(self):
+        cleaned_data = super().clean()
+        source, target = cleaned_data.get('swap_from'), cleaned_data.get('swap_to')
+        if source and target:
+            if source.pk == target.pk:
+                raise forms.ValidationError("Choose two different activities")
+            if source.unit != target.unit:
+                raise forms.ValidationError(
+                    f"{source.name} is measured in {source.unit} and {target.name} in {target.unit}"
+                )
+        return cleaned_data
+
+    def swaps(self):
+        """The swap as projections.substitution() expects it"""
+        data = self.cleaned_data
+        return [(data['swap_from'].pk, data['swap_to'].pk, data['share'] / 100)]
+
 class UserRegistrationForm(UserCreationForm):
     email = forms.EmailField(required=True, widget=forms.EmailInput(attrs={
         'class': 'form-input',
@@ -0,0 +1,282 @@
+"""
+Incremental daily-goal tracking: per-day status, monthly counters and streaks.
+
+A logged day is a hit when its total CO2 is within the user's daily goal.
+Three tables hold the derived state: GoalDay (one row per logged day, with
+its total and hit flag), GoalMonth (tracked and hit day counters per month)
+and GoalStreak (one row per run of consecutive hit days).
+
+refresh_days() is called by tracker.rollups whenever a day's buckets change.
+It re-reads the totals of just those days and applies the status change.
+A day that flips to a hit joins the runs ending the day before and starting
+the day after. A day that flips to a miss splits the run it was in. Either
+way the cost is a handful of indexed queries, whatever the history length,
+and editing an old day is handled the same way as logging today. rebuild()
+recomputes everything from the rollup in one grouped query. It runs after
+a daily goal change and from the ``rebuild_goals`` command.
+
+status() reads the current streak, longest streak, this month's counters and
+badges with a fixed number of indexed lookups.
+"""
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import DailyEmission, GoalDay, GoalMonth, GoalStreak, UserProfile
+
+BATCH_SIZE = 1000
+DEFAULT_GOAL = UserProfile._meta.get_field('daily_goal').default
+
+# (slug, label, what it counts, threshold)
+BADGES = [
+    ('first-hit', 'First day within goal', 'hit_days', 1),
+    ('streak-3', '3-day streak', 'longest_streak', 3),
+    ('streak-7', 'One week streak', 'longest_streak', 7),
+    ('streak-30', 'One month streak', 'longest_streak', 30),
+    ('streak-100', '100-day streak', 'longest_streak', 100),
+    ('hits-50', '50 days within goal', 'hit_days', 50),
+    ('hits-365', 'A year of days within goal', 'hit_days', 365),
+]
+
+
+def daily_goal(user_id):
+    goal = UserProfile.objects.filter(user_id=user_id).values_list('daily_goal', flat=True).first()
+    return DEFAULT_GOAL if goal is None else goal
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def _lock_user(user_id):
+    # Serialises concurrent refreshes of one user's runs (a no-op on SQLite,
+    # where write transactions are already serialised)
+    list(User.objects.select_for_update().filter(pk=user_id).values_list('pk', flat=True))
+
+
+def refresh_days(user_id, days):
+    """Re-derive the goal state of days for user_id from their rollup buckets"""
+    days = sorted(set(days))
+    if not days:
+        return
+    with transaction.atomic():
+        _lock_user(user_id)
+        goal = daily_goal(user_id)
+        totals = {
+            row['date']: (row['total'] or 0, row['count'] or 0)
+            for row in DailyEmission.objects.filter(user_id=user_id, date__in=days).order_by().values(
+                'date'
+            ).annotate(total=Sum('total_co2'), count=Sum('activity_count'))
+        }
+        existing = {row.date: row for row in GoalDay.objects.filter(user_id=user_id, date__in=days)}
+
+        for day in days:
+            total, count = totals.get(day, (0, 0))
+            previous = existing.get(day)
+            tracked = count > 0
+            hit = tracked and total <= goal
+            was_tracked = previous is not None
+            was_hit = was_tracked and previous.hit
+
+            if not tracked:
+                if was_tracked:
+                    previous.delete()
+            elif not was_tracked:
+                GoalDay.objects.create(user_id=user_id, date=day, total_co2=total, hit=hit)
+            elif previous.total_co2 != total or previous.hit != hit:
+                GoalDay.objects.filter(pk=previous.pk).update(total_co2=total, hit=hit)
+
+            if tracked != was_tracked or hit != was_hit:
+                _bump_month(user_id, day, int(tracked) - int(was_tracked), int(hit) - int(was_hit))
+            if hit and not was_hit:
+                _add_to_streak(user_id, day)
+            elif was_hit and not hit:
+                _remove_from_streak(user_id, day)
+
+
+def _bump_month(user_id, day, tracked, hit):
+    counters = GoalMonth.objects.filter(user_id=user_id, month=month_start(day))
+    updated = counters.update(tracked_days=F('tracked_days') + tracked, hit_days=F('hit_days') + hit)
+    if not updated and tracked >= 0 and hit >= 0:
+        # The user row is locked, so nobody else can be creating this month
+        GoalMonth.objects.create(
+            user_id=user_id, month=month_start(day), tracked_days=tracked, hit_days=hit
+        )
+
+
+def _add_to_streak(user_id, day):
+    """day became a hit: extend, join or start a run"""
+    before = GoalStreak.objects.filter(user_id=user_id, end=day - timedelta(days=1)).first()
+    after = GoalStreak.objects.filter(user_id=user_id, start=day + timedelta(days=1)).first()
+    if before and after:
+        before.end = after.end
+        after.delete()
+    elif before:
+        before.end = day
+    elif after:
+        after.start = day
+    else:
+        GoalStreak.objects.create(user_id=user_id, start=day, end=day, length=1)
+        return
+    run = before or after
+    run.length = (run.end - run.start).days + 1
+    run.save(update_fields=['start', 'end', 'length'])
+
+
+def _remove_from_streak(user_id, day):
+    """day stopped being a hit: shorten or split the run containing it"""
+    run = GoalStreak.objects.filter(user_id=user_id, start__lte=day, end__gte=day).first()
+    if run is None:
+        return
+    if run.start == run.end:
+        run.delete()
+        return
+    if run.start < day < run.end:
+        GoalStreak.objects.create(
+            user_id=user_id, start=day + timedelta(days=1), end=run.end,
+            length=(run.end - day).days,
+        )
+        run.end = day - timedelta(days=1)
+    elif run.start == day:
+        run.start = day + timedelta(days=1)
+    else:
+        run.end = day - timedelta(days=1)
+    run.length = (run.end - run.start).days + 1
+    run.save(update_fields=['start', 'end', 'length'])
+
+
+def rebuild(user_ids=None):
+    """Recompute goal days, months and streaks from the rollup, returns logged day count"""
+    goal_days = GoalDay.objects.all()
+    months = GoalMonth.objects.all()
+    streaks = GoalStreak.objects.all()
+    buckets = DailyEmission.objects.all()
+    profiles = UserProfile.objects.all()
+    if user_ids is not None:
+        goal_days = goal_days.filter(user_id__in=user_ids)
+        months = months.filter(user_id__in=user_ids)
+        streaks = streaks.filter(user_id__in=user_ids)
+        buckets = buckets.filter(user_id__in=user_ids)
+        profiles = profiles.filter(user_id__in=user_ids)
+
+    goals = dict(profiles.values_list('user_id', 'daily_goal'))
+    rows = buckets.order_by('user_id', 'date').values('user_id', 'date').annotate(
+        total=Sum('total_co2'), count=Sum('activity_count')
+    )
+
+    created = 0
+    with transaction.atomic():
+        goal_days.delete()
+        months.delete()
+        streaks.delete()
+
+        day_batch = []
+        counters = {}
+        runs = []
+        for row in rows.iterator(chunk_size=BATCH_SIZE):
+            if not row['count']:
+                continue
+            user_id, day, total = row['user_id'], row['date'], row['total'] or 0
+            hit = total <= goals.get(user_id, DEFAULT_GOAL)
+            day_batch.append(GoalDay(user_id=user_id, date=day, total_co2=total, hit=hit))
+
+            tracked_days, hit_days = counters.get((user_id, month_start(day)), (0, 0))
+            counters[user_id, month_start(day)] = (tracked_days + 1, hit_days + int(hit))
+
+            if hit:
+                last = runs[-1] if runs else None
+                if last and last.user_id == user_id and last.end == day - timedelta(days=1):
+                    last.end = day
+                    last.length += 1
+                else:
+                    runs.append(GoalStreak(user_id=user_id, start=day, end=day, length=1))
+
+            if len(day_batch) >= BATCH_SIZE:
+                GoalDay.objects.bulk_create(day_batch)
+                created += len(day_batch)
+                day_batch = []
+        if day_batch:
+            GoalDay.objects.bulk_create(day_batch)
+            created += len(day_batch)
+
+        GoalMonth.objects.bulk_create([
+            GoalMonth(user_id=user_id, month=month, tracked_days=tracked_days, hit_days=hit_days)
+            for (user_id, month), (tracked_days, hit_days) in counters.items()
+        ], batch_size=BATCH_SIZE)
+        GoalStreak.objects.bulk_create(runs, batch_size=BATCH_SIZE)
+    return created
+
+
+def _run_dict(run):
+    if run is None:
+        return {'length': 0, 'start': None, 'end': None}
+    return {'length': run.length, 'start': run.start.isoformat(), 'end': run.end.isoformat()}
+
+
+def status(user, today=None):
+    """
+    Goal state for user: today's status, the current and longest streaks,
+    this month's counters, lifetime hit days and earned badges
+    """
+    if today is None:
+        today = date.today()
+    yesterday = today - timedelta(days=1)
+    goal = daily_goal(user.pk)
+    today_row = GoalDay.objects.filter(user=user, date=today).first()
+
+    # The run ending yesterday still counts until today is logged over goal
+    current = GoalStreak.objects.filter(user=user, end__gte=yesterday).order_by('-end').first()
+    if current and current.end == yesterday and today_row and not today_row.hit:
+        current = None
+    longest = GoalStreak.objects.filter(user=user).order_by('-length', '-end').first()
+    month = GoalMonth.objects.filter(user=user, month=month_start(today)).first()
+    hit_days = GoalMonth.objects.filter(user=user).aggregate(total=Sum('hit_days'))['total'] or 0
+
+    counts = {'hit_days': hit_days, 'longest_streak': longest.length if longest else 0}
+    return {
+        'daily_goal': goal,
+        'today': {
+            'logged': today_row is not None,
+            'total': round(today_row.total_co2, 3) if today_row else 0,
+            'hit': bool(today_row and today_row.hit),
+        },
+        'current_streak': _run_dict(current),
+        'longest_streak': _run_dict(longest),
+        'month': {
+            'month': month_start(today).isoformat(),
+            'tracked_days': month.tracked_days if month else 0,
+            'hit_days': month.hit_days if month else 0,
+            'hit_ratio': round(month.hit_ratio, 3) if month else 0,
+        },
+        'hit_days': hit_days,
+        'badges': [
+            {'slug': slug, 'label': label}
+            for slug, label, counter, threshold in BADGES
+            if counts[counter] >= threshold
+        ],
+    }
+
+
+def history(user, start, end):
+    """Per-day goal status and monthly hit ratios for start..end"""
+    days = GoalDay.objects.filter(user=user, date__gte=start, date__lte=end).order_by('date')
+    months = GoalMonth.objects.filter(
+        user=user, month__gte=month_start(start), month__lte=end
+    ).order_by('month')
+    return {
+        'days': [
+            {'date': day.date.isoformat(), 'total': round(day.total_co2, 3), 'hit': day.hit}
+            for day in days
+        ],
+        'months': [
+            {
+                'month': month.month.isoformat(),
+                'tracked_days': month.tracked_days,
+                'hit_days': month.hit_days,
+                'hit_ratio': round(month.hit_ratio, 3),
+            }
+            for month in months
+        ],
+    }
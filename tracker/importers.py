@@ -0,0 +1,220 @@
+"""
+Bulk import of activity history from CSV or JSON.
+
+Input is parsed as a stream, one row at a time, so memory use does not grow
+with the file. Each row needs a ``factor`` (an emission factor name, matched
+against the cached catalogue), a ``quantity`` and a ``date`` (YYYY-MM-DD);
+``notes`` is optional. JSON input can be an array of objects or
+newline-delimited objects.
+
+Rows are validated in chunks and valid ones are written with bulk_create
+inside a single transaction. Rollup buckets are adjusted once per touched
+(date, category) at the end instead of once per row. Invalid rows are
+skipped and reported with their line number. A file that cannot be read to
+the end (not UTF-8, or broken CSV quoting) is not imported at all.
+"""
+import csv
+import io
+import json
+import math
+import os
+import re
+
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from . import goals, rollups, versioning
+from .catalogue import get_catalogue, region_for
+from .models import Activity
+
+CHUNK_SIZE = 1000
+FORMATS = ('csv', 'json')
+MAX_NOTES_LENGTH = 1000
+# Whitespace and commas between values in a JSON array or NDJSON stream
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+class ImportAborted(Exception):
+    """Raised when the file cannot be read, or in strict mode when any row is invalid; nothing is written"""
+
+    def __init__(self, result, message=None):
+        super().__init__(message or f'{len(result.errors)} invalid rows, import rolled back')
+        self.result = result
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.errors.append((line, message))
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def detect_format(filename, default='csv'):
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension in ('.json', '.ndjson', '.jsonl'):
+        return 'json'
+    if extension == '.csv':
+        return 'csv'
+    return default
+
+
+def _iter_csv(text):
+    reader = csv.DictReader(text)
+    for row in reader:
+        # Header is line 1; reader.line_num is the last physical line read
+        yield reader.line_num, row
+
+
+def _iter_json(text, read_size=64 * 1024):
+    """Yield (position, object) from a JSON array or newline-delimited JSON"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    offset = 0
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        offset = SEPARATORS.match(buffer, offset).end()
+        if not started and buffer.startswith('[', offset):
+            offset += 1
+            started = True
+            continue
+        if buffer.startswith(']', offset):
+            return
+
+        if offset < len(buffer):
+            try:
+                obj, offset = decoder.raw_decode(buffer, offset)
+            except json.JSONDecodeError:
+                if eof:
+                    yield position + 1, ValueError('Malformed JSON')
+                    return
+            else:
+                position += 1
+                yield position, obj
+                continue
+        elif eof:
+            return
+
+        # Need more input: drop what has been consumed and read the next block
+        buffer = buffer[offset:]
+        offset = 0
+        chunk = text.read(read_size)
+        if not chunk:
+            eof = True
+        buffer += chunk
+
+
+def iter_rows(stream, fmt):
+    """Yield (line, row) pairs from a binary or text stream"""
+    if fmt not in FORMATS:
+        raise ValueError(f'Unsupported import format: {fmt!r}')
+    if isinstance(stream, io.TextIOBase):
+        text = stream
+    else:
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        return _iter_csv(text)
+    return _iter_json(text)
+
+
+def build_activity(user, row, catalogue):
+    """Validate one parsed row and return an unsaved Activity"""
+    if not isinstance(row, dict):
+        raise ValueError('Expected an object with factor, quantity and date')
+
+    name = str(row.get('factor') or '').strip()
+    if not name:
+        raise ValueError('Missing factor')
+    factor = catalogue.find(name)
+    if factor is None:
+        raise ValueError(f'Unknown emission factor: {name!r}')
+
+    try:
+        quantity = float(row.get('quantity'))
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid quantity: {row.get("quantity")!r}')
+    if quantity < 0 or not math.isfinite(quantity):
+        raise ValueError(f'Invalid quantity: {row.get("quantity")!r}')
+
+    try:
+        day = parse_date(str(row.get('date') or '').strip())
+    except ValueError:
+        day = None  # well-formed but not a real date, such as 2025-02-30
+    if day is None:
+        raise ValueError(f'Invalid date: {row.get("date")!r} (expected YYYY-MM-DD)')
+
+    notes = str(row.get('notes') or '')[:MAX_NOTES_LENGTH]
+    # Assign ids rather than instances: it skips per-object relation checks
+    return Activity(
+        user_id=user.pk,
+        emission_factor_id=factor.pk,
+        quantity=quantity,
+        date=day,
+        notes=notes,
+        co2_emissions=quantity * catalogue.value_on(factor, day),
+    )
+
+
+def import_activities(user, stream, fmt, chunk_size=CHUNK_SIZE, strict=False, before_commit=None):
+    """
+    Import activities for user from stream, returns an ImportResult.
+
+    before_commit, if given, is called with the result inside the import
+    transaction once every row is written; raising from it rolls the whole
+    import back.
+    """
+    # The user's region is resolved once for the whole file
+    catalogue = get_catalogue(region_for(user))
+    result = ImportResult()
+    buckets = {}
+
+    def flush(chunk):
+        Activity.objects.bulk_create(chunk, batch_size=chunk_size)
+        result.created += len(chunk)
+        for activity in chunk:
+            key = (activity.date, catalogue.get(activity.emission_factor_id).category)
+            co2, count = buckets.get(key, (0, 0))
+            buckets[key] = (co2 + activity.co2_emissions, count + 1)
+
+    with transaction.atomic():
+        chunk = []
+        line = 0
+        try:
+            for line, row in iter_rows(stream, fmt):
+                try:
+                    if isinstance(row, Exception):
+                        raise row
+                    chunk.append(build_activity(user, row, catalogue))
+                except ValueError as exc:
+                    result.add_error(line, str(exc))
+                    continue
+                if len(chunk) >= chunk_size:
+                    flush(chunk)
+                    chunk = []
+        except (UnicodeDecodeError, csv.Error) as exc:
+            # Nothing after this point can be read, so none of the file is kept
+            result.add_error(line + 1, f'Unreadable file: {exc}')
+            raise ImportAborted(result, 'The file could not be read, import rolled back')
+        if chunk:
+            flush(chunk)
+
+        if strict and result.errors:
+            raise ImportAborted(result)
+
+        for (day, category), (co2, count) in buckets.items():
+            rollups.apply_delta(user.pk, day, category, co2, count, refresh_goals=False)
+        goals.refresh_days(user.pk, [day for day, category in buckets])
+        if before_commit is not None:
+            before_commit(result)
+        if result.created:
+            transaction.on_commit(lambda: versioning.bump_user_version(user.pk))
+
+    return result
@@ -0,0 +1,292 @@
+"""
+A small database-backed queue for recomputation that is too slow for a request.
+
+enqueue() stores a Job naming one of the TASKS and returns straight away;
+``manage.py run_worker`` claims due jobs and runs them in a pool of worker
+processes. Because the job row is written in the caller's transaction, a
+job enqueued from a signal or view is only visible to workers once that
+transaction commits, and disappears with it on rollback.
+
+Jobs are claimed with a conditional UPDATE (queued -> running), so any
+number of workers can poll the same table without taking a job twice. A
+failing job is retried with exponential backoff until max_attempts, and a
+running job whose heartbeat stops (the worker was killed) is put back in
+the queue by requeue_stale(). Tasks report progress with
+Job.report_progress(), which also refreshes the heartbeat, and the admin
+shows it. A run that was requeued from under it (its worker was only slow)
+records nothing when it finishes: results and retries are written only for
+the attempt that currently owns the job.
+
+A job may carry an idempotency key: while a job with that key is queued,
+enqueueing another returns the queued one instead of adding a duplicate.
+Tasks read the current state of the database when they run, so repeated
+edits collapse into a single recomputation. Only queued jobs are matched:
+a change made while its job is already running queues a fresh one.
+
+With GREENSTEPS_JOBS_INLINE (the development default) jobs run in the
+enqueueing process as soon as the transaction commits, so no worker is
+needed while developing or testing.
+"""
+import hashlib
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import importers, leaderboard, pricing, rollups
+from .models import EmissionFactor, Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 3
+# Seconds before the first retry; doubled for every attempt after that
+RETRY_DELAY = 30
+# Due jobs looked at per claim, in case other workers take the first ones
+CLAIM_BATCH = 10
+# Users per step of a full rollup rebuild, between progress reports
+REBUILD_CHUNK = 500
+# Rows of import errors kept on the job for the import page
+MAX_IMPORT_ERRORS = 100
+
+
+class Superseded(Exception):
+    """Raised by a task whose job was requeued by requeue_stale() while it ran"""
+
+
+def _reprice_factor(job, factor_id, start=None, end=None):
+    factor = EmissionFactor.objects.filter(pk=factor_id).first()
+    if factor is None:
+        return {'repriced': 0}  # deleted since, along with its activities
+    return {'repriced': pricing.reprice_factor(
+        factor, progress=job.report_progress,
+        start=parse_date(start) if start else None, end=parse_date(end) if end else None,
+    )}
+
+
+def _reprice_factors(job, factor_ids):
+    repriced = 0
+    for done, factor in enumerate(EmissionFactor.objects.filter(pk__in=factor_ids).order_by('pk'), 1):
+        repriced += pricing.reprice_factor(factor)
+        job.report_progress(done, len(factor_ids), 'factors repriced')
+    return {'repriced': repriced}
+
+
+def _reprice_user(job, user_id):
+    return {'repriced': pricing.reprice_user(user_id)}
+
+
+def _rebuild_factor_rollups(job, factor_id):
+    rollups.rebuild_for_factor(factor_id, progress=job.report_progress)
+    return {}
+
+
+def _rebuild_rollups(job, user_ids=None):
+    if user_ids is None:
+        user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+    created = 0
+    for start in range(0, len(user_ids), REBUILD_CHUNK):
+        created += rollups.rebuild(user_ids=user_ids[start:start + REBUILD_CHUNK])
+        job.report_progress(min(start + REBUILD_CHUNK, len(user_ids)), len(user_ids), 'users rebuilt')
+    return {'buckets': created}
+
+
+def _refresh_leaderboard(job, period, day=None):
+    return {'ranked': leaderboard.refresh(period, parse_date(day) if day else None)}
+
+
+def _import_activities(job, path, fmt):
+    # The import is a single transaction, so a heartbeat written while it runs
+    # would not be seen by requeue_stale() until the end. Instead the job row
+    # is claimed in that transaction: if the job was requeued meanwhile this
+    # run rolls back, otherwise the rows and the fresh heartbeat commit
+    # together, so the file is imported exactly once.
+    job.report_progress(0, message='importing')
+
+    def claim_result(result):
+        if not Job.objects.filter(pk=job.pk, status=Job.RUNNING, attempts=job.attempts).update(
+            progress_done=result.created, progress_total=result.created,
+            message='activities imported', heartbeat_at=timezone.now(),
+        ):
+            raise Superseded(f'Job {job.pk} was requeued during attempt {job.attempts}')
+
+    try:
+        with default_storage.open(path, 'rb') as stream:
+            result = importers.import_activities(job.user, stream, fmt, before_commit=claim_result)
+    except importers.ImportAborted as exc:
+        # An unreadable file fails the same way every time, so report it instead of retrying
+        default_storage.delete(path)
+        return {
+            'created': 0,
+            'error_count': len(exc.result.errors),
+            'errors': exc.result.errors[:MAX_IMPORT_ERRORS],
+        }
+    except Superseded:
+        # The attempt that owns the job now still needs the file
+        raise
+    except Exception:
+        if job.attempts >= job.max_attempts:
+            default_storage.delete(path)
+        raise
+    default_storage.delete(path)
+    return {
+        'created': result.created,
+        'error_count': len(result.errors),
+        'errors': result.errors[:MAX_IMPORT_ERRORS],
+    }
+
+
+# Task name -> callable taking the job and its payload, returning a JSON-able result
+TASKS = {
+    'reprice_factor': _reprice_factor,
+    'reprice_factors': _reprice_factors,
+    'reprice_user': _reprice_user,
+    'rebuild_factor_rollups': _rebuild_factor_rollups,
+    'rebuild_rollups': _rebuild_rollups,
+    'refresh_leaderboard': _refresh_leaderboard,
+    'import_activities': _import_activities,
+}
+
+
+def key_for(kind, *parts):
+    """Idempotency key for kind and parts, hashed when too long for Job.key"""
+    key = ':'.join([kind, *map(str, parts)])
+    if len(key) > Job._meta.get_field('key').max_length:
+        key = f'{kind}:{hashlib.sha256(key.encode()).hexdigest()}'
+    return key
+
+
+def enqueue(kind, payload=None, key='', user=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Queue a job, or return the already queued job with the same key"""
+    if kind not in TASKS:
+        raise ValueError(f'Unknown job kind: {kind!r}')
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                job = Job.objects.create(
+                    kind=kind, key=key, payload=payload or {}, user=user, max_attempts=max_attempts,
+                )
+            break
+        except IntegrityError:
+            if not key:
+                raise
+            existing = Job.objects.filter(key=key, status=Job.QUEUED).first()
+            if existing is not None:
+                return existing
+            # Claimed between the insert and the lookup: queue a fresh one
+    else:
+        raise RuntimeError(f'Could not enqueue {kind} job with key {key!r}')
+
+    if settings.GREENSTEPS_JOBS_INLINE:
+        transaction.on_commit(lambda: run_now(job.pk))
+    return job
+
+
+def claim(worker='', job_id=None):
+    """Mark the oldest due job (or job_id, if due) as running and return it, or None"""
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('run_after', 'id')
+    if job_id is not None:
+        due = due.filter(pk=job_id)
+    for pk in due.values_list('pk', flat=True)[:CLAIM_BATCH]:
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, attempts=F('attempts') + 1, started_at=now, heartbeat_at=now, worker=worker,
+        )
+        if claimed:
+            return Job.objects.select_related('user').get(pk=pk)
+    return None
+
+
+def execute(job):
+    """Run a claimed job and record its result, or schedule a retry"""
+    task = TASKS.get(job.kind)
+    if task is None:
+        _finish(job, Job.FAILED, error=f'Unknown job kind: {job.kind!r}')
+        return
+    try:
+        result = task(job, **job.payload)
+    except Superseded:
+        logger.warning('Job %s (%s) attempt %s was superseded', job.pk, job.kind, job.attempts)
+    except Exception:
+        logger.exception('Job %s (%s) failed on attempt %s', job.pk, job.kind, job.attempts)
+        retry_or_fail(job, traceback.format_exc())
+    else:
+        _finish(job, Job.DONE, result=result)
+
+
+def run_now(job_id):
+    """Claim and run one job in this process, if no worker has taken it yet"""
+    job = claim(worker=f'inline:{os.getpid()}', job_id=job_id)
+    if job is not None:
+        execute(job)
+
+
+def _finish(job, status, result=None, error=''):
+    # Only the running attempt records anything; a job requeued by requeue_stale() is left to its next run
+    Job.objects.filter(pk=job.pk, status=Job.RUNNING, attempts=job.attempts).update(
+        status=status, result=result, error=error, finished_at=timezone.now(),
+    )
+
+
+def retry_or_fail(job, error):
+    if job.attempts >= job.max_attempts:
+        _finish(job, Job.FAILED, error=error)
+        return
+    delay = timedelta(seconds=RETRY_DELAY * 2 ** max(job.attempts - 1, 0))
+    try:
+        with transaction.atomic():
+            Job.objects.filter(pk=job.pk, status=Job.RUNNING, attempts=job.attempts).update(
+                status=Job.QUEUED, run_after=timezone.now() + delay, error=error,
+            )
+    except IntegrityError:
+        # A newer job with the same key is queued and will redo the work
+        _finish(job, Job.FAILED, error=error + '\nSuperseded by a newer queued job with the same key')
+
+
+def requeue_stale(timeout=None):
+    """Retry (or fail) running jobs whose heartbeat is older than timeout seconds, returns their count"""
+    if timeout is None:
+        timeout = settings.GREENSTEPS_JOB_TIMEOUT
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = list(Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=cutoff))
+    for job in stale:
+        logger.warning('Job %s (%s) on %s stopped responding', job.pk, job.kind, job.worker)
+        retry_or_fail(job, f'Worker {job.worker} stopped responding')
+    return len(stale)
+
+
+def default_worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def work(stop=None, once=False, poll_interval=1.0, worker=None):
+    """
+    Claim and run due jobs until stop (an Event) is set or, with once, until
+    none are due. Returns the number of jobs run.
+    """
+    worker = worker or default_worker_name()
+    count = 0
+    while stop is None or not stop.is_set():
+        close_old_connections()
+        job = claim(worker)
+        if job is None:
+            if once:
+                break
+            if stop is None:
+                time.sleep(poll_interval)
+            else:
+                stop.wait(poll_interval)
+            continue
+        execute(job)
+        count += 1
+    close_old_connections()
+    return count
@@ -0,0 +1,175 @@
+"""
+Precomputed weekly and monthly leaderboards, overall and per location.
+
+refresh() ranks every user who logged activities in a period by their CO2
+total (rank 1 is the lowest). It runs one grouped query over that period's
+DailyEmission buckets and writes a LeaderboardEntry per user plus a
+LeaderboardCohort per ranked group. Ranks are competition ranks, so equal
+totals share a rank, and a percentile is the share of the group with a
+strictly higher total. Users are grouped by their profile's normalised
+region (tracker.regions); users without a location are only ranked overall.
+
+Refreshing is periodic: the ``refresh_leaderboard`` command rebuilds the
+current periods. Reads never aggregate activity: leaderboard() looks up the
+user's entry and cohorts by unique key, and the top-N list walks a rank
+index, so a page view costs the same with ten users or a million.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import DailyEmission, LeaderboardCohort, LeaderboardEntry
+
+BATCH_SIZE = 2000
+PERIODS = ('week', 'month')
+SCOPES = ('all', 'location')
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+
+def period_bounds(period, day):
+    """First and last day of the week (Monday first) or month containing day"""
+    if period == 'week':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if period == 'month':
+        start = day.replace(day=1)
+        return start, (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    raise ValueError(f'period must be one of {", ".join(PERIODS)}')
+
+
+def _standings(totals):
+    """(rank, percentile) for each of a group's totals, which must be sorted"""
+    size = len(totals)
+    for total in totals:
+        higher = size - bisect_right(totals, total)
+        yield bisect_left(totals, total) + 1, round(100 * higher / size, 1)
+
+
+def refresh(period, day=None):
+    """Rank every user with activity in the period containing day, returns the ranked user count"""
+    if day is None:
+        day = date.today()
+    start, end = period_bounds(period, day)
+    rows = (
+        DailyEmission.objects.filter(date__gte=start, date__lte=end)
+        .order_by()
+        .values('user_id', location=F('user__userprofile__region'))
+        .annotate(total=Sum('total_co2'), count=Sum('activity_count'))
+        .filter(count__gt=0)
+    )
+    # Rounded so that float noise in the sums doesn't split ties
+    ranked = sorted(
+        (round(row['total'] or 0, 3), row['user_id'], row['location'] or '')
+        for row in rows.iterator(chunk_size=BATCH_SIZE)
+    )
+
+    entries = []
+    for (total, user_id, location), (rank, percentile) in zip(ranked, _standings([row[0] for row in ranked])):
+        entries.append(LeaderboardEntry(
+            period=period, start=start, user_id=user_id, location=location,
+            total_co2=total, rank=rank, percentile=percentile,
+        ))
+
+    by_location = {}
+    for entry in entries:
+        if entry.location:
+            by_location.setdefault(entry.location, []).append(entry)
+    for group in by_location.values():
+        # entries are in total order, so each group already is too
+        for entry, (rank, percentile) in zip(group, _standings([entry.total_co2 for entry in group])):
+            entry.location_rank = rank
+            entry.location_percentile = percentile
+
+    refreshed_at = timezone.now()
+    cohorts = [LeaderboardCohort(period=period, start=start, location='', size=len(entries), refreshed_at=refreshed_at)]
+    cohorts.extend(
+        LeaderboardCohort(period=period, start=start, location=location, size=len(group), refreshed_at=refreshed_at)
+        for location, group in by_location.items()
+    )
+
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(period=period, start=start).delete()
+        LeaderboardCohort.objects.filter(period=period, start=start).delete()
+        LeaderboardEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+        LeaderboardCohort.objects.bulk_create(cohorts, batch_size=BATCH_SIZE)
+    return len(entries)
+
+
+def latest_start(period, today=None):
+    """Start of the most recent refreshed period that has begun, or None"""
+    if today is None:
+        today = date.today()
+    return LeaderboardCohort.objects.filter(
+        period=period, location='', start__lte=today
+    ).order_by('-start').values_list('start', flat=True).first()
+
+
+def _standing(rank, percentile, cohort):
+    if rank is None:
+        return None
+    return {'rank': rank, 'percentile': percentile, 'size': cohort.size if cohort else 0}
+
+
+def leaderboard(user, period='week', scope='all', limit=DEFAULT_LIMIT, today=None):
+    """
+    The latest refreshed ranking for period: the user's overall and location
+    standings, and the top of the list for scope ('all' or 'location')
+    """
+    if period not in PERIODS:
+        raise ValueError(f'period must be one of {", ".join(PERIODS)}')
+    if scope not in SCOPES:
+        raise ValueError(f'scope must be one of {", ".join(SCOPES)}')
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    start = latest_start(period, today)
+    result = {
+        'period': period,
+        'scope': scope,
+        'start': None,
+        'end': None,
+        'refreshed_at': None,
+        'location': None,
+        'total': None,
+        'overall': None,
+        'local': None,
+        'top': [],
+    }
+    if start is None:
+        return result
+    result['start'] = start.isoformat()
+    result['end'] = period_bounds(period, start)[1].isoformat()
+
+    entry = LeaderboardEntry.objects.filter(period=period, start=start, user=user).first()
+    location = entry.location if entry else ''
+    cohorts = {
+        cohort.location: cohort
+        for cohort in LeaderboardCohort.objects.filter(period=period, start=start, location__in={'', location})
+    }
+    result['refreshed_at'] = cohorts[''].refreshed_at.isoformat() if '' in cohorts else None
+    if entry:
+        result['location'] = location or None
+        result['total'] = entry.total_co2
+        result['overall'] = _standing(entry.rank, entry.percentile, cohorts.get(''))
+        result['local'] = _standing(entry.location_rank, entry.location_percentile, cohorts.get(location))
+
+    entries = LeaderboardEntry.objects.filter(period=period, start=start).select_related('user')
+    if scope == 'location':
+        if not location:
+            return result
+        entries = entries.filter(location=location).order_by('location_rank', 'user_id')
+    else:
+        entries = entries.order_by('rank', 'user_id')
+    result['top'] = [
+        {
+            'rank': item.location_rank if scope == 'location' else item.rank,
+            'username': item.user.username,
+            'total': item.total_co2,
+            'is_you': item.user_id == user.pk,
+        }
+        for item in entries[:limit]
+    ]
+    return result
@@ -0,0 +1,134 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from tracker import synthetic
+from tracker.catalogue import get_catalogue
+from tracker.pagination import DEFAULT_PAGE_SIZE, ORDERING
+from tracker.models import Activity, DailyEmission, EmissionFactor
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic dataset and report EXPLAIN plans and timings for the '
+        "views' queries without and with the Activity composite indexes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Synthetic users to create')
+        parser.add_argument('--activities', type=int, default=2000, help='Activities per user')
+        parser.add_argument('--days', type=int, default=730, help='Days of history to spread activities over')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the dataset')
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the synthetic data instead of rolling it back',
+        )
+
+    def handle(self, *args, **options):
+        if not EmissionFactor.objects.exists():
+            raise CommandError('No emission factors found; run populate_emission_factors first')
+
+        try:
+            with transaction.atomic():
+                self.run(options)
+                if not options['keep']:
+                    raise Rollback
+        except Rollback:
+            self.stdout.write('Synthetic data rolled back.')
+
+    def run(self, options):
+        total = options['users'] * options['activities']
+        self.stdout.write(f'Seeding {options["users"]} users x {options["activities"]} activities ({total} rows)...')
+        started = time.perf_counter()
+        users = synthetic.generate(
+            users=options['users'],
+            activities_per_user=options['activities'],
+            days=options['days'],
+            seed=options['seed'],
+            prefix='bench',
+        )
+        self.stdout.write(f'Seeded in {time.perf_counter() - started:.1f}s')
+        self.analyze()
+
+        workload = self.workload(users[0])
+        indexes = Activity._meta.indexes
+        # The editor is used for SQL generation only: entering it as a context
+        # manager is refused by SQLite inside the surrounding atomic() block.
+        editor = connection.schema_editor(atomic=False)
+        editor.deferred_sql = []
+
+        for index in indexes:
+            editor.execute(index.remove_sql(Activity, editor))
+        self.analyze()
+        before = self.measure(workload, options['repeat'], 'without composite indexes')
+
+        for index in indexes:
+            editor.execute(index.create_sql(Activity, editor))
+        self.analyze()
+        after = self.measure(workload, options['repeat'], 'with composite indexes')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('\nSummary (median ms)'))
+        for name in workload:
+            speedup = before[name] / after[name] if after[name] else float('inf')
+            self.stdout.write(
+                f'  {name:<32} {before[name]:>9.3f} -> {after[name]:>9.3f}  ({speedup:.1f}x)'
+            )
+
+    def workload(self, user):
+        """The hot queries issued by each view for one user"""
+        today = date.today()
+        week_ago = today - timedelta(days=7)
+        month_ago = today - timedelta(days=30)
+        activities = Activity.objects.filter(user=user)
+        transport = get_catalogue().ids_for_category('transport')
+        return {
+            'home: week total': DailyEmission.objects.filter(
+                user=user, date__gte=week_ago
+            ).values('user').annotate(total=Sum('total_co2')),
+            'dashboard: recent activities': activities.select_related('emission_factor')[:10],
+            'dashboard: 30 day rollup': DailyEmission.objects.filter(
+                user=user, date__gte=month_ago
+            ).values('date', 'category').annotate(total=Sum('total_co2')),
+            'activities: date range page': activities.filter(
+                date__gte=month_ago, date__lte=today
+            ).select_related('emission_factor').order_by(*ORDERING)[:DEFAULT_PAGE_SIZE + 1],
+            'activities: category page': activities.filter(
+                emission_factor_id__in=transport, date__gte=week_ago
+            ).select_related('emission_factor').order_by(*ORDERING)[:DEFAULT_PAGE_SIZE + 1],
+            'activities: filtered totals': activities.filter(
+                date__gte=month_ago, date__lte=today
+            ).values('user').annotate(count=Count('id'), co2=Sum('co2_emissions')),
+            'tips: 30 day categories': activities.filter(
+                date__gte=month_ago
+            ).values('emission_factor__category').annotate(total=Sum('co2_emissions')),
+        }
+
+    def measure(self, workload, repeat, label):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n=== {label} ==='))
+        results = {}
+        for name, query in workload.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(query.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+            self.stdout.write(self.style.SUCCESS(f'\n{name}: median {results[name]:.3f} ms'))
+            for line in query.explain().splitlines():
+                self.stdout.write(f'    {line}')
+        return results
+
+    def analyze(self):
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
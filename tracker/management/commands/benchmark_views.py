@@ -0,0 +1,204 @@
+import json
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import date, datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from tracker import synthetic, versioning
+from tracker.catalogue import get_catalogue
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the main views through the test client and report p50/p95 latency, '
+        'query counts and peak memory per view. Results can be saved as JSON and '
+        'compared against an earlier run to spot regressions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Benchmark as this existing user instead of seeding one')
+        parser.add_argument('--activities', type=int, default=5000, help='Activities to seed for the benchmark user')
+        parser.add_argument('--days', type=int, default=365, help='Days of history to seed')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the seeded data')
+        parser.add_argument('--repeat', type=int, default=30, help='Timed requests per view')
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help="Invalidate the user's cached pages before every request, to measure the uncached path",
+        )
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Compare against results saved by an earlier --output')
+        parser.add_argument(
+            '--threshold', type=float, default=10.0,
+            help='Percent change in p95 or queries that counts as a regression (default 10)',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as handle:
+                    baseline = json.load(handle)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Could not read {options["compare"]}: {exc}')
+
+        # Everything, including the seeded user and added activities, is rolled back
+        try:
+            with transaction.atomic():
+                user = self.benchmark_user(options)
+                results = self.run(user, options)
+                raise Rollback
+        except Rollback:
+            pass
+        # Pages cached from the rolled-back data must not outlive it
+        versioning.bump_user_version(user.pk)
+
+        report = {
+            'commit': self.commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'options': {key: options[key] for key in ('activities', 'days', 'repeat', 'cold')},
+            'results': results,
+        }
+        self.print_results(results)
+        if baseline:
+            self.print_comparison(baseline, report, options['threshold'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f'\nResults written to {options["output"]}')
+
+    def benchmark_user(self, options):
+        if options['user']:
+            try:
+                return User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'No such user: {options["user"]}')
+        try:
+            user, = synthetic.generate(
+                users=1,
+                activities_per_user=options['activities'],
+                days=options['days'],
+                seed=options['seed'],
+                prefix='benchmark',
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        return user
+
+    def run(self, user, options):
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        factor = get_catalogue().factors[0]
+
+        scenarios = [
+            ('home', lambda: client.get(reverse('home'))),
+            ('dashboard', lambda: client.get(reverse('dashboard'))),
+            ('activities_list', lambda: client.get(reverse('activities_list'))),
+            ('tips', lambda: client.get(reverse('tips'))),
+            ('api_weekly_data', lambda: client.get(reverse('api_weekly_data'))),
+            # Last, since every write invalidates the user's cached pages
+            ('add_activity', lambda: client.post(reverse('add_activity'), {
+                'emission_factor': factor.pk,
+                'quantity': 1,
+                'date': date.today().isoformat(),
+                'notes': '',
+            })),
+        ]
+
+        results = {}
+        for name, request in scenarios:
+            self.stdout.write(f'Benchmarking {name}...')
+            results[name] = self.measure(user, request, options['repeat'], options['cold'])
+        return results
+
+    def measure(self, user, request, repeat, cold):
+        def call():
+            if cold:
+                versioning.bump_user_version(user.pk)
+            response = request()
+            if response.status_code >= 400:
+                raise CommandError(f'Request failed with status {response.status_code}')
+            return response
+
+        call()  # warm up imports, templates and caches
+        timings = []
+        queries = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                call()
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+
+        # Separate pass: tracemalloc slows everything down
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            call()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        timings.sort()
+        return {
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(timings[max(0, int(round(len(timings) * 0.95)) - 1)], 3),
+            'queries': max(queries),
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+    def commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def print_results(self, results):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'\n{"view":<18} {"p50 ms":>9} {"p95 ms":>9} {"queries":>8} {"peak KiB":>10}'
+        ))
+        for name, item in results.items():
+            self.stdout.write(
+                f'{name:<18} {item["p50_ms"]:>9.2f} {item["p95_ms"]:>9.2f} '
+                f'{item["queries"]:>8} {item["peak_kib"]:>10.1f}'
+            )
+
+    def print_comparison(self, baseline, report, threshold):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'\nCompared with {baseline.get("commit") or "baseline"} ({baseline.get("timestamp")})'
+        ))
+        regressions = 0
+        for name, item in report['results'].items():
+            before = baseline.get('results', {}).get(name)
+            if not before:
+                self.stdout.write(f'{name:<18} (not in baseline)')
+                continue
+            changes = []
+            regressed = False
+            for key in ('p95_ms', 'queries', 'peak_kib'):
+                change = (item[key] - before[key]) / before[key] * 100 if before[key] else 0
+                changes.append(f'{key} {before[key]} -> {item[key]} ({change:+.0f}%)')
+                if key != 'peak_kib' and change > threshold:
+                    regressed = True
+            line = f'{name:<18} ' + '   '.join(changes)
+            if regressed:
+                regressions += 1
+                line = self.style.ERROR(line + '  REGRESSION')
+            self.stdout.write(line)
+        if regressions:
+            self.stdout.write(self.style.ERROR(f'\n{regressions} views regressed by more than {threshold:.0f}%'))
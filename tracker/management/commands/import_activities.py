@@ -0,0 +1,64 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker import importers
+
+
+class Command(BaseCommand):
+    help = 'Bulk import a CSV or JSON file of activities for a user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV, JSON array or newline-delimited JSON file')
+        parser.add_argument('--user', required=True, help='Username to import activities for')
+        parser.add_argument(
+            '--format',
+            choices=importers.FORMATS,
+            help='Input format (default: guessed from the file extension)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=importers.CHUNK_SIZE,
+            help='Rows validated and inserted per batch',
+        )
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Roll back the whole import if any row is invalid',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["user"]}" does not exist')
+
+        fmt = options['format'] or importers.detect_format(options['path'])
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as stream:
+                result = importers.import_activities(
+                    user, stream, fmt,
+                    chunk_size=options['chunk_size'],
+                    strict=options['strict'],
+                )
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except importers.ImportAborted as exc:
+            self.report_errors(exc.result)
+            raise CommandError(str(exc))
+
+        self.report_errors(result)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Imported {result.created} activities for {user.username} '
+                f'in {time.perf_counter() - started:.2f}s '
+                f'({len(result.errors)} rows skipped)'
+            )
+        )
+
+    def report_errors(self, result):
+        for line, message in result.errors:
+            self.stderr.write(f'Row {line}: {message}')
@@ -0,0 +1,108 @@
+import statistics
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ['/api/weekly-data/', '/dashboard/', '/activities/', '/']
+
+
+class Command(BaseCommand):
+    help = (
+        'Load a running server with concurrent requests to the read-heavy pages and '
+        'report throughput and latency. Pass several base URLs to compare them, e.g. '
+        'the sync views under WSGI (GREENSTEPS_ASYNC_VIEWS=0 gunicorn GreenSteps.wsgi:application '
+        '--workers 4 --bind 127.0.0.1:8001) against the async views under ASGI '
+        '(GREENSTEPS_ASYNC_VIEWS=1 uvicorn GreenSteps.asgi:application --port 8002).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='Base URL of each server, e.g. http://127.0.0.1:8001')
+        parser.add_argument('--username', required=True, help='Account to log in as')
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--path', action='append', dest='paths', help='Path to request (repeatable)')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per path')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent client threads')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        results = {}
+        for base_url in options['urls']:
+            base_url = base_url.rstrip('/')
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n=== {base_url} ==='))
+            session = self.login(base_url, options['username'], options['password'], options['timeout'])
+            for path in paths:
+                stats = self.load(base_url + path, session, options)
+                results[base_url, path] = stats
+                self.stdout.write(self.format(path, stats))
+
+        if len(options['urls']) > 1:
+            self.stdout.write(self.style.MIGRATE_HEADING('\nSummary (requests/s)'))
+            for path in paths:
+                rates = '  '.join(
+                    f'{results[url.rstrip("/"), path]["rate"]:8.1f}' for url in options['urls']
+                )
+                self.stdout.write(f'  {path:<24} {rates}')
+
+    def login(self, base_url, username, password, timeout):
+        """Log in through the auth views and return the session cookie header"""
+        jar = CookieJar()
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+        login_url = base_url + '/accounts/login/'
+        try:
+            opener.open(login_url, timeout=timeout).read()
+            csrf = next((cookie.value for cookie in jar if cookie.name == 'csrftoken'), '')
+            data = urllib.parse.urlencode({
+                'username': username,
+                'password': password,
+                'csrfmiddlewaretoken': csrf,
+            }).encode()
+            request = urllib.request.Request(login_url, data=data, headers={'Referer': login_url})
+            opener.open(request, timeout=timeout).read()
+        except (urllib.error.URLError, OSError) as exc:
+            raise CommandError(f'Could not log in at {login_url}: {exc}')
+
+        cookies = {cookie.name: cookie.value for cookie in jar}
+        if 'sessionid' not in cookies:
+            raise CommandError(f'Login as {username!r} at {login_url} failed')
+        return '; '.join(f'{name}={value}' for name, value in cookies.items())
+
+    def load(self, url, session, options):
+        def fetch(_):
+            request = urllib.request.Request(url, headers={'Cookie': session})
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=options['timeout']) as response:
+                    response.read()
+                    ok = response.status == 200
+            except (urllib.error.URLError, OSError):
+                ok = False
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            samples = list(pool.map(fetch, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(duration * 1000 for duration, ok in samples if ok)
+        return {
+            'rate': len(latencies) / elapsed if elapsed else 0,
+            'errors': sum(1 for duration, ok in samples if not ok),
+            'p50': statistics.median(latencies) if latencies else 0,
+            'p95': latencies[max(0, int(len(latencies) * 0.95) - 1)] if latencies else 0,
+            'max': latencies[-1] if latencies else 0,
+        }
+
+    def format(self, path, stats):
+        line = (
+            f'  {path:<24} {stats["rate"]:8.1f} req/s   p50 {stats["p50"]:7.1f} ms   '
+            f'p95 {stats["p95"]:7.1f} ms   max {stats["max"]:7.1f} ms'
+        )
+        if stats['errors']:
+            line += self.style.ERROR(f'   {stats["errors"]} errors')
+        return line
@@ -0,0 +1,65 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker import perf
+
+
+class Command(BaseCommand):
+    help = (
+        'Summarise the per-request records that tracker.perf appends to '
+        'GREENSTEPS_PERF_LOG: latency percentiles, queries, DB and template time per view'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('log', nargs='?', help='JSON-lines log file (default: GREENSTEPS_PERF_LOG)')
+        parser.add_argument('--since', type=float, help='Only include the last N minutes')
+        parser.add_argument('--view', help='Only include this view name')
+        parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+
+    def handle(self, *args, **options):
+        path = options['log'] or settings.GREENSTEPS_PERF_LOG
+        if not path:
+            raise CommandError('No log file given and GREENSTEPS_PERF_LOG is not set')
+
+        cutoff = time.time() - options['since'] * 60 if options['since'] else None
+        entries = []
+        try:
+            with open(path, encoding='utf-8') as log:
+                for line in log:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if cutoff and entry.get('timestamp', 0) < cutoff:
+                        continue
+                    if options['view'] and entry.get('view') != options['view']:
+                        continue
+                    entries.append(entry)
+        except OSError as exc:
+            raise CommandError(f'Could not read {path}: {exc}')
+
+        summary = perf.summarize(entries)
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        if not summary:
+            self.stdout.write('No matching requests recorded.')
+            return
+
+        budget = settings.GREENSTEPS_PERF_QUERY_BUDGET
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{"view":<28} {"requests":>8} {"p50 ms":>9} {"p95 ms":>9} '
+            f'{"queries":>8} {"max":>5} {"db ms":>8} {"tmpl ms":>8}'
+        ))
+        for item in summary:
+            line = (
+                f'{item["view"]:<28} {item["requests"]:>8} {item["p50_ms"]:>9.1f} {item["p95_ms"]:>9.1f} '
+                f'{item["avg_queries"]:>8.1f} {item["max_queries"]:>5} {item["avg_db_ms"]:>8.1f} '
+                f'{item["avg_template_ms"]:>8.1f}'
+            )
+            if item['max_queries'] > budget:
+                line = self.style.WARNING(line + f'  over query budget ({budget})')
+            self.stdout.write(line)
@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker import goals
+
+
+class Command(BaseCommand):
+    help = 'Rebuild goal days, monthly goal counters and streaks from the daily emissions rollup'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            help='Only rebuild goal state for this username (may be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+            user_ids = list(users.values_list('id', flat=True))
+            if len(user_ids) != len(set(options['usernames'])):
+                raise CommandError('One or more usernames do not exist')
+
+        self.stdout.write('Rebuilding goal tracking state...')
+        created = goals.rebuild(user_ids=user_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f'Goal state rebuilt: {created} logged days')
+        )
@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker import jobs, rollups
+
+
+class Command(BaseCommand):
+    help = 'Backfill or rebuild the daily emissions rollup table from activities'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            help='Only rebuild rollups for this username (may be repeated)',
+        )
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help='Queue the rebuild for run_worker instead of running it now',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+            user_ids = list(users.values_list('id', flat=True))
+            if len(user_ids) != len(set(options['usernames'])):
+                raise CommandError('One or more usernames do not exist')
+
+        if options['enqueue']:
+            key = jobs.key_for('rebuild_rollups', *(sorted(user_ids) if user_ids is not None else ['all']))
+            job = jobs.enqueue('rebuild_rollups', {'user_ids': user_ids}, key=key)
+            self.stdout.write(self.style.SUCCESS(f'Queued rollup rebuild as job {job.pk}'))
+            return
+
+        self.stdout.write('Rebuilding daily emission rollups...')
+        created = rollups.rebuild(user_ids=user_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f'Rollups rebuilt: {created} daily buckets')
+        )
@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from tracker import jobs, leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Recompute weekly and monthly leaderboard totals, ranks and percentiles from the daily emissions rollup'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--period',
+            action='append',
+            dest='periods',
+            choices=leaderboard.PERIODS,
+            help='Only refresh this period type (may be repeated, default: all)',
+        )
+        parser.add_argument('--date', help='Refresh the periods containing this date (YYYY-MM-DD, default today)')
+        parser.add_argument(
+            '--previous',
+            action='store_true',
+            help='Also refresh the period before, to pick up late edits once it has closed',
+        )
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help='Queue the refreshes for run_worker instead of running them now',
+        )
+
+    def handle(self, *args, **options):
+        day = date.today()
+        if options['date']:
+            try:
+                day = parse_date(options['date'])
+            except ValueError:
+                day = None
+            if day is None:
+                raise CommandError(f'Invalid date: {options["date"]}')
+
+        for period in options['periods'] or leaderboard.PERIODS:
+            start, end = leaderboard.period_bounds(period, day)
+            starts = [start]
+            if options['previous']:
+                starts.append(leaderboard.period_bounds(period, start - timedelta(days=1))[0])
+            for start in starts:
+                if options['enqueue']:
+                    job = jobs.enqueue(
+                        'refresh_leaderboard', {'period': period, 'day': start.isoformat()},
+                        key=jobs.key_for('refresh_leaderboard', period, start),
+                    )
+                    self.stdout.write(self.style.SUCCESS(f'{period} of {start}: queued as job {job.pk}'))
+                    continue
+                ranked = leaderboard.refresh(period, start)
+                self.stdout.write(self.style.SUCCESS(f'{period} of {start}: {ranked} users ranked'))
@@ -0,0 +1,96 @@
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from tracker import jobs
+
+# Seconds between checks for dead worker processes and abandoned jobs
+SUPERVISE_INTERVAL = 5
+
+
+def _worker_process(stop, poll_interval):
+    # The parent handles signals and tells the pool to stop through the event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    jobs.work(stop=stop, poll_interval=poll_interval)
+
+
+class Command(BaseCommand):
+    help = (
+        'Run background jobs (re-pricing, rollup rebuilds, imports, leaderboard refreshes) '
+        'in a pool of worker processes until interrupted'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Worker processes in the pool (default 2)')
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds an idle worker waits before looking for new jobs',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the jobs that are due in this process, then exit',
+        )
+
+    def handle(self, *args, **options):
+        requeued = jobs.requeue_stale()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} abandoned jobs'))
+
+        if options['once']:
+            count = jobs.work(once=True)
+            self.stdout.write(self.style.SUCCESS(f'Ran {count} jobs'))
+            return
+
+        processes = options['processes']
+        if processes < 1:
+            raise CommandError('--processes must be at least 1')
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError('The worker pool needs the fork start method; use --once from a scheduler instead')
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        # Only flagged in the signal handler: setting the event there could
+        # deadlock if the signal arrives while this process holds its lock
+        stopping = []
+
+        def shutdown(signum, frame):
+            stopping.append(signum)
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        def start():
+            # Children must not share the parent's database connections
+            connections.close_all()
+            process = context.Process(target=_worker_process, args=(stop, options['poll_interval']))
+            process.start()
+            return process
+
+        pool = [start() for _ in range(processes)]
+        self.stdout.write(self.style.SUCCESS(f'Worker pool started with {processes} processes'))
+        next_check = time.monotonic() + SUPERVISE_INTERVAL
+        while not stopping:
+            time.sleep(0.2)
+            if stopping or time.monotonic() < next_check:
+                continue
+            next_check = time.monotonic() + SUPERVISE_INTERVAL
+            for index, process in enumerate(pool):
+                if not process.is_alive():
+                    self.stdout.write(self.style.WARNING(
+                        f'Worker {process.pid} exited with code {process.exitcode}, restarting'
+                    ))
+                    pool[index] = start()
+            requeued = jobs.requeue_stale()
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'Requeued {requeued} abandoned jobs'))
+
+        self.stdout.write('Stopping after the current jobs...')
+        stop.set()
+        started = time.monotonic()
+        for process in pool:
+            process.join()
+        self.stdout.write(self.style.SUCCESS(f'Worker pool stopped in {time.monotonic() - started:.1f}s'))
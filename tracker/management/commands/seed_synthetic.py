@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from tracker import synthetic
+from tracker.models import Activity
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-generate synthetic users and activities with realistic category, '
+        'quantity and date distributions, for local load tests and benchmarks'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Users to create')
+        parser.add_argument('--activities', type=int, default=1000, help='Activities per user')
+        parser.add_argument('--days', type=int, default=365, help='Days of history to spread activities over')
+        parser.add_argument('--seed', type=int, help='Random seed, for a reproducible dataset')
+        parser.add_argument('--prefix', default='synthetic', help='Username prefix (users are <prefix>-<n>)')
+        parser.add_argument(
+            '--password',
+            help='Password for every generated user, so they can log in (default: unusable)',
+        )
+
+    def handle(self, *args, **options):
+        total = options['users'] * options['activities']
+        self.stdout.write(f'Generating {options["users"]} users x {options["activities"]} activities ({total} rows)...')
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                users = synthetic.generate(
+                    users=options['users'],
+                    activities_per_user=options['activities'],
+                    days=options['days'],
+                    seed=options['seed'],
+                    prefix=options['prefix'],
+                    password=options['password'],
+                )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        if not users:
+            self.stdout.write('No users created.')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} users ({users[0].username} .. {users[-1].username}) '
+            f'and {total} activities in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)\n'
+            f'Total activities in database: {Activity.objects.count()}'
+        ))
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def backfill_rollups(apps, schema_editor):
+    Activity = apps.get_model("tracker", "Activity")
+    DailyEmission = apps.get_model("tracker", "DailyEmission")
+    rows = (
+        Activity.objects.order_by()
+        .values("user_id", "date", "emission_factor__category")
+        .annotate(
+            total=Sum(F("quantity") * F("emission_factor__co2_per_unit")),
+            count=Count("id"),
+        )
+    )
+    DailyEmission.objects.bulk_create(
+        [
+            DailyEmission(
+                user_id=row["user_id"],
+                date=row["date"],
+                category=row["emission_factor__category"],
+                total_co2=row["total"] or 0,
+                activity_count=row["count"],
+            )
+            for row in rows.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyEmission",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "category",
+                    models.CharField(
+                        choices=[
+                            ("transport", "Transportation"),
+                            ("energy", "Energy"),
+                            ("food", "Food"),
+                            ("digital", "Digital"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "total_co2",
+                    models.FloatField(
+                        default=0, help_text="Summed CO2 emissions in kg"
+                    ),
+                ),
+                ("activity_count", models.PositiveIntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-date", "category"],
+                "unique_together": {("user", "date", "category")},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:22
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def backfill_co2_emissions(apps, schema_editor):
+    Activity = apps.get_model("tracker", "Activity")
+    EmissionFactor = apps.get_model("tracker", "EmissionFactor")
+    co2_per_unit = EmissionFactor.objects.filter(
+        pk=OuterRef("emission_factor_id")
+    ).values("co2_per_unit")[:1]
+    Activity.objects.update(co2_emissions=F("quantity") * Subquery(co2_per_unit))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0002_dailyemission"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="activity",
+            name="co2_emissions",
+            field=models.FloatField(
+                db_index=True,
+                default=0,
+                editable=False,
+                help_text="CO2 emissions in kg, snapshotted when the activity is saved",
+            ),
+        ),
+        migrations.RunPython(backfill_co2_emissions, migrations.RunPython.noop),
+    ]
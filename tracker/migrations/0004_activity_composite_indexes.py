@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0003_activity_co2_emissions"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="activity",
+            index=models.Index(
+                fields=["user", "-date", "-created_at"], name="activity_user_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="activity",
+            index=models.Index(
+                fields=["user", "emission_factor", "-date"],
+                name="activity_user_factor_date_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0004_activity_composite_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="activity",
+            name="activity_user_date_idx",
+        ),
+        migrations.AddIndex(
+            model_name="activity",
+            index=models.Index(
+                fields=["user", "-date", "-created_at", "-id"],
+                name="activity_user_date_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The tips previously hardcoded in views.tips; a blank category is general
+TIPS = {
+    "transport": [
+        "Try walking or cycling for trips under 2km",
+        "Use public transport instead of driving alone",
+        "Consider carpooling for longer journeys",
+        "Work from home when possible to reduce commuting",
+    ],
+    "energy": [
+        "Switch to LED light bulbs",
+        "Unplug electronics when not in use",
+        "Set your thermostat 1-2 degrees lower in winter",
+        "Use energy-efficient appliances",
+    ],
+    "food": [
+        "Try 'Meatless Monday' or reduce meat consumption",
+        "Buy local and seasonal produce",
+        "Reduce food waste by meal planning",
+        "Choose organic options when possible",
+    ],
+    "digital": [
+        "Stream videos in lower quality when possible",
+        "Reduce email subscriptions and delete unused accounts",
+        "Use cloud storage efficiently",
+        "Choose dark mode to save device energy",
+    ],
+    "": [
+        "Start tracking your daily activities to identify improvement areas",
+        "Set a daily CO₂ goal and try to stay under it",
+        "Make one small sustainable change each week",
+        "Share your progress with friends to stay motivated",
+    ],
+}
+
+
+def seed_tips(apps, schema_editor):
+    Tip = apps.get_model("tracker", "Tip")
+    Tip.objects.bulk_create(
+        [
+            Tip(category=category, text=text, order=order)
+            for category, texts in TIPS.items()
+            for order, text in enumerate(texts)
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0005_activity_keyset_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tip",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "category",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("transport", "Transportation"),
+                            ("energy", "Energy"),
+                            ("food", "Food"),
+                            ("digital", "Digital"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("text", models.CharField(max_length=255)),
+                ("order", models.PositiveIntegerField(default=0)),
+                ("is_active", models.BooleanField(default=True)),
+                (
+                    "emission_factor",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Only shown to users who log this factor",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="tracker.emissionfactor",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["category", "order", "id"],
+            },
+        ),
+        migrations.RunPython(seed_tips, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,169 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:56
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_goals(apps, schema_editor):
+    DailyEmission = apps.get_model("tracker", "DailyEmission")
+    UserProfile = apps.get_model("tracker", "UserProfile")
+    GoalDay = apps.get_model("tracker", "GoalDay")
+    GoalMonth = apps.get_model("tracker", "GoalMonth")
+    GoalStreak = apps.get_model("tracker", "GoalStreak")
+
+    goals = dict(UserProfile.objects.values_list("user_id", "daily_goal"))
+    rows = (
+        DailyEmission.objects.order_by("user_id", "date")
+        .values("user_id", "date")
+        .annotate(total=Sum("total_co2"), count=Sum("activity_count"))
+    )
+    days, counters, runs = [], {}, []
+    for row in rows.iterator():
+        if not row["count"]:
+            continue
+        user_id, day, total = row["user_id"], row["date"], row["total"] or 0
+        hit = total <= goals.get(user_id, 10.0)
+        days.append(GoalDay(user_id=user_id, date=day, total_co2=total, hit=hit))
+        month = day.replace(day=1)
+        tracked_days, hit_days = counters.get((user_id, month), (0, 0))
+        counters[user_id, month] = (tracked_days + 1, hit_days + int(hit))
+        if hit:
+            last = runs[-1] if runs else None
+            if last and last.user_id == user_id and last.end == day - timedelta(days=1):
+                last.end = day
+                last.length += 1
+            else:
+                runs.append(GoalStreak(user_id=user_id, start=day, end=day, length=1))
+
+    GoalDay.objects.bulk_create(days, batch_size=1000)
+    GoalMonth.objects.bulk_create(
+        [
+            GoalMonth(user_id=user_id, month=month, tracked_days=tracked, hit_days=hit)
+            for (user_id, month), (tracked, hit) in counters.items()
+        ],
+        batch_size=1000,
+    )
+    GoalStreak.objects.bulk_create(runs, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0006_tip"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GoalDay",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "total_co2",
+                    models.FloatField(
+                        default=0, help_text="The day's CO2 emissions in kg"
+                    ),
+                ),
+                (
+                    "hit",
+                    models.BooleanField(
+                        default=False, help_text="Total was within the daily goal"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-date"],
+                "unique_together": {("user", "date")},
+            },
+        ),
+        migrations.CreateModel(
+            name="GoalMonth",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(help_text="First day of the month")),
+                ("tracked_days", models.PositiveIntegerField(default=0)),
+                ("hit_days", models.PositiveIntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-month"],
+                "unique_together": {("user", "month")},
+            },
+        ),
+        migrations.CreateModel(
+            name="GoalStreak",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("start", models.DateField()),
+                ("end", models.DateField()),
+                (
+                    "length",
+                    models.PositiveIntegerField(default=1, help_text="Days in the run"),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-end"],
+                "indexes": [
+                    models.Index(
+                        fields=["user", "end"], name="goalstreak_user_end_idx"
+                    ),
+                    models.Index(
+                        fields=["user", "start"], name="goalstreak_user_start_idx"
+                    ),
+                    models.Index(
+                        fields=["user", "-length"], name="goalstreak_user_length_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_goals, migrations.RunPython.noop),
+    ]
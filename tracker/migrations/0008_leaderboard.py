@@ -0,0 +1,139 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0007_goal_tracking"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaderboardCohort",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("week", "Week"), ("month", "Month")], max_length=5
+                    ),
+                ),
+                ("start", models.DateField(help_text="First day of the period")),
+                (
+                    "location",
+                    models.CharField(
+                        blank=True,
+                        help_text="Normalised location, blank for all users",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "size",
+                    models.PositiveIntegerField(default=0, help_text="Ranked users"),
+                ),
+                ("refreshed_at", models.DateTimeField()),
+            ],
+            options={
+                "ordering": ["-start", "period", "location"],
+            },
+        ),
+        migrations.CreateModel(
+            name="LeaderboardEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("week", "Week"), ("month", "Month")], max_length=5
+                    ),
+                ),
+                ("start", models.DateField(help_text="First day of the period")),
+                (
+                    "location",
+                    models.CharField(
+                        blank=True,
+                        help_text="Normalised UserProfile.location",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "total_co2",
+                    models.FloatField(
+                        default=0, help_text="CO2 emissions over the period in kg"
+                    ),
+                ),
+                (
+                    "rank",
+                    models.PositiveIntegerField(
+                        help_text="1 is the lowest total among all users"
+                    ),
+                ),
+                (
+                    "percentile",
+                    models.FloatField(
+                        help_text="Share of all users with a higher total"
+                    ),
+                ),
+                ("location_rank", models.PositiveIntegerField(blank=True, null=True)),
+                ("location_percentile", models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                "ordering": ["period", "-start", "rank"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="dailyemission",
+            index=models.Index(
+                fields=["date", "user"], name="dailyemission_date_user_idx"
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="leaderboardcohort",
+            unique_together={("period", "start", "location")},
+        ),
+        migrations.AddField(
+            model_name="leaderboardentry",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="leaderboardentry",
+            index=models.Index(
+                fields=["period", "start", "rank", "user"], name="leaderboard_rank_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="leaderboardentry",
+            index=models.Index(
+                fields=["period", "start", "location", "location_rank", "user"],
+                name="leaderboard_location_rank_idx",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="leaderboardentry",
+            unique_together={("period", "start", "user")},
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:11
+
+from django.db import migrations, models
+
+
+def merge_duplicate_factors(apps, schema_editor):
+    """
+    Fold factors whose category and name differ only in case into the
+    oldest of them, so the natural key can be made unique
+    """
+    EmissionFactor = apps.get_model("tracker", "EmissionFactor")
+    kept = {}
+    duplicates = {}
+    for pk, category, name in EmissionFactor.objects.order_by("pk").values_list(
+        "pk", "category", "name"
+    ):
+        key = (category, name.lower())
+        if key in kept:
+            duplicates[pk] = kept[key]
+        else:
+            kept[key] = pk
+    if not duplicates:
+        return
+
+    models_by_name = {model.__name__: model for model in apps.get_app_config("tracker").get_models()}
+    Version = models_by_name.get("EmissionFactorVersion")
+    Regional = models_by_name.get("RegionalFactor")
+    for duplicate, target in duplicates.items():
+        for name in ("Activity", "Tip"):
+            models_by_name[name].objects.filter(emission_factor_id=duplicate).update(
+                emission_factor_id=target
+            )
+        # Two version histories cannot be interleaved; the kept factor's wins
+        if Version is not None:
+            versions = Version.objects.filter(factor_id=duplicate)
+            if Version.objects.filter(factor_id=target).exists():
+                versions.delete()
+            versions.update(factor_id=target)
+        # Regional values are merged, the kept factor's winning per region
+        if Regional is not None:
+            regional = Regional.objects.filter(factor_id=duplicate)
+            taken = Regional.objects.filter(factor_id=target).values_list("region", flat=True)
+            regional.filter(region__in=list(taken)).delete()
+            regional.update(factor_id=target)
+    EmissionFactor.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0009_job_queue"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmissionFactorDataset",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+                ("version", models.CharField(blank=True, max_length=50)),
+                (
+                    "checksum",
+                    models.CharField(
+                        help_text="SHA-256 of the file as last loaded", max_length=64
+                    ),
+                ),
+                ("factor_count", models.PositiveIntegerField(default=0)),
+                ("loaded_at", models.DateTimeField()),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.RunPython(merge_duplicate_factors, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="emissionfactor",
+            constraint=models.UniqueConstraint(
+                fields=("category", "name"), name="emissionfactor_category_name_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0010_factor_datasets"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmissionFactorVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "co2_per_unit",
+                    models.FloatField(
+                        help_text="CO2 emissions in kg per unit over this range"
+                    ),
+                ),
+                ("valid_from", models.DateField()),
+                (
+                    "valid_to",
+                    models.DateField(
+                        blank=True,
+                        help_text="First day no longer covered, blank for open-ended",
+                        null=True,
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        blank=True,
+                        help_text="Where the value comes from",
+                        max_length=200,
+                    ),
+                ),
+                (
+                    "factor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="versions",
+                        to="tracker.emissionfactor",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["factor", "valid_from"],
+                "constraints": [
+                    models.CheckConstraint(
+                        condition=models.Q(
+                            ("valid_to__isnull", True),
+                            ("valid_to__gt", models.F("valid_from")),
+                            _connector="OR",
+                        ),
+                        name="emissionfactorversion_range_valid",
+                    )
+                ],
+                "unique_together": {("factor", "valid_from")},
+            },
+        ),
+    ]
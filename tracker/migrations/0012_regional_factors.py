@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0011_factor_versions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RegionalFactor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "region",
+                    models.CharField(
+                        help_text="Matched against UserProfile.location, ignoring case and spacing",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "co2_per_unit",
+                    models.FloatField(
+                        help_text="CO2 emissions in kg per unit in this region"
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        blank=True,
+                        help_text="Where the value comes from",
+                        max_length=200,
+                    ),
+                ),
+                (
+                    "factor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="regional_values",
+                        to="tracker.emissionfactor",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["region", "factor"],
+                "unique_together": {("region", "factor")},
+            },
+        ),
+    ]
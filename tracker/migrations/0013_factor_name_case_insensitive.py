@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:04
+
+from importlib import import_module
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+# Databases migrated before 0010 merged duplicates may hold factors whose
+# names differ only in case; fold them before the constraint ignores case
+merge_duplicate_factors = import_module(
+    "tracker.migrations.0010_factor_datasets"
+).merge_duplicate_factors
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0012_regional_factors"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="emissionfactor",
+            name="emissionfactor_category_name_uniq",
+        ),
+        migrations.RunPython(merge_duplicate_factors, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="emissionfactor",
+            constraint=models.UniqueConstraint(
+                models.F("category"),
+                django.db.models.functions.text.Lower("name"),
+                name="emissionfactor_category_lower_name_uniq",
+                violation_error_message="A factor with this name already exists in this category.",
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:06
+
+from django.db import migrations, models
+
+from tracker.regions import normalise_location
+
+BATCH_SIZE = 500
+
+
+def backfill_region(apps, schema_editor):
+    UserProfile = apps.get_model("tracker", "UserProfile")
+    profiles = []
+    for profile in UserProfile.objects.exclude(location="").only("location").iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        profile.region = normalise_location(profile.location)
+        profiles.append(profile)
+    UserProfile.objects.bulk_update(profiles, ["region"], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0013_factor_name_case_insensitive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="region",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=100
+            ),
+        ),
+        migrations.RunPython(backfill_region, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db.models.functions import Lower
 from django.utils import timezone
 
+from .regions import normalise_location
+
 class EmissionFactor(models.Model):
     CATEGORY_CHOICES = [
         ('transport', 'Transportation'),
@@ -19,6 +23,99 @@ class EmissionFactor(models.Model):
     def __str__(self):
         return f"{self.name} ({self.co2_per_unit} kg CO2/{self.unit})"
 
+    class Meta:
+        constraints = [
+            # The natural key populate_emission_factors matches data files on,
+            # without case like the loader and FactorCatalogue.find()
+            models.UniqueConstraint(
+                'category', Lower('name'),
+                name='emissionfactor_category_lower_name_uniq',
+                violation_error_message='A factor with this name already exists in this category.',
+            ),
+        ]
+
+class EmissionFactorVersion(models.Model):
+    """
+    The factor's CO2 value from valid_from up to (not including) valid_to.
+    Activities dated outside every version use EmissionFactor.co2_per_unit.
+    """
+    factor = models.ForeignKey(EmissionFactor, on_delete=models.CASCADE, related_name='versions')
+    co2_per_unit = models.FloatField(help_text="CO2 emissions in kg per unit over this range")
+    valid_from = models.DateField()
+    valid_to = models.DateField(null=True, blank=True, help_text="First day no longer covered, blank for open-ended")
+    source = models.CharField(max_length=200, blank=True, help_text="Where the value comes from")
+
+    def clean(self):
+        if self.valid_to is not None and self.valid_from is not None and self.valid_to <= self.valid_from:
+            raise ValidationError({'valid_to': 'Must be after valid from.'})
+        if self.factor_id is None or self.valid_from is None:
+            return
+        overlapping = EmissionFactorVersion.objects.filter(factor_id=self.factor_id).exclude(pk=self.pk).filter(
+            models.Q(valid_to__isnull=True) | models.Q(valid_to__gt=self.valid_from)
+        )
+        if self.valid_to is not None:
+            overlapping = overlapping.filter(valid_from__lt=self.valid_to)
+        other = overlapping.first()
+        if other is not None:
+            raise ValidationError(f'Overlaps the version valid {other.range_display}.')
+
+    @property
+    def range_display(self):
+        return f"from {self.valid_from}" + (f" to {self.valid_to}" if self.valid_to else " on")
+
+    def __str__(self):
+        return f"{self.factor.name}: {self.co2_per_unit} kg CO2/{self.factor.unit} {self.range_display}"
+
+    class Meta:
+        unique_together = ('factor', 'valid_from')
+        ordering = ['factor', 'valid_from']
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(valid_to__isnull=True) | models.Q(valid_to__gt=models.F('valid_from')),
+                name='emissionfactorversion_range_valid',
+            ),
+        ]
+
+class RegionalFactor(models.Model):
+    """
+    The factor's CO2 value for users whose profile location is region. It
+    replaces the factor's own value and versions in that region.
+    """
+    region = models.CharField(max_length=100, help_text="Matched against UserProfile.location, ignoring case and spacing")
+    factor = models.ForeignKey(EmissionFactor, on_delete=models.CASCADE, related_name='regional_values')
+    co2_per_unit = models.FloatField(help_text="CO2 emissions in kg per unit in this region")
+    source = models.CharField(max_length=200, blank=True, help_text="Where the value comes from")
+
+    def clean(self):
+        # Before the unique check, so "Berlin" clashes with "berlin"
+        self.region = normalise_location(self.region)
+
+    def save(self, *args, **kwargs):
+        self.region = normalise_location(self.region)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.factor.name} in {self.region}: {self.co2_per_unit} kg CO2/{self.factor.unit}"
+
+    class Meta:
+        unique_together = ('region', 'factor')
+        ordering = ['region', 'factor']
+
+
+class EmissionFactorDataset(models.Model):
+    """A factor data file loaded by populate_emission_factors, see tracker.factor_sets"""
+    name = models.CharField(max_length=100, unique=True)
+    version = models.CharField(max_length=50, blank=True)
+    checksum = models.CharField(max_length=64, help_text="SHA-256 of the file as last loaded")
+    factor_count = models.PositiveIntegerField(default=0)
+    loaded_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} {self.version}".strip()
+
+    class Meta:
+        ordering = ['name']
+
 class Activity(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     emission_factor = models.ForeignKey(EmissionFactor, on_delete=models.CASCADE)
@@ -26,40 +123,311 @@ class Activity(models.Model):
     date = models.DateField(default=timezone.now)
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    co2_emissions = models.FloatField(
+        default=0,
+        db_index=True,
+        editable=False,
+        help_text="CO2 emissions in kg, snapshotted when the activity is saved"
+    )
 
-    @property
-    def co2_emissions(self):
-        return self.quantity * self.emission_factor.co2_per_unit
+    def calculate_emissions(self):
+        """Quantity times the factor's value on the activity's date in the user's region"""
+        from .catalogue import get_catalogue, region_for
+        day = self._meta.get_field('date').to_python(self.date)
+        return self.quantity * get_catalogue(region_for(self.user)).value_on(self.emission_factor, day)
+
+    def save(self, *args, **kwargs):
+        self.co2_emissions = self.calculate_emissions()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'co2_emissions' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['co2_emissions']
+        super().save(*args, **kwargs)
+
+    def as_dict(self):
+        """JSON-ready representation used by the API and infinite scroll"""
+        return {
+            'id': self.id,
+            'date': self.date.isoformat(),
+            'factor_id': self.emission_factor_id,
+            'factor': self.emission_factor.name,
+            'category': self.emission_factor.category,
+            'quantity': self.quantity,
+            'unit': self.emission_factor.unit,
+            'co2_emissions': round(self.co2_emissions, 3),
+            'notes': self.notes,
+        }
 
     def __str__(self):
         return f"{self.user.username} - {self.emission_factor.name} ({self.date})"
 
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Per-user history, date filters, the default ordering and keyset pages
+            models.Index(fields=['user', '-date', '-created_at', '-id'], name='activity_user_date_idx'),
+            # Per-user category filters resolved to factor ids
+            models.Index(fields=['user', 'emission_factor', '-date'], name='activity_user_factor_date_idx'),
+        ]
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     daily_goal = models.FloatField(default=10.0, help_text="Daily CO2 goal in kg")
     location = models.CharField(max_length=100, blank=True)
+    # location normalised; what RegionalFactor values and leaderboards match on
+    region = models.CharField(max_length=100, blank=True, editable=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
-    def get_weekly_emissions(self):
+    def save(self, *args, **kwargs):
+        # QuerySet.update(location=...) skips this; set region alongside it
+        self.region = normalise_location(self.location)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'location' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'region'}
+        super().save(*args, **kwargs)
+
+    def _weekly_buckets(self):
         from datetime import date, timedelta
         week_ago = date.today() - timedelta(days=7)
-        activities = Activity.objects.filter(
-            user=self.user,
+        return DailyEmission.objects.filter(
+            user_id=self.user_id,
             date__gte=week_ago
         )
-        return sum(activity.co2_emissions for activity in activities)
 
-    def get_daily_emissions(self, target_date=None):
+    def _daily_buckets(self, target_date=None):
         if target_date is None:
             target_date = timezone.now().date()
-        activities = Activity.objects.filter(
-            user=self.user,
+        return DailyEmission.objects.filter(
+            user_id=self.user_id,
             date=target_date
         )
-        return sum(activity.co2_emissions for activity in activities)
+
+    def get_weekly_emissions(self):
+        return self._weekly_buckets().aggregate(total=models.Sum('total_co2'))['total'] or 0
+
+    async def aget_weekly_emissions(self):
+        return (await self._weekly_buckets().aaggregate(total=models.Sum('total_co2')))['total'] or 0
+
+    def get_emissions_timeseries(self, start, end, granularity='day', by_category=False):
+        from .analytics import timeseries
+        return timeseries(self.user, start, end, granularity, by_category)
+
+    def get_daily_emissions(self, target_date=None):
+        return self._daily_buckets(target_date).aggregate(total=models.Sum('total_co2'))['total'] or 0
+
+    async def aget_daily_emissions(self, target_date=None):
+        return (await self._daily_buckets(target_date).aaggregate(total=models.Sum('total_co2')))['total'] or 0
+
+class DailyEmission(models.Model):
+    """Per-user, per-day, per-category CO2 rollup maintained by tracker.rollups"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField()
+    category = models.CharField(max_length=20, choices=EmissionFactor.CATEGORY_CHOICES)
+    total_co2 = models.FloatField(default=0, help_text="Summed CO2 emissions in kg")
+    activity_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.category} ({self.date}): {self.total_co2:.2f} kg"
+
+    class Meta:
+        unique_together = ('user', 'date', 'category')
+        ordering = ['-date', 'category']
+        indexes = [
+            # Every user's buckets in a date range, for the leaderboard refresh
+            models.Index(fields=['date', 'user'], name='dailyemission_date_user_idx'),
+        ]
+
+class GoalDay(models.Model):
+    """Whether a user's logged day stayed within their daily goal, maintained by tracker.goals"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField()
+    total_co2 = models.FloatField(default=0, help_text="The day's CO2 emissions in kg")
+    hit = models.BooleanField(default=False, help_text="Total was within the daily goal")
+
+    def __str__(self):
+        return f"{self.user.username} ({self.date}): {'hit' if self.hit else 'missed'}"
+
+    class Meta:
+        unique_together = ('user', 'date')
+        ordering = ['-date']
+
+class GoalMonth(models.Model):
+    """Per-user monthly counters of logged days and days within goal"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    month = models.DateField(help_text="First day of the month")
+    tracked_days = models.PositiveIntegerField(default=0)
+    hit_days = models.PositiveIntegerField(default=0)
+
+    @property
+    def hit_ratio(self):
+        return self.hit_days / self.tracked_days if self.tracked_days else 0
+
+    def __str__(self):
+        return f"{self.user.username} ({self.month:%Y-%m}): {self.hit_days}/{self.tracked_days}"
+
+    class Meta:
+        unique_together = ('user', 'month')
+        ordering = ['-month']
+
+class GoalStreak(models.Model):
+    """A run of consecutive days within goal, from start to end inclusive"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    start = models.DateField()
+    end = models.DateField()
+    length = models.PositiveIntegerField(default=1, help_text="Days in the run")
+
+    def __str__(self):
+        return f"{self.user.username}: {self.length} days ({self.start} to {self.end})"
+
+    class Meta:
+        ordering = ['-end']
+        indexes = [
+            models.Index(fields=['user', 'end'], name='goalstreak_user_end_idx'),
+            models.Index(fields=['user', 'start'], name='goalstreak_user_start_idx'),
+            models.Index(fields=['user', '-length'], name='goalstreak_user_length_idx'),
+        ]
+
+class LeaderboardCohort(models.Model):
+    """Size and refresh time of one ranked period, for all users or one location"""
+    PERIOD_CHOICES = [
+        ('week', 'Week'),
+        ('month', 'Month'),
+    ]
+
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    start = models.DateField(help_text="First day of the period")
+    location = models.CharField(max_length=100, blank=True, help_text="Normalised location, blank for all users")
+    size = models.PositiveIntegerField(default=0, help_text="Ranked users")
+    refreshed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.period} of {self.start} ({self.location or 'all users'}): {self.size} users"
+
+    class Meta:
+        unique_together = ('period', 'start', 'location')
+        ordering = ['-start', 'period', 'location']
+
+class LeaderboardEntry(models.Model):
+    """A user's CO2 total, ranks and percentiles for one period, maintained by tracker.leaderboard"""
+    period = models.CharField(max_length=5, choices=LeaderboardCohort.PERIOD_CHOICES)
+    start = models.DateField(help_text="First day of the period")
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    location = models.CharField(max_length=100, blank=True, help_text="Normalised UserProfile.location")
+    total_co2 = models.FloatField(default=0, help_text="CO2 emissions over the period in kg")
+    rank = models.PositiveIntegerField(help_text="1 is the lowest total among all users")
+    percentile = models.FloatField(help_text="Share of all users with a higher total")
+    location_rank = models.PositiveIntegerField(null=True, blank=True)
+    location_percentile = models.FloatField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user.username} ({self.period} of {self.start}): #{self.rank}"
+
+    class Meta:
+        unique_together = ('period', 'start', 'user')
+        ordering = ['period', '-start', 'rank']
+        indexes = [
+            # Top-N lists, overall and per location
+            models.Index(fields=['period', 'start', 'rank', 'user'], name='leaderboard_rank_idx'),
+            models.Index(fields=['period', 'start', 'location', 'location_rank', 'user'], name='leaderboard_location_rank_idx'),
+        ]
+
+class Job(models.Model):
+    """A unit of background work run by ``manage.py run_worker``, see tracker.jobs"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50, help_text="Task name in tracker.jobs.TASKS")
+    key = models.CharField(
+        max_length=200, blank=True,
+        help_text="Idempotency key: enqueueing while a job with this key is queued returns that job",
+    )
+    payload = models.JSONField(default=dict, blank=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Not picked up before this time")
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def is_active(self):
+        return self.status in (self.QUEUED, self.RUNNING)
+
+    def report_progress(self, done, total=None, message=None):
+        """Record how far a running job has got; also serves as its heartbeat"""
+        self.progress_done = done
+        if total is not None:
+            self.progress_total = total
+        if message is not None:
+            self.message = message[:255]
+        self.heartbeat_at = timezone.now()
+        Job.objects.filter(pk=self.pk).update(
+            progress_done=self.progress_done, progress_total=self.progress_total,
+            message=self.message, heartbeat_at=self.heartbeat_at,
+        )
+
+    def as_dict(self):
+        return {
+            'id': self.pk,
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'progress': {'done': self.progress_done, 'total': self.progress_total, 'message': self.message},
+            'result': self.result,
+            'error': self.error.strip().splitlines()[-1] if self.error else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Workers claim the oldest due job
+            models.Index(fields=['status', 'run_after', 'id'], name='job_status_run_after_idx'),
+            models.Index(fields=['user', '-created_at'], name='job_user_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'], condition=models.Q(status='queued') & ~models.Q(key=''),
+                name='job_queued_key_uniq',
+            ),
+        ]
+
+class Tip(models.Model):
+    """A sustainability tip for a category, a specific factor, or (neither) everyone"""
+    category = models.CharField(max_length=20, choices=EmissionFactor.CATEGORY_CHOICES, blank=True)
+    emission_factor = models.ForeignKey(
+        EmissionFactor, on_delete=models.CASCADE, null=True, blank=True,
+        help_text="Only shown to users who log this factor",
+    )
+    text = models.CharField(max_length=255)
+    order = models.PositiveIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return self.text
+
+    class Meta:
+        ordering = ['category', 'order', 'id']
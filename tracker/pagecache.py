@@ -0,0 +1,67 @@
+"""
+Per-user caching of page context and rendered fragments.
+
+A user's pages only change when their activities or profile change, when the
+factor catalogue changes, or when the day rolls over. user_data_version()
+combines those into one token. cached_context() keys the computed view
+context on it, so a repeat visit is answered from the cache and signal-driven
+stamp bumps (see tracker.signals) make the next visit rebuild. Templates pass
+the same token to {% cache %} to reuse rendered fragments.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import versioning
+from .catalogue import VERSION_KEY as CATALOGUE_VERSION_KEY
+
+# Bump the trailing version whenever a cached context changes shape, so a
+# deploy does not read entries written by the previous code
+KEY_PREFIX = 'greensteps:page:v2:'
+# Entries are never stale (the key changes with the data), the timeout only
+# bounds how long superseded versions occupy the cache
+TIMEOUT = getattr(settings, 'GREENSTEPS_PAGE_CACHE_TIMEOUT', 60 * 60)
+
+
+def user_data_version(user_id):
+    """Token that changes with the user's data, the catalogue and the date"""
+    return '{}-{}-{}'.format(
+        date.today().isoformat(),
+        versioning.get_user_version(user_id),
+        versioning.get_version(CATALOGUE_VERSION_KEY),
+    )
+
+
+async def auser_data_version(user_id):
+    return '{}-{}-{}'.format(
+        date.today().isoformat(),
+        await versioning.aget_user_version(user_id),
+        await versioning.aget_version(CATALOGUE_VERSION_KEY),
+    )
+
+
+def cached_context(user, name, build):
+    """
+    Return build()'s context dict for user, cached until their data changes.
+    The returned dict also carries cache_version and cache_timeout for the
+    template's fragment caches.
+    """
+    version = user_data_version(user.pk)
+    key = f'{KEY_PREFIX}{name}:{user.pk}:{version}'
+    context = cache.get(key)
+    if context is None:
+        context = build()
+        cache.set(key, context, TIMEOUT)
+    return dict(context, cache_version=version, cache_timeout=TIMEOUT)
+
+
+async def acached_context(user, name, build):
+    """cached_context() for async views; build is a coroutine function"""
+    version = await auser_data_version(user.pk)
+    key = f'{KEY_PREFIX}{name}:{user.pk}:{version}'
+    context = await cache.aget(key)
+    if context is None:
+        context = await build()
+        await cache.aset(key, context, TIMEOUT)
+    return dict(context, cache_version=version, cache_timeout=TIMEOUT)
@@ -0,0 +1,75 @@
+"""
+Keyset (cursor) pagination for activity history.
+
+Pages are ordered by (date, created_at, id) descending and each page is
+fetched with a range condition on that key instead of an OFFSET, so the cost
+of a page does not depend on how deep into the history it is.
+"""
+import base64
+from datetime import date, datetime
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+ORDERING = ('-date', '-created_at', '-id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(activity):
+    raw = f'{activity.date.isoformat()}|{activity.created_at.isoformat()}|{activity.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return the (date, created_at, id) key encoded in a cursor token"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        day, created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return date.fromisoformat(day), datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor(f'Invalid cursor: {token!r}') from exc
+
+
+def page_size_from(request, default=DEFAULT_PAGE_SIZE):
+    """Read ?page_size= from the request, capped at MAX_PAGE_SIZE"""
+    try:
+        size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _page_queryset(queryset, cursor):
+    queryset = queryset.order_by(*ORDERING)
+    if cursor:
+        day, created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(date__lt=day)
+            | Q(date=day, created_at__lt=created_at)
+            | Q(date=day, created_at=created_at, id__lt=pk)
+        )
+    return queryset
+
+
+def _split_page(items, page_size):
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(items[-1])
+    return items, next_cursor
+
+
+def paginate(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """Return (items, next_cursor) for the page after cursor"""
+    queryset = _page_queryset(queryset, cursor)
+    return _split_page(list(queryset[:page_size + 1]), page_size)
+
+
+async def apaginate(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """Async paginate()"""
+    queryset = _page_queryset(queryset, cursor)
+    return _split_page([item async for item in queryset[:page_size + 1]], page_size)
@@ -0,0 +1,168 @@
+"""
+Opt-in per-request performance instrumentation.
+
+With GREENSTEPS_PERF on, PerformanceMiddleware records for every request the
+view that handled it, its query count, time spent in the database (through a
+connection execute_wrapper), time spent rendering templates (through the
+TimedDjangoTemplates backend) and total latency. Records go into an
+in-process ring buffer read by the staff-only /perf/stats/ endpoint and,
+when GREENSTEPS_PERF_LOG is set, are appended to that file as JSON lines for
+manage.py perf_report. A request that runs more queries than
+GREENSTEPS_PERF_QUERY_BUDGET logs a warning on the 'tracker.perf' logger.
+"""
+import contextvars
+import json
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('tracker.perf')
+
+BUFFER_SIZE = getattr(settings, 'GREENSTEPS_PERF_BUFFER_SIZE', 1000)
+QUERY_BUDGET = 20
+
+_current = contextvars.ContextVar('greensteps_perf_record', default=None)
+_lock = threading.Lock()
+_buffer = deque(maxlen=BUFFER_SIZE)
+
+
+class RequestRecord:
+    """Costs accumulated while one request is handled"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Connection execute_wrapper: count and time every query
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        record = _current.get()
+        if record is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            record.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Django template backend that adds render time to the current record"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def record(entry):
+    with _lock:
+        _buffer.append(entry)
+    log_path = getattr(settings, 'GREENSTEPS_PERF_LOG', None)
+    if log_path:
+        with _lock, open(log_path, 'a', encoding='utf-8') as log:
+            log.write(json.dumps(entry) + '\n')
+
+
+def recent(limit=None):
+    """The newest records in the ring buffer, oldest first"""
+    with _lock:
+        entries = list(_buffer)
+    return entries[-limit:] if limit else entries
+
+
+def clear():
+    with _lock:
+        _buffer.clear()
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[max(0, int(round(len(values) * fraction)) - 1)]
+
+
+def summarize(entries):
+    """Per-view request count, latency percentiles and average costs, slowest first"""
+    by_view = {}
+    for entry in entries:
+        by_view.setdefault(entry['view'], []).append(entry)
+
+    summary = []
+    for view, rows in by_view.items():
+        totals = [row['total_ms'] for row in rows]
+        summary.append({
+            'view': view,
+            'requests': len(rows),
+            'p50_ms': round(statistics.median(totals), 2),
+            'p95_ms': round(_percentile(totals, 0.95), 2),
+            'avg_queries': round(statistics.mean(row['queries'] for row in rows), 1),
+            'max_queries': max(row['queries'] for row in rows),
+            'avg_db_ms': round(statistics.mean(row['db_ms'] for row in rows), 2),
+            'avg_template_ms': round(statistics.mean(row['template_ms'] for row in rows), 2),
+        })
+    summary.sort(key=lambda item: item['p95_ms'], reverse=True)
+    return summary
+
+
+class PerformanceMiddleware:
+    """Record per-request costs; removed from the stack unless GREENSTEPS_PERF is on"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'GREENSTEPS_PERF', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.query_budget = getattr(settings, 'GREENSTEPS_PERF_QUERY_BUDGET', QUERY_BUDGET)
+
+    def __call__(self, request):
+        current = RequestRecord()
+        token = _current.set(current)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(current))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        match = request.resolver_match
+        entry = {
+            'view': match.view_name if match else '<unresolved>',
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': current.queries,
+            'db_ms': round(current.db_time * 1000, 3),
+            'template_ms': round(current.template_time * 1000, 3),
+            'total_ms': round(total * 1000, 3),
+            'timestamp': time.time(),
+        }
+        record(entry)
+
+        if current.queries > self.query_budget:
+            logger.warning(
+                '%s ran %d queries (budget %d) for %s %s',
+                entry['view'], current.queries, self.query_budget, request.method, request.path,
+            )
+        return response
@@ -0,0 +1,123 @@
+"""
+Re-pricing of stored Activity.co2_emissions snapshots.
+
+Each activity stores the CO2 value computed when it was saved. What happens
+to those snapshots when an EmissionFactor's co2_per_unit is edited is set by
+the GREENSTEPS_FACTOR_REPRICING setting:
+
+``'all'`` (default)
+    Re-price every activity using the factor with one bulk UPDATE, then
+    rebuild the rollup buckets those activities belong to. This runs as a
+    background job (tracker.jobs), one user's buckets per transaction so
+    progress is visible; both steps only read current data, so a job that
+    fails part-way is simply run again.
+``'none'``
+    Keep existing snapshots; only activities saved from now on use the new
+    value.
+
+The same policy applies to EmissionFactorVersion edits, which only re-price
+activities dated within the old and new ranges of the version. Either way
+the UPDATE prices every activity with the value valid on its own date, in a
+single pass: price_expression() turns the factor's versions into one CASE.
+
+RegionalFactor values, and users moving to another region, are handled the
+same way: activities of users in a region with its own value for the factor
+get one more UPDATE per region, so a re-price costs a query per overriding
+region rather than per user or activity.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+
+from . import rollups
+from .models import Activity, EmissionFactor, RegionalFactor, UserProfile
+
+# User ids per UPDATE when re-pricing the activities of a region's users
+USER_BATCH = 500
+
+REPRICE_ALL = 'all'
+REPRICE_NONE = 'none'
+REPRICING_POLICIES = (REPRICE_ALL, REPRICE_NONE)
+
+
+def repricing_policy():
+    policy = getattr(settings, 'GREENSTEPS_FACTOR_REPRICING', REPRICE_ALL)
+    if policy not in REPRICING_POLICIES:
+        raise ValueError(
+            f"GREENSTEPS_FACTOR_REPRICING must be one of {REPRICING_POLICIES}, got {policy!r}"
+        )
+    return policy
+
+
+def price_expression(factor, versions=None):
+    """
+    SQL expression for an activity's quantity times factor's value on the
+    activity's date. versions defaults to the factor's saved versions.
+    """
+    if versions is None:
+        versions = factor.versions.all()
+    whens = []
+    for version in versions:
+        dates = {'date__gte': version.valid_from}
+        if version.valid_to is not None:
+            dates['date__lt'] = version.valid_to
+        whens.append(When(**dates, then=Value(version.co2_per_unit)))
+    if not whens:
+        return F('quantity') * factor.co2_per_unit
+    return F('quantity') * Case(*whens, default=Value(factor.co2_per_unit), output_field=FloatField())
+
+
+def reprice_factor(factor, progress=None, start=None, end=None):
+    """
+    Bulk-update the CO2 snapshot of every activity using factor, dated from
+    start up to (not including) end when given; returns the row count
+    """
+    activities = Activity.objects.filter(emission_factor=factor)
+    if start is not None:
+        activities = activities.filter(date__gte=start)
+    if end is not None:
+        activities = activities.filter(date__lt=end)
+    regional_values = dict(RegionalFactor.objects.filter(factor=factor).values_list('region', 'co2_per_unit'))
+    with transaction.atomic():
+        repriced = activities.update(co2_emissions=price_expression(factor))
+        for region, user_ids in users_by_region(regional_values).items():
+            for offset in range(0, len(user_ids), USER_BATCH):
+                activities.filter(user_id__in=user_ids[offset:offset + USER_BATCH]).update(
+                    co2_emissions=F('quantity') * regional_values[region]
+                )
+    rollups.rebuild_for_factor(factor.pk, progress, start=start, end=end)
+    return repriced
+
+
+def users_by_region(regions):
+    """region -> ids of users whose profile is in that region, for the given regions"""
+    by_region = {}
+    if not regions:
+        return by_region
+    profiles = UserProfile.objects.filter(region__in=list(regions)).order_by('user_id')
+    for region, user_id in profiles.values_list('region', 'user_id'):
+        by_region.setdefault(region, []).append(user_id)
+    return by_region
+
+
+def reprice_user(user_id):
+    """
+    Re-price all of a user's activities for their current region, one UPDATE
+    per factor they use, and rebuild their rollups; returns the row count
+    """
+    region = UserProfile.objects.filter(user_id=user_id).values_list('region', flat=True).first()
+    overrides = dict(RegionalFactor.objects.filter(region=region or '').values_list(
+        'factor_id', 'co2_per_unit'
+    ))
+    activities = Activity.objects.filter(user_id=user_id)
+    factor_ids = activities.order_by().values_list('emission_factor_id', flat=True).distinct()
+    repriced = 0
+    with transaction.atomic():
+        for factor in EmissionFactor.objects.filter(pk__in=factor_ids).prefetch_related('versions'):
+            if factor.pk in overrides:
+                co2 = F('quantity') * overrides[factor.pk]
+            else:
+                co2 = price_expression(factor, factor.versions.all())
+            repriced += activities.filter(emission_factor=factor).update(co2_emissions=co2)
+    rollups.rebuild(user_ids=[user_id])
+    return repriced
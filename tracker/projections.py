@@ -0,0 +1,289 @@
+"""
+Vectorised what-if scenarios and projections over a user's activity history.
+
+load_history() reads a user's activities in one values_list query into a
+History of parallel NumPy arrays: factor ids, quantities, days since the
+epoch and the stored CO2 of each activity. Everything else is array
+arithmetic on those columns. Daily totals are a bincount and rolling
+averages come from a cumulative sum. Annual projections extrapolate from
+the trailing daily rate. Factor substitutions ("replace 50% of my car km
+with train km") price every activity at the value its factor had on its
+date in the user's region, the same value its stored CO2 was computed with:
+unit_prices() finds it with one searchsorted over the catalogue's version
+ranges, falling back to a gather from the price vector.
+A multi-year history of tens of thousands of activities is evaluated in a
+few milliseconds once loaded. projection() keeps the loaded History in the
+per-user page cache (tracker.pagecache), so trying one swap after another
+only repeats the arithmetic until the user's data changes.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+
+from .catalogue import get_catalogue, region_for
+from .models import Activity
+from .pagecache import cached_context
+
+EPOCH = date(1970, 1, 1)
+DAYS_PER_YEAR = 365
+# Trailing window the daily rate for extrapolation is measured over
+RATE_WINDOW_DAYS = 90
+# Window a substitution scenario is evaluated over before annualising
+SCENARIO_WINDOW_DAYS = 365
+ROLLING_WINDOWS = (7, 30)
+CHART_DAYS = 90
+MAX_SWAPS = 5
+
+
+def day_number(day):
+    return (day - EPOCH).days
+
+
+# Version ranges are searched on factor_id * DAY_SPAN + day number + DAY_OFFSET,
+# which orders them by factor and then by start date in a single array
+DAY_OFFSET = -day_number(date.min)
+DAY_SPAN = day_number(date.max) + DAY_OFFSET + 1
+
+
+class History:
+    """A user's activities as columns: factor id, quantity, day number and stored CO2"""
+
+    def __init__(self, factor_ids, quantities, days, co2):
+        self.factor_ids = factor_ids
+        self.quantities = quantities
+        self.days = days
+        self.co2 = co2
+
+    def __len__(self):
+        return len(self.days)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (factor_id, quantity, date, co2_emissions) tuples"""
+        rows = list(rows)
+        if not rows:
+            return cls(
+                np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64), np.zeros(0)
+            )
+        factor_ids, quantities, dates, co2 = zip(*rows)
+        return cls(
+            np.fromiter(factor_ids, dtype=np.int64, count=len(rows)),
+            np.fromiter(quantities, dtype=np.float64, count=len(rows)),
+            np.fromiter((day_number(day) for day in dates), dtype=np.int64, count=len(rows)),
+            np.fromiter(co2, dtype=np.float64, count=len(rows)),
+        )
+
+    def window(self, start, end):
+        """Boolean mask of activities dated start..end (inclusive)"""
+        return (self.days >= day_number(start)) & (self.days <= day_number(end))
+
+    def daily_totals(self, start, end, co2=None):
+        """CO2 per day for start..end (inclusive) as an array, gaps filled with 0"""
+        co2 = self.co2 if co2 is None else co2
+        mask = self.window(start, end)
+        return np.bincount(
+            self.days[mask] - day_number(start),
+            weights=co2[mask],
+            minlength=(end - start).days + 1,
+        )
+
+
+def load_history(user, start=None, end=None):
+    """The user's activities (optionally limited to start..end) in one query"""
+    activities = Activity.objects.filter(user=user).order_by()
+    if start is not None:
+        activities = activities.filter(date__gte=start)
+    if end is not None:
+        activities = activities.filter(date__lte=end)
+    return History.from_rows(
+        activities.values_list('emission_factor_id', 'quantity', 'date', 'co2_emissions')
+    )
+
+
+def rolling_average(values, window):
+    """Trailing mean over window entries; the first entries average what exists"""
+    if len(values) == 0:
+        return values
+    sums = np.cumsum(values)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return sums / counts
+
+
+def annual_projection(history, today, rate_window=RATE_WINDOW_DAYS):
+    """
+    This year's CO2 so far, the daily rate over the trailing rate_window days
+    and the resulting year-end and 12-month projections.
+    """
+    year_start = today.replace(month=1, day=1)
+    year_end = today.replace(month=12, day=31)
+    year_to_date = float(history.co2[history.window(year_start, today)].sum())
+    rate_start = today - timedelta(days=rate_window - 1)
+    daily_rate = float(history.co2[history.window(rate_start, today)].sum()) / rate_window
+    return {
+        'year': today.year,
+        'year_to_date': round(year_to_date, 3),
+        'daily_rate': round(daily_rate, 3),
+        'rate_window_days': rate_window,
+        'projected_year_total': round(year_to_date + daily_rate * (year_end - today).days, 3),
+        'annualised': round(daily_rate * DAYS_PER_YEAR, 3),
+    }
+
+
+def price_vector(catalogue):
+    """co2_per_unit indexed by factor id (0 for unknown ids)"""
+    prices = np.zeros(max(catalogue.by_id, default=0) + 1)
+    for factor in catalogue.factors:
+        prices[factor.pk] = factor.co2_per_unit
+    return prices
+
+
+def unit_prices(catalogue, factor_ids, days):
+    """
+    catalogue.value_on(factor, day) for parallel arrays of factor ids and day
+    numbers: the regional value, else the version covering the day, else the
+    factor's co2_per_unit. Unknown ids are priced at 0.
+    """
+    prices = price_vector(catalogue)
+    known = factor_ids < len(prices)
+    factor_ids = np.where(known, factor_ids, 0)
+    result = prices[factor_ids]
+
+    keys, ends, values = [], [], []
+    for factor_id, (starts, valid_to, factor_values) in sorted(catalogue.versions.items()):
+        if factor_id in catalogue.overrides:
+            continue  # the regional value applies on every date
+        for valid_from, end, value in zip(starts, valid_to, factor_values):
+            keys.append(factor_id * DAY_SPAN + day_number(valid_from) + DAY_OFFSET)
+            ends.append(day_number(end) if end is not None else np.iinfo(np.int64).max)
+            values.append(value)
+    if keys:
+        keys = np.array(keys, dtype=np.int64)
+        ends = np.array(ends, dtype=np.int64)
+        position = np.searchsorted(keys, factor_ids * DAY_SPAN + days + DAY_OFFSET, side='right') - 1
+        found = np.maximum(position, 0)
+        # The range found must belong to the same factor and not have ended yet
+        covered = (position >= 0) & (keys[found] // DAY_SPAN == factor_ids) & (days < ends[found])
+        result = np.where(covered, np.array(values)[found], result)
+    return np.where(known, result, 0)
+
+
+def parse_swaps(values):
+    """Parse 'from_id:to_id[:share]' strings (share 0-1, default 1) into swaps"""
+    swaps = []
+    for value in values:
+        parts = value.split(':')
+        try:
+            if len(parts) not in (2, 3):
+                raise ValueError
+            swaps.append((int(parts[0]), int(parts[1]), float(parts[2]) if len(parts) == 3 else 1.0))
+        except ValueError:
+            raise ValueError(f'Invalid swap {value!r}: expected from_id:to_id[:share]')
+    return swaps
+
+
+def validate_swaps(swaps, catalogue):
+    """
+    Check (from_id, to_id, share) swaps and return them with their factors.
+    Both factors must exist and share a unit, so quantities carry over as-is.
+    """
+    if len(swaps) > MAX_SWAPS:
+        raise ValueError(f'At most {MAX_SWAPS} swaps per scenario')
+    checked = []
+    seen = set()
+    for from_id, to_id, share in swaps:
+        source, target = catalogue.get(from_id), catalogue.get(to_id)
+        if source is None or target is None:
+            raise ValueError('Unknown emission factor in swap')
+        if source.unit != target.unit:
+            raise ValueError(f'{source.name} ({source.unit}) cannot be swapped for {target.name} ({target.unit})')
+        if not 0 < share <= 1:
+            raise ValueError('Swap share must be between 0 and 1')
+        if from_id in seen:
+            raise ValueError(f'{source.name} is swapped more than once')
+        seen.add(from_id)
+        checked.append((source, target, share))
+    return checked
+
+
+def substitution(history, swaps, today, catalogue=None, window=SCENARIO_WINDOW_DAYS):
+    """
+    Evaluate swapping share of each source factor's quantity to the target
+    factor over the trailing window, annualised to a year.
+    """
+    catalogue = catalogue or get_catalogue()
+    checked = validate_swaps(swaps, catalogue)
+    start = today - timedelta(days=window - 1)
+    mask = history.window(start, today)
+    factor_ids = history.factor_ids[mask]
+    quantities = history.quantities[mask]
+    days = history.days[mask]
+    baseline = float(history.co2[mask].sum())
+
+    # Per-factor share moved and replacement factor, gathered per activity;
+    # both sides are priced on the activity's own date
+    size = max([int(factor_ids.max(initial=0))] + [source.pk for source, target, share in checked]) + 1
+    moved = np.zeros(size)
+    targets = np.arange(size)
+    for source, target, share in checked:
+        moved[source.pk] = share
+        targets[source.pk] = target.pk
+    delta = unit_prices(catalogue, factor_ids, days) - unit_prices(catalogue, targets[factor_ids], days)
+    savings = quantities * moved[factor_ids] * delta
+    saving = float(savings.sum())
+
+    scale = DAYS_PER_YEAR / window
+    return {
+        'window_days': window,
+        'swaps': [
+            {
+                'from': source.name,
+                'to': target.name,
+                'share': share,
+                'unit': source.unit,
+                'quantity': round(float(quantities[factor_ids == source.pk].sum()) * share, 3),
+                'saving': round(float(savings[factor_ids == source.pk].sum()), 3),
+            }
+            for source, target, share in checked
+        ],
+        'baseline': round(baseline, 3),
+        'scenario': round(baseline - saving, 3),
+        'saving': round(saving, 3),
+        'annual_saving': round(saving * scale, 3),
+        'saving_percentage': round(saving / baseline * 100, 1) if baseline else 0,
+    }
+
+
+def projection(user, swaps=(), today=None, chart_days=CHART_DAYS):
+    """
+    Daily series with rolling averages, the annual projection and, when
+    swaps are given, the substitution scenario for user, from one query.
+    """
+    if today is None:
+        today = date.today()
+    chart_start = today - timedelta(days=chart_days - 1)
+    # Rolling averages over the first chart days need the days before it too
+    lead = max(ROLLING_WINDOWS) - 1
+    start = min(
+        today.replace(month=1, day=1),
+        today - timedelta(days=max(SCENARIO_WINDOW_DAYS, RATE_WINDOW_DAYS) - 1),
+        chart_start - timedelta(days=lead),
+    )
+    # The page cache version includes the date, so start and end are fixed per key
+    name = f'projections:{today.isoformat()}:{chart_days}'
+    history = cached_context(user, name, lambda: {'history': load_history(user, start, today)})['history']
+
+    daily = history.daily_totals(chart_start - timedelta(days=lead), today)
+    series = {
+        'dates': [(chart_start + timedelta(days=offset)).isoformat() for offset in range(chart_days)],
+        'daily': np.round(daily[lead:], 3).tolist(),
+    }
+    for size in ROLLING_WINDOWS:
+        series[f'rolling_{size}'] = np.round(rolling_average(daily, size)[lead:], 3).tolist()
+
+    return {
+        'activities': len(history),
+        'series': series,
+        'annual': annual_projection(history, today),
+        'scenario': substitution(history, swaps, today, get_catalogue(region_for(user))) if swaps else None,
+    }
@@ -0,0 +1,152 @@
+"""
+Personalised tips and factor swap suggestions.
+
+Tips are stored as Tip rows and each process keeps them in a TipIndex, keyed
+by category and factor and reloaded when the 'tips' version stamp moves (the
+same scheme as tracker.catalogue). A user's recommendations come from one
+grouped query over their recent activities: per-factor quantity and CO2,
+with the quantity per day, which gives both the category ranking and the
+input for swap savings.
+"""
+import threading
+from datetime import date, timedelta
+
+from django.db.models import Sum
+
+from . import versioning
+from .catalogue import get_catalogue, region_for
+from .models import Activity, EmissionFactor, Tip
+
+VERSION_KEY = 'tips'
+WINDOW_DAYS = 30
+TOP_CATEGORIES = 3
+MAX_TIPS = 8
+MAX_SWAPS = 5
+
+_lock = threading.Lock()
+_cached = None
+
+
+class TipIndex:
+    """Active tips grouped for lookup by category and by factor"""
+
+    def __init__(self, tips, version=None):
+        self.version = version
+        self.general = []
+        self.by_category = {}
+        self.by_factor = {}
+        for tip in tips:
+            if tip.emission_factor_id is not None:
+                self.by_factor.setdefault(tip.emission_factor_id, []).append(tip.text)
+            elif tip.category:
+                self.by_category.setdefault(tip.category, []).append(tip.text)
+            else:
+                self.general.append(tip.text)
+
+
+def get_tip_index():
+    """Return this process's tip index, reloading it if the version moved on"""
+    global _cached
+    version = versioning.get_version(VERSION_KEY)
+    index = _cached
+    if index is not None and index.version == version:
+        return index
+
+    with _lock:
+        if _cached is None or _cached.version != version:
+            _cached = TipIndex(Tip.objects.filter(is_active=True), version=version)
+        return _cached
+
+
+def invalidate():
+    """Force every process to reload the tips on its next lookup"""
+    versioning.bump_version(VERSION_KEY)
+
+
+def factor_usage(user, start):
+    """
+    Return {factor_id: (quantity, co2, {date: quantity})} for the user's
+    activities from start
+    """
+    rows = Activity.objects.filter(user=user, date__gte=start).order_by().values(
+        'emission_factor_id', 'date'
+    ).annotate(quantity=Sum('quantity'), co2=Sum('co2_emissions'))
+    usage = {}
+    for row in rows:
+        quantity, co2, days = usage.get(row['emission_factor_id'], (0, 0, {}))
+        days[row['date']] = row['quantity'] or 0
+        usage[row['emission_factor_id']] = (quantity + (row['quantity'] or 0), co2 + (row['co2'] or 0), days)
+    return usage
+
+
+def swap_savings(usage, catalogue, limit=MAX_SWAPS):
+    """
+    Suggested swaps to lower-emission factors of the same category and unit,
+    largest saving first. The saving is the stored CO2 less the same
+    quantities priced with the alternative on the days they were logged, in
+    the catalogue's region, so both sides use the same factor versions.
+    """
+    swaps = []
+    for factor_id, (quantity, co2, days) in usage.items():
+        factor = catalogue.get(factor_id)
+        if factor is None or quantity <= 0:
+            continue
+        for alternative in catalogue.alternatives(factor):
+            saving = co2 - sum(
+                day_quantity * catalogue.value_on(alternative, day) for day, day_quantity in days.items()
+            )
+            if saving <= 0:
+                continue  # the alternative was the higher value when these were logged
+            swaps.append({
+                'from': factor.name,
+                'to': alternative.name,
+                'quantity': round(quantity, 2),
+                'unit': factor.unit,
+                'saving': round(saving, 2),
+            })
+    swaps.sort(key=lambda swap: swap['saving'], reverse=True)
+    return swaps[:limit]
+
+
+def recommendations(user, today=None):
+    """Top categories by CO2, tips for them and the best factor swaps"""
+    if today is None:
+        today = date.today()
+    catalogue = get_catalogue(region_for(user))
+    index = get_tip_index()
+    usage = factor_usage(user, today - timedelta(days=WINDOW_DAYS))
+
+    category_totals = {}
+    for factor_id, (quantity, co2, days) in usage.items():
+        factor = catalogue.get(factor_id)
+        if factor is not None:
+            category_totals[factor.category] = category_totals.get(factor.category, 0) + co2
+    labels = dict(EmissionFactor.CATEGORY_CHOICES)
+    top_categories = sorted(
+        (category for category, total in category_totals.items() if total > 0),
+        key=lambda category: category_totals[category],
+        reverse=True,
+    )[:TOP_CATEGORIES]
+
+    tips = []
+    for category in top_categories:
+        # Tips about factors the user actually logs come before generic ones
+        for factor in catalogue.by_category.get(category, []):
+            if factor.pk in usage:
+                tips.extend(index.by_factor.get(factor.pk, []))
+        tips.extend(index.by_category.get(category, []))
+    if not tips:
+        tips = list(index.general)
+
+    return {
+        'top_categories': [
+            {
+                'category': category,
+                'label': labels.get(category, category.title()),
+                'total': round(category_totals[category], 2),
+            }
+            for category in top_categories
+        ],
+        'tips': tips[:MAX_TIPS],
+        'swaps': swap_savings(usage, catalogue),
+    }
@@ -0,0 +1,14 @@
+"""
+Region names derived from the free-text UserProfile.location.
+
+A user's region is their location with case and whitespace folded, so
+"  Oslo " and "oslo" are the same place. UserProfile stores it in its
+indexed ``region`` field; RegionalFactor.region, the location leaderboards
+and the regional factor data files all use the same form, so they can be
+matched in SQL.
+"""
+
+
+def normalise_location(location):
+    """The region for location: case-folded, runs of whitespace collapsed, '' when blank"""
+    return ' '.join((location or '').split()).casefold()
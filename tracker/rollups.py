@@ -0,0 +1,153 @@
+"""
+Maintenance of the DailyEmission rollup table.
+
+Writes go through apply_delta(), which adjusts a single (user, date, category)
+bucket in place, so adding or deleting an activity costs a couple of small
+queries no matter how much history the user has. rebuild() recomputes the
+buckets from scratch with one grouped query and is used by the
+``rebuild_rollups`` management command and the initial backfill migration.
+Both keep the goal tracking state (tracker.goals) in step with the buckets.
+
+rebuild() is also how re-pricing jobs (tracker.pricing) bring the buckets in
+line after bulk UPDATEs that send no signals, so it bumps the data version
+of every user it touched once it commits; pages and ETags built from the old
+totals are not served again.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from . import goals, versioning
+from .models import Activity, DailyEmission
+
+BATCH_SIZE = 1000
+
+
+def apply_delta(user_id, day, category, co2, count, refresh_goals=True):
+    """
+    Add co2/count (which may be negative) to one rollup bucket. Callers that
+    apply many deltas can pass refresh_goals=False and call
+    goals.refresh_days() once for all the days they touched.
+    """
+    bucket = DailyEmission.objects.filter(user_id=user_id, date=day, category=category)
+    updated = bucket.update(
+        total_co2=F('total_co2') + co2,
+        activity_count=F('activity_count') + count,
+    )
+
+    if not updated:
+        # Never create a bucket for a removal: the row is either already gone
+        # or the user itself is being deleted.
+        if count <= 0:
+            return
+        try:
+            with transaction.atomic():
+                DailyEmission.objects.create(
+                    user_id=user_id,
+                    date=day,
+                    category=category,
+                    total_co2=co2,
+                    activity_count=count,
+                )
+        except IntegrityError:
+            # Another request created the bucket first
+            bucket.update(
+                total_co2=F('total_co2') + co2,
+                activity_count=F('activity_count') + count,
+            )
+    elif count < 0:
+        bucket.filter(activity_count__lte=0).delete()
+
+    if refresh_goals:
+        goals.refresh_days(user_id, [day])
+
+
+def snapshot(activity):
+    """Return the rollup key and CO2 contribution of an activity"""
+    return (
+        activity.user_id,
+        activity.date,
+        activity.emission_factor.category,
+        activity.co2_emissions,
+    )
+
+
+def stored_snapshot(pk):
+    """Return the rollup contribution of an activity as currently stored"""
+    return Activity.objects.filter(pk=pk).values_list(
+        'user_id', 'date', 'emission_factor__category', 'co2_emissions'
+    ).first()
+
+
+def rebuild(user_ids=None, dates=None):
+    """Recompute rollup buckets from the Activity table, returns bucket count"""
+    buckets = DailyEmission.objects.all()
+    activities = Activity.objects.all()
+    if user_ids is not None:
+        buckets = buckets.filter(user_id__in=user_ids)
+        activities = activities.filter(user_id__in=user_ids)
+    if dates is not None:
+        buckets = buckets.filter(date__in=dates)
+        activities = activities.filter(date__in=dates)
+
+    rows = activities.order_by().values(
+        'user_id', 'date', 'emission_factor__category'
+    ).annotate(
+        total=Sum('co2_emissions'),
+        count=Count('id'),
+    )
+
+    created = 0
+    touched_users = set(user_ids or ())
+    with transaction.atomic():
+        if user_ids is None:
+            # Users whose buckets are dropped without any activity to rebuild them from
+            touched_users.update(buckets.order_by().values_list('user_id', flat=True).distinct())
+        buckets.delete()
+        batch = []
+        for row in rows.iterator(chunk_size=BATCH_SIZE):
+            touched_users.add(row['user_id'])
+            batch.append(DailyEmission(
+                user_id=row['user_id'],
+                date=row['date'],
+                category=row['emission_factor__category'],
+                total_co2=row['total'] or 0,
+                activity_count=row['count'],
+            ))
+            if len(batch) >= BATCH_SIZE:
+                DailyEmission.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            DailyEmission.objects.bulk_create(batch)
+            created += len(batch)
+
+        if dates is None:
+            goals.rebuild(user_ids)
+        else:
+            for user_id in touched_users:
+                goals.refresh_days(user_id, dates)
+        transaction.on_commit(lambda: versioning.bump_user_versions(touched_users))
+    return created
+
+
+def rebuild_for_factor(factor_id, progress=None, start=None, end=None):
+    """
+    Recompute every bucket that contains an activity using this factor,
+    optionally only those dated from start up to (not including) end.
+    progress, if given, is called with (users done, users total) as it goes.
+    """
+    activities = Activity.objects.filter(emission_factor_id=factor_id)
+    if start is not None:
+        activities = activities.filter(date__gte=start)
+    if end is not None:
+        activities = activities.filter(date__lt=end)
+    touched = activities.order_by().values_list(
+        'user_id', 'date'
+    ).distinct()
+    by_user = {}
+    for user_id, day in touched.iterator(chunk_size=BATCH_SIZE):
+        by_user.setdefault(user_id, set()).add(day)
+    for done, (user_id, days) in enumerate(by_user.items(), 1):
+        rebuild(user_ids=[user_id], dates=sorted(days))
+        if progress is not None:
+            progress(done, len(by_user))
@@ -0,0 +1,185 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import catalogue, goals, jobs, pricing, recommendations, rollups, versioning
+from .models import Activity, EmissionFactor, EmissionFactorVersion, RegionalFactor, Tip, UserProfile
+
+
+@receiver(pre_save, sender=Activity)
+def remember_previous_activity(sender, instance, raw=False, **kwargs):
+    """Capture what an edited activity contributed before the save"""
+    instance._rollup_previous = None
+    if instance.pk and not raw:
+        instance._rollup_previous = rollups.stored_snapshot(instance.pk)
+
+
+@receiver(post_save, sender=Activity)
+def update_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    """Move the activity's CO2 into its (user, date, category) bucket"""
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        user_id, day, category, co2 = previous
+        rollups.apply_delta(user_id, day, category, -co2, -1)
+    user_id, day, category, co2 = rollups.snapshot(instance)
+    rollups.apply_delta(user_id, day, category, co2, 1)
+
+
+@receiver(post_delete, sender=Activity)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    """Take a deleted activity's CO2 out of its bucket"""
+    user_id, day, category, co2 = rollups.snapshot(instance)
+    rollups.apply_delta(user_id, day, category, -co2, -1)
+
+
+@receiver(post_save, sender=Activity)
+@receiver(post_delete, sender=Activity)
+def bump_user_data_version(sender, instance, raw=False, **kwargs):
+    """Invalidate the user's cached and conditional-GET state after the commit"""
+    if raw:
+        return
+    user_id = instance.user_id
+    previous = getattr(instance, '_rollup_previous', None)
+    transaction.on_commit(lambda: versioning.bump_user_version(user_id))
+    if previous is not None and previous[0] != user_id:
+        transaction.on_commit(lambda: versioning.bump_user_version(previous[0]))
+
+
+@receiver(pre_save, sender=UserProfile)
+def remember_previous_goal(sender, instance, raw=False, **kwargs):
+    """Capture the daily goal the user's goal days were judged against, and the region they were priced in"""
+    instance._previous_goal = goals.DEFAULT_GOAL
+    instance._previous_region = ''
+    if instance.pk and not raw:
+        instance._previous_goal, instance._previous_region = UserProfile.objects.filter(
+            pk=instance.pk
+        ).values_list('daily_goal', 'region').first() or (None, '')
+
+
+@receiver(post_save, sender=UserProfile)
+def rejudge_goal_days(sender, instance, raw=False, **kwargs):
+    """A new daily goal changes which past days were hits, so rebuild the user's streaks"""
+    if raw:
+        return
+    if getattr(instance, '_previous_goal', goals.DEFAULT_GOAL) != instance.daily_goal:
+        goals.rebuild(user_ids=[instance.user_id])
+
+
+@receiver(post_save, sender=UserProfile)
+def reprice_on_region_change(sender, instance, raw=False, **kwargs):
+    """Moving between regions with different factor values re-prices the user's activities"""
+    if raw or pricing.repricing_policy() != pricing.REPRICE_ALL:
+        return
+    regions = {getattr(instance, '_previous_region', ''), instance.region}
+    if len(regions) > 1 and RegionalFactor.objects.filter(region__in=regions).exists():
+        jobs.enqueue(
+            'reprice_user', {'user_id': instance.user_id},
+            key=jobs.key_for('reprice_user', instance.user_id), user=instance.user,
+        )
+
+
+@receiver(post_save, sender=UserProfile)
+def bump_profile_data_version(sender, instance, raw=False, **kwargs):
+    """Cached pages show the daily goal, so a profile edit invalidates them too"""
+    if raw:
+        return
+    user_id = instance.user_id
+    transaction.on_commit(lambda: versioning.bump_user_version(user_id))
+
+
+@receiver(pre_save, sender=EmissionFactor)
+def remember_previous_factor(sender, instance, raw=False, **kwargs):
+    """Note what an edit changes about how the factor's activities are priced"""
+    instance._previous_pricing = None
+    if instance.pk and not raw:
+        instance._previous_pricing = EmissionFactor.objects.filter(pk=instance.pk).values_list(
+            'category', 'co2_per_unit'
+        ).first()
+
+
+@receiver(post_save, sender=EmissionFactor)
+def reprice_on_factor_change(sender, instance, raw=False, **kwargs):
+    """Queue the re-pricing policy's work to keep activities and rollups in step with the factor"""
+    previous = getattr(instance, '_previous_pricing', None)
+    if raw or previous is None:
+        return
+    category, co2_per_unit = previous
+    payload = {'factor_id': instance.pk}
+    if co2_per_unit != instance.co2_per_unit and pricing.repricing_policy() == pricing.REPRICE_ALL:
+        jobs.enqueue('reprice_factor', payload, key=jobs.key_for('reprice_factor', instance.pk))
+    elif category != instance.category:
+        jobs.enqueue('rebuild_factor_rollups', payload, key=jobs.key_for('rebuild_factor_rollups', instance.pk))
+
+
+def _enqueue_range_repricing(factor_id, ranges):
+    """Queue re-pricing of the factor's activities dated within the union of (valid_from, valid_to) ranges"""
+    if pricing.repricing_policy() != pricing.REPRICE_ALL:
+        return
+    start = min(valid_from for valid_from, valid_to in ranges).isoformat()
+    ends = [valid_to for valid_from, valid_to in ranges]
+    end = None if None in ends else max(ends).isoformat()
+    jobs.enqueue(
+        'reprice_factor', {'factor_id': factor_id, 'start': start, 'end': end},
+        key=jobs.key_for('reprice_factor', factor_id, start, end or ''),
+    )
+
+
+@receiver(pre_save, sender=EmissionFactorVersion)
+def remember_previous_factor_version(sender, instance, raw=False, **kwargs):
+    """Capture the range an edited version covered, which needs re-pricing too"""
+    instance._previous_range = None
+    if instance.pk and not raw:
+        instance._previous_range = EmissionFactorVersion.objects.filter(pk=instance.pk).values_list(
+            'factor_id', 'valid_from', 'valid_to', 'co2_per_unit'
+        ).first()
+
+
+@receiver(post_save, sender=EmissionFactorVersion)
+def reprice_on_factor_version_save(sender, instance, raw=False, **kwargs):
+    """Re-price the activities dated within the version's old and new ranges"""
+    if raw:
+        return
+    current = (instance.factor_id, instance.valid_from, instance.valid_to, instance.co2_per_unit)
+    previous = getattr(instance, '_previous_range', None)
+    if previous == current:
+        return
+    if previous is not None and previous[0] != instance.factor_id:
+        _enqueue_range_repricing(previous[0], [previous[1:3]])
+        previous = None
+    _enqueue_range_repricing(instance.factor_id, [current[1:3]] + ([previous[1:3]] if previous else []))
+
+
+@receiver(post_delete, sender=EmissionFactorVersion)
+def reprice_on_factor_version_delete(sender, instance, **kwargs):
+    """Activities in a deleted version's range fall back to the factor's own value"""
+    _enqueue_range_repricing(instance.factor_id, [(instance.valid_from, instance.valid_to)])
+
+
+@receiver(post_save, sender=RegionalFactor)
+@receiver(post_delete, sender=RegionalFactor)
+def reprice_on_regional_factor_change(sender, instance, raw=False, **kwargs):
+    """Re-price the factor's activities, which now differ between regions"""
+    if raw or pricing.repricing_policy() != pricing.REPRICE_ALL:
+        return
+    factor_id = instance.factor_id
+    jobs.enqueue('reprice_factor', {'factor_id': factor_id}, key=jobs.key_for('reprice_factor', factor_id))
+
+
+@receiver(post_save, sender=EmissionFactor)
+@receiver(post_delete, sender=EmissionFactor)
+@receiver(post_save, sender=EmissionFactorVersion)
+@receiver(post_delete, sender=EmissionFactorVersion)
+@receiver(post_save, sender=RegionalFactor)
+@receiver(post_delete, sender=RegionalFactor)
+def invalidate_factor_catalogue(sender, **kwargs):
+    """Make every process reload the factor catalogue once the change commits"""
+    transaction.on_commit(catalogue.invalidate)
+
+
+@receiver(post_save, sender=Tip)
+@receiver(post_delete, sender=Tip)
+def invalidate_tip_index(sender, **kwargs):
+    """Make every process reload the tips once the change commits"""
+    transaction.on_commit(recommendations.invalidate)
@@ -0,0 +1,68 @@
+function toggleActivityDetails(activityId) {
+    const details = document.getElementById(`details-${activityId}`);
+    const button = event.target.closest('.info-btn');
+
+    if (details.style.display === 'none') {
+        details.style.display = 'block';
+        button.innerHTML = '<span class="action-icon">▲</span> Hide';
+        details.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+    } else {
+        details.style.display = 'none';
+        button.innerHTML = '<span class="action-icon">ℹ️</span> Details';
+    }
+}
+
+function confirmDelete(activityName) {
+    return confirm(`Are you sure you want to delete "${activityName}"? This action cannot be undone.`);
+}
+
+// Auto-submit filters on change
+document.addEventListener('DOMContentLoaded', function() {
+    const categorySelect = document.getElementById('category');
+    const dateInputs = document.querySelectorAll('input[type="date"]');
+
+    // Auto-submit on category change
+    categorySelect.addEventListener('change', function() {
+        this.form.submit();
+    });
+
+    // Auto-submit on date change with small delay
+    dateInputs.forEach(input => {
+        input.addEventListener('change', function() {
+            setTimeout(() => {
+                this.form.submit();
+            }, 300);
+        });
+    });
+
+    // Infinite scroll: fetch the next keyset page when the link comes into view
+    const loadMore = document.getElementById('load-more');
+    if (loadMore && 'IntersectionObserver' in window) {
+        const list = document.querySelector('.activities-list');
+        let loading = false;
+
+        const observer = new IntersectionObserver(entries => {
+            if (!entries[0].isIntersecting || loading) return;
+            loading = true;
+
+            fetch(`${loadMore.dataset.endpoint}?${loadMore.dataset.query}`, {
+                headers: { 'Accept': 'application/json' }
+            })
+                .then(response => response.json())
+                .then(page => {
+                    list.insertAdjacentHTML('beforeend', page.html);
+                    if (page.next_query) {
+                        loadMore.dataset.query = page.next_query;
+                        loadMore.href = `?${page.next_query}`;
+                        loading = false;
+                    } else {
+                        observer.disconnect();
+                        loadMore.parentElement.remove();
+                    }
+                })
+                .catch(() => { loading = false; });
+        }, { rootMargin: '200px' });
+
+        observer.observe(loadMore);
+    }
+});
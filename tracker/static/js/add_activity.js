@@ -0,0 +1,110 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const emissionFactorSelect = document.getElementById('id_emission_factor');
+    const quantityInput = document.getElementById('id_quantity');
+    const co2Estimate = document.getElementById('co2-estimate');
+    const estimateValue = document.getElementById('estimate-value');
+    const estimateContext = document.getElementById('estimate-context');
+    const quantityHelp = document.getElementById('quantity-help');
+
+    // Emission factors data (this would typically come from the backend)
+    const emissionFactors = {
+        // This would be populated from the database
+    };
+
+    // Update CO2 estimate when activity or quantity changes
+    function updateEstimate() {
+        const selectedOption = emissionFactorSelect.selectedOptions[0];
+        const quantity = parseFloat(quantityInput.value) || 0;
+
+        if (selectedOption && selectedOption.value && quantity > 0) {
+            const activityText = selectedOption.text;
+            const co2Factor = parseFloat(selectedOption.dataset.co2Factor) || 0;
+            const unit = selectedOption.dataset.unit || 'unit';
+
+            const totalCO2 = quantity * co2Factor;
+
+            co2Estimate.style.display = 'block';
+            estimateValue.textContent = `${totalCO2.toFixed(2)} kg CO₂`;
+
+            // Update context based on emission level
+            if (totalCO2 < 1) {
+                estimateContext.textContent = '🟢 Low impact activity - great choice!';
+                estimateContext.className = 'estimate-context low';
+            } else if (totalCO2 < 5) {
+                estimateContext.textContent = '🟡 Moderate impact - consider alternatives when possible';
+                estimateContext.className = 'estimate-context medium';
+            } else {
+                estimateContext.textContent = '🔴 High impact activity - explore greener options';
+                estimateContext.className = 'estimate-context high';
+            }
+
+            quantityHelp.textContent = `Enter amount in ${unit}`;
+        } else {
+            co2Estimate.style.display = 'none';
+        }
+    }
+
+    // Event listeners
+    emissionFactorSelect.addEventListener('change', function() {
+        updateEstimate();
+
+        // Update quantity placeholder based on selected activity
+        const selectedOption = this.selectedOptions[0];
+        if (selectedOption && selectedOption.value) {
+            const unit = selectedOption.dataset.unit || 'units';
+            quantityInput.placeholder = `Enter amount in ${unit}`;
+            quantityInput.focus();
+        }
+    });
+
+    quantityInput.addEventListener('input', updateEstimate);
+
+    // Quick add button functionality
+    document.querySelectorAll('.quick-add-btn').forEach(btn => {
+        btn.addEventListener('click', function() {
+            const activity = this.dataset.activity;
+            const unit = this.dataset.unit;
+            const factor = this.dataset.factor;
+
+            // Find and select the corresponding option
+            for (let option of emissionFactorSelect.options) {
+                if (option.text.toLowerCase().includes(activity.toLowerCase())) {
+                    emissionFactorSelect.value = option.value;
+                    option.dataset.unit = unit;
+                    option.dataset.co2Factor = factor;
+                    break;
+                }
+            }
+
+            // Set a default quantity
+            quantityInput.value = '1';
+            quantityInput.placeholder = `Enter amount in ${unit}`;
+
+            // Update estimate
+            updateEstimate();
+
+            // Scroll to form
+            document.querySelector('.activity-form').scrollIntoView({
+                behavior: 'smooth',
+                block: 'start'
+            });
+        });
+    });
+
+    // Form validation
+    document.querySelector('.activity-form').addEventListener('submit', function(e) {
+        if (!emissionFactorSelect.value) {
+            e.preventDefault();
+            alert('Please select an activity');
+            emissionFactorSelect.focus();
+            return;
+        }
+
+        if (!quantityInput.value || quantityInput.value <= 0) {
+            e.preventDefault();
+            alert('Please enter a valid quantity');
+            quantityInput.focus();
+            return;
+        }
+    });
+});
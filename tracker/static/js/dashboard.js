@@ -0,0 +1,106 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Weekly emissions chart
+    const weeklyData = JSON.parse(document.getElementById('weekly-data').textContent);
+    const ctx1 = document.getElementById('weeklyChart').getContext('2d');
+
+    new Chart(ctx1, {
+        type: 'line',
+        data: {
+            labels: weeklyData.map(d => d.date),
+            datasets: [{
+                label: 'Daily CO₂ Emissions (kg)',
+                data: weeklyData.map(d => d.emissions),
+                borderColor: '#10b981',
+                backgroundColor: 'rgba(16, 185, 129, 0.1)',
+                borderWidth: 3,
+                fill: true,
+                tension: 0.4,
+                pointBackgroundColor: '#10b981',
+                pointBorderColor: '#ffffff',
+                pointBorderWidth: 2,
+                pointRadius: 6
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    display: false
+                }
+            },
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    grid: {
+                        color: 'rgba(0, 0, 0, 0.1)'
+                    },
+                    ticks: {
+                        color: '#6b7280'
+                    }
+                },
+                x: {
+                    grid: {
+                        display: false
+                    },
+                    ticks: {
+                        color: '#6b7280'
+                    }
+                }
+            }
+        }
+    });
+
+    // Category breakdown chart
+    const categoryData = JSON.parse(document.getElementById('category-data').textContent);
+    if (categoryData.length > 0) {
+        const ctx2 = document.getElementById('categoryChart').getContext('2d');
+
+        const colors = {
+            'Transport': '#ef4444',
+            'Energy': '#f59e0b',
+            'Food': '#10b981',
+            'Digital': '#8b5cf6'
+        };
+
+        new Chart(ctx2, {
+            type: 'doughnut',
+            data: {
+                labels: categoryData.map(d => d.category),
+                datasets: [{
+                    data: categoryData.map(d => d.total),
+                    backgroundColor: categoryData.map(d => colors[d.category] || '#6b7280'),
+                    borderWidth: 0
+                }]
+            },
+            options: {
+                responsive: true,
+                maintainAspectRatio: false,
+                plugins: {
+                    legend: {
+                        position: 'bottom',
+                        labels: {
+                            padding: 20,
+                            usePointStyle: true,
+                            color: '#6b7280'
+                        }
+                    }
+                }
+            }
+        });
+    }
+
+    // Random daily tip
+    const tips = [
+        "Try walking or biking for trips under 2km to reduce transportation emissions.",
+        "Unplug electronics when not in use - they consume energy even when off.",
+        "Consider having one meat-free day per week to reduce your food footprint.",
+        "Use video calls instead of traveling for meetings when possible.",
+        "Switch to LED bulbs to reduce energy consumption by up to 80%.",
+        "Buy local produce to reduce transportation-related emissions.",
+        "Use public transport or carpool to significantly reduce your carbon footprint."
+    ];
+
+    const randomTip = tips[Math.floor(Math.random() * tips.length)];
+    document.getElementById('daily-tip').textContent = randomTip;
+});
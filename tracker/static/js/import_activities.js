@@ -0,0 +1,23 @@
+// Reload once every queued or running import on the page has finished
+const pendingImports = document.querySelectorAll('[data-job-url]');
+
+function checkImports() {
+    const checks = Array.from(pendingImports, element =>
+        fetch(element.dataset.jobUrl, { headers: { 'Accept': 'application/json' } })
+            .then(response => response.json())
+            .then(job => job.status === 'queued' || job.status === 'running')
+    );
+    Promise.all(checks)
+        .then(active => {
+            if (active.some(Boolean)) {
+                setTimeout(checkImports, 2000);
+            } else {
+                window.location.reload();
+            }
+        })
+        .catch(() => setTimeout(checkImports, 5000));
+}
+
+if (pendingImports.length) {
+    setTimeout(checkImports, 2000);
+}
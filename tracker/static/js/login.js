@@ -0,0 +1,74 @@
+function togglePassword() {
+    const passwordInput = document.getElementById('id_password');
+    const toggleIcon = document.getElementById('password-toggle-icon');
+
+    if (passwordInput.type === 'password') {
+        passwordInput.type = 'text';
+        toggleIcon.textContent = '🙈';
+    } else {
+        passwordInput.type = 'password';
+        toggleIcon.textContent = '👁️';
+    }
+}
+
+// Environmental facts
+const environmentalFacts = [
+    "The average person in developed countries produces about 16 tons of CO₂ per year.",
+    "Taking public transport instead of driving can reduce your carbon footprint by up to 2.6 tons per year.",
+    "Eating less meat just one day per week can save 1,900 pounds of CO₂ annually.",
+    "LED light bulbs use 75% less energy than traditional incandescent bulbs.",
+    "A single tree can absorb 48 pounds of CO₂ per year.",
+    "Recycling one aluminum can saves enough energy to run a TV for 3 hours.",
+    "Digital activities account for about 4% of global greenhouse gas emissions.",
+    "Walking or biking for short trips can eliminate 2.4 billion pounds of CO₂ annually."
+];
+
+// Animate community stats
+function animateStats() {
+    const statNumbers = document.querySelectorAll('.stat-number');
+
+    statNumbers.forEach(stat => {
+        const target = parseInt(stat.dataset.target);
+        const duration = 2000;
+        const increment = target / (duration / 16);
+        let current = 0;
+
+        const timer = setInterval(() => {
+            current += increment;
+            if (current >= target) {
+                stat.textContent = target.toLocaleString();
+                clearInterval(timer);
+            } else {
+                stat.textContent = Math.floor(current).toLocaleString();
+            }
+        }, 16);
+    });
+}
+
+// Initialize page
+document.addEventListener('DOMContentLoaded', function() {
+    // Show random environmental fact
+    const randomFact = environmentalFacts[Math.floor(Math.random() * environmentalFacts.length)];
+    document.getElementById('environmental-fact').textContent = randomFact;
+
+    // Start stats animation when visible
+    const observer = new IntersectionObserver((entries) => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                animateStats();
+                observer.disconnect();
+            }
+        });
+    });
+
+    const statsCard = document.querySelector('.stats-card');
+    if (statsCard) {
+        observer.observe(statsCard);
+    }
+
+    // Focus first input
+    const firstInput = document.querySelector('.form-input');
+    if (firstInput) {
+        firstInput.focus();
+    }
+});
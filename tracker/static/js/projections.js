@@ -0,0 +1,73 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const series = JSON.parse(document.getElementById('projection-series').textContent);
+    const ctx = document.getElementById('projectionChart').getContext('2d');
+
+    new Chart(ctx, {
+        type: 'line',
+        data: {
+            labels: series.dates,
+            datasets: [
+                {
+                    label: 'Daily CO₂ (kg)',
+                    data: series.daily,
+                    borderColor: 'rgba(16, 185, 129, 0.35)',
+                    backgroundColor: 'rgba(16, 185, 129, 0.1)',
+                    borderWidth: 1,
+                    fill: true,
+                    pointRadius: 0
+                },
+                {
+                    label: '7-day average',
+                    data: series.rolling_7,
+                    borderColor: '#10b981',
+                    borderWidth: 3,
+                    fill: false,
+                    tension: 0.4,
+                    pointRadius: 0
+                },
+                {
+                    label: '30-day average',
+                    data: series.rolling_30,
+                    borderColor: '#f59e0b',
+                    borderWidth: 3,
+                    fill: false,
+                    tension: 0.4,
+                    pointRadius: 0
+                }
+            ]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    position: 'bottom',
+                    labels: {
+                        usePointStyle: true,
+                        color: '#6b7280'
+                    }
+                }
+            },
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    grid: {
+                        color: 'rgba(0, 0, 0, 0.1)'
+                    },
+                    ticks: {
+                        color: '#6b7280'
+                    }
+                },
+                x: {
+                    grid: {
+                        display: false
+                    },
+                    ticks: {
+                        color: '#6b7280',
+                        maxTicksLimit: 12
+                    }
+                }
+            }
+        }
+    });
+});
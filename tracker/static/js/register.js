@@ -0,0 +1,173 @@
+function togglePassword(inputId, iconId) {
+    const passwordInput = document.getElementById(inputId);
+    const toggleIcon = document.getElementById(iconId);
+
+    if (passwordInput.type === 'password') {
+        passwordInput.type = 'text';
+        toggleIcon.textContent = '🙈';
+    } else {
+        passwordInput.type = 'password';
+        toggleIcon.textContent = '👁️';
+    }
+}
+
+function validatePassword() {
+    const password = document.getElementById('id_password1').value;
+    const username = document.getElementById('id_username').value;
+    const firstName = document.getElementById('id_first_name').value;
+    const lastName = document.getElementById('id_last_name').value;
+
+    // Length requirement
+    const lengthReq = document.getElementById('req-length');
+    const lengthIcon = lengthReq.querySelector('.req-icon');
+    if (password.length >= 8) {
+        lengthIcon.textContent = '✅';
+        lengthReq.classList.add('met');
+    } else {
+        lengthIcon.textContent = '⭕';
+        lengthReq.classList.remove('met');
+    }
+
+    // Common password check (simplified)
+    const commonPasswords = ['password', '12345678', 'qwerty', 'abc123', 'password123'];
+    const commonReq = document.getElementById('req-not-common');
+    const commonIcon = commonReq.querySelector('.req-icon');
+    if (!commonPasswords.includes(password.toLowerCase()) && password.length > 0) {
+        commonIcon.textContent = '✅';
+        commonReq.classList.add('met');
+    } else if (password.length > 0) {
+        commonIcon.textContent = '❌';
+        commonReq.classList.remove('met');
+    } else {
+        commonIcon.textContent = '⭕';
+        commonReq.classList.remove('met');
+    }
+
+    // Personal info check
+    const personalReq = document.getElementById('req-not-personal');
+    const personalIcon = personalReq.querySelector('.req-icon');
+    const personalInfo = [username, firstName, lastName].filter(info => info.length > 2);
+    const containsPersonalInfo = personalInfo.some(info =>
+        password.toLowerCase().includes(info.toLowerCase())
+    );
+
+    if (!containsPersonalInfo && password.length > 0) {
+        personalIcon.textContent = '✅';
+        personalReq.classList.add('met');
+    } else if (containsPersonalInfo) {
+        personalIcon.textContent = '❌';
+        personalReq.classList.remove('met');
+    } else {
+        personalIcon.textContent = '⭕';
+        personalReq.classList.remove('met');
+    }
+}
+
+function validatePasswordMatch() {
+    const password1 = document.getElementById('id_password1').value;
+    const password2 = document.getElementById('id_password2').value;
+    const matchIndicator = document.getElementById('password-match');
+    const matchIcon = matchIndicator.querySelector('.match-icon');
+    const matchText = matchIndicator.querySelector('.match-text');
+
+    if (password2.length > 0) {
+        matchIndicator.style.display = 'flex';
+        if (password1 === password2) {
+            matchIcon.textContent = '✅';
+            matchText.textContent = 'Passwords match!';
+            matchIndicator.classList.add('match');
+            matchIndicator.classList.remove('no-match');
+        } else {
+            matchIcon.textContent = '❌';
+            matchText.textContent = 'Passwords do not match';
+            matchIndicator.classList.add('no-match');
+            matchIndicator.classList.remove('match');
+        }
+    } else {
+        matchIndicator.style.display = 'none';
+    }
+}
+
+function checkFormValidity() {
+    const requiredFields = [
+        'id_first_name',
+        'id_last_name',
+        'id_username',
+        'id_email',
+        'id_password1',
+        'id_password2'
+    ];
+
+    const allFieldsFilled = requiredFields.every(fieldId => {
+        const field = document.getElementById(fieldId);
+        return field && field.value.trim().length > 0;
+    });
+
+    const password1 = document.getElementById('id_password1').value;
+    const password2 = document.getElementById('id_password2').value;
+    const passwordsMatch = password1 === password2;
+    const passwordLongEnough = password1.length >= 8;
+
+    const termsAgreed = document.querySelector('input[name="agree_terms"]').checked;
+
+    const submitBtn = document.getElementById('submit-btn');
+    const isValid = allFieldsFilled && passwordsMatch && passwordLongEnough && termsAgreed;
+
+    submitBtn.disabled = !isValid;
+    if (isValid) {
+        submitBtn.classList.add('ready');
+    } else {
+        submitBtn.classList.remove('ready');
+    }
+}
+
+// Initialize form validation
+document.addEventListener('DOMContentLoaded', function() {
+    // Add event listeners
+    const password1Input = document.getElementById('id_password1');
+    const password2Input = document.getElementById('id_password2');
+    const usernameInput = document.getElementById('id_username');
+    const firstNameInput = document.getElementById('id_first_name');
+    const lastNameInput = document.getElementById('id_last_name');
+    const emailInput = document.getElementById('id_email');
+    const termsCheckbox = document.querySelector('input[name="agree_terms"]');
+
+    // Password validation
+    password1Input.addEventListener('input', () => {
+        validatePassword();
+        validatePasswordMatch();
+        checkFormValidity();
+    });
+
+    password2Input.addEventListener('input', () => {
+        validatePasswordMatch();
+        checkFormValidity();
+    });
+
+    // Personal info validation
+    [usernameInput, firstNameInput, lastNameInput].forEach(input => {
+        input.addEventListener('input', () => {
+            validatePassword();
+            checkFormValidity();
+        });
+    });
+
+    emailInput.addEventListener('input', checkFormValidity);
+    termsCheckbox.addEventListener('change', checkFormValidity);
+
+    // Focus first input
+    firstNameInput.focus();
+
+    // Animate benefits
+    const benefitItems = document.querySelectorAll('.benefit-item');
+    benefitItems.forEach((item, index) => {
+        item.style.opacity = '0';
+        item.style.transform = 'translateX(20px)';
+        item.style.transition = 'all 0.6s ease';
+
+        setTimeout(() => {
+            item.style.opacity = '1';
+            item.style.transform = 'translateX(0)';
+        }, 200 * (index + 1));
+    });
+});
@@ -0,0 +1,115 @@
+function markTipDone(button) {
+    const tipCard = button.closest('.tip-card');
+    const tipText = tipCard.querySelector('.tip-text').textContent;
+
+    // Visual feedback
+    tipCard.classList.add('completed');
+    button.innerHTML = '<span class="btn-icon">✅</span> Done!';
+    button.disabled = true;
+
+    // Store in localStorage (if available)
+    try {
+        const completedTips = JSON.parse(localStorage.getItem('completedTips') || '[]');
+        if (!completedTips.includes(tipText)) {
+            completedTips.push(tipText);
+            localStorage.setItem('completedTips', JSON.stringify(completedTips));
+        }
+    } catch (e) {
+        console.log('LocalStorage not available, but that\'s OK!');
+    }
+
+    // Show success message
+    showMessage('Great! Keep up the good work! 🌱', 'success');
+}
+
+function shareTip(tipText) {
+    if (navigator.share) {
+        navigator.share({
+            title: 'Green Tip from GreenSteps',
+            text: `💡 Green Tip: ${tipText} - Track your carbon footprint with GreenSteps!`,
+            url: window.location.origin
+        });
+    } else {
+        // Fallback: copy to clipboard
+        const textToCopy = `💡 Green Tip: ${tipText} - Track your carbon footprint with GreenSteps! ${window.location.origin}`;
+
+        if (navigator.clipboard) {
+            navigator.clipboard.writeText(textToCopy).then(() => {
+                showMessage('Tip copied to clipboard! 📋', 'success');
+            });
+        } else {
+            // Fallback for older browsers
+            const textArea = document.createElement('textarea');
+            textArea.value = textToCopy;
+            document.body.appendChild(textArea);
+            textArea.select();
+            document.execCommand('copy');
+            document.body.removeChild(textArea);
+            showMessage('Tip copied to clipboard! 📋', 'success');
+        }
+    }
+}
+
+function showMessage(text, type) {
+    const messagesContainer = document.querySelector('.messages-container') || createMessagesContainer();
+
+    const message = document.createElement('div');
+    message.className = `message message-${type}`;
+    message.innerHTML = `
+        <span class="message-text">${text}</span>
+        <button class="message-close" onclick="this.parentElement.remove()">×</button>
+    `;
+
+    messagesContainer.appendChild(message);
+
+    // Auto remove after 4 seconds
+    setTimeout(() => {
+        if (message.parentElement) {
+            message.style.opacity = '0';
+            setTimeout(() => message.remove(), 300);
+        }
+    }, 4000);
+}
+
+function createMessagesContainer() {
+    const container = document.createElement('div');
+    container.className = 'messages-container';
+    document.body.appendChild(container);
+    return container;
+}
+
+// Initialize completed tips on page load
+document.addEventListener('DOMContentLoaded', function() {
+    try {
+        const completedTips = JSON.parse(localStorage.getItem('completedTips') || '[]');
+
+        document.querySelectorAll('.tip-card').forEach(card => {
+            const tipText = card.querySelector('.tip-text').textContent;
+            if (completedTips.includes(tipText)) {
+                const doneBtn = card.querySelector('.done-btn');
+                card.classList.add('completed');
+                doneBtn.innerHTML = '<span class="btn-icon">✅</span> Done!';
+                doneBtn.disabled = true;
+            }
+        });
+    } catch (e) {
+        console.log('LocalStorage not available, starting fresh!');
+    }
+
+    // Add intersection observer for animations
+    const observer = new IntersectionObserver((entries) => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                entry.target.style.opacity = '1';
+                entry.target.style.transform = 'translateY(0)';
+            }
+        });
+    });
+
+    document.querySelectorAll('.tip-card, .category-section').forEach(el => {
+        el.style.opacity = '0';
+        el.style.transform = 'translateY(20px)';
+        el.style.transition = 'all 0.6s ease';
+        observer.observe(el);
+    });
+});
@@ -0,0 +1,109 @@
+"""
+Synthetic activity data for benchmarks and load tests.
+
+generate() creates users with profiles and a realistic spread of activities
+(more transport and food than digital, quantities that suit each unit, dates
+weighted towards the recent past) using bulk inserts, then rebuilds the
+rollups for the new users.
+"""
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from . import rollups
+from .catalogue import get_catalogue
+from .models import Activity, EmissionFactor, UserProfile
+
+BATCH_SIZE = 2000
+
+# Relative share of logged activities per category
+CATEGORY_WEIGHTS = {
+    'transport': 4,
+    'food': 4,
+    'energy': 2,
+    'digital': 3,
+}
+
+# (low, high) quantity range per unit; anything else uses DEFAULT_QUANTITY
+QUANTITY_RANGES = {
+    'km': (0.5, 60),
+    'kwh': (1, 25),
+    'meal': (1, 2),
+    'cup': (1, 4),
+    'hour': (0.5, 5),
+}
+DEFAULT_QUANTITY = (1, 10)
+
+
+def _quantity(rng, unit):
+    low, high = QUANTITY_RANGES.get(unit.lower(), DEFAULT_QUANTITY)
+    if unit.lower() in ('meal', 'cup'):
+        return float(rng.randint(int(low), int(high)))
+    # Skewed towards the low end, like real trips and usage
+    return round(low + (high - low) * rng.random() ** 2, 1)
+
+
+def _date(rng, today, days):
+    # Triangular distribution with its mode at today: recent days are busiest
+    return today - timedelta(days=int(rng.triangular(0, days, 0)))
+
+
+def generate(users=10, activities_per_user=1000, days=365, seed=None, prefix='synthetic',
+             today=None, password=None):
+    """
+    Create synthetic users and activities, returns the list of new users.
+    Users get an unusable password unless password is given.
+    """
+    rng = random.Random(seed)
+    if today is None:
+        today = date.today()
+
+    factors = list(EmissionFactor.objects.all())
+    if not factors:
+        raise ValueError('No emission factors found; run populate_emission_factors first')
+    by_category = {}
+    for factor in factors:
+        by_category.setdefault(factor.category, []).append(factor)
+    categories = list(by_category)
+    weights = [CATEGORY_WEIGHTS.get(category, 1) for category in categories]
+
+    # Hash once: every synthetic user shares the password
+    hashed = make_password(password) if password else '!'
+    existing = User.objects.filter(username__startswith=f'{prefix}-').count()
+    new_users = User.objects.bulk_create([
+        User(username=f'{prefix}-{existing + i}', password=hashed)
+        for i in range(users)
+    ], batch_size=BATCH_SIZE)
+    # bulk_create only returns primary keys on some backends
+    new_users = list(User.objects.filter(
+        username__in=[user.username for user in new_users]
+    ))
+    UserProfile.objects.bulk_create([
+        UserProfile(user=user, daily_goal=rng.choice([5.0, 8.0, 10.0, 15.0]))
+        for user in new_users
+    ], batch_size=BATCH_SIZE)
+
+    catalogue = get_catalogue()
+    batch = []
+    for user in new_users:
+        for _ in range(activities_per_user):
+            factor = rng.choice(by_category[rng.choices(categories, weights)[0]])
+            quantity = _quantity(rng, factor.unit)
+            day = _date(rng, today, days)
+            batch.append(Activity(
+                user=user,
+                emission_factor=factor,
+                quantity=quantity,
+                date=day,
+                co2_emissions=quantity * catalogue.value_on(factor, day),
+            ))
+            if len(batch) >= BATCH_SIZE:
+                Activity.objects.bulk_create(batch)
+                batch = []
+    if batch:
+        Activity.objects.bulk_create(batch)
+
+    rollups.rebuild(user_ids=[user.pk for user in new_users])
+    return new_users
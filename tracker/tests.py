@@ -1,3 +1,1223 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import warnings
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.utils import ConnectionHandler
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import include, path, reverse
+from django.utils import timezone
+
+from . import assets, async_views, checks, factor_sets, goals, importers, jobs, leaderboard, perf, pricing
+from .analytics import dashboard_summary
+from .catalogue import get_catalogue
+from .models import (
+    Activity, DailyEmission, EmissionFactor, EmissionFactorVersion, GoalMonth, GoalStreak, Job, RegionalFactor,
+    UserProfile,
+)
+from .projections import History, day_number, projection, substitution, unit_prices
+from .recommendations import recommendations
+
+# Routes the read views to tracker.async_views, as GREENSTEPS_ASYNC_VIEWS does
+urlpatterns = [
+    path('', async_views.home, name='home'),
+    path('dashboard/', async_views.dashboard, name='dashboard'),
+    path('activities/', async_views.activities_list, name='activities_list'),
+    path('api/weekly-data/', async_views.api_weekly_data, name='api_weekly_data'),
+    path('', include('GreenSteps.urls')),
+]
+
+
+class DashboardAnalyticsTests(TestCase):
+    # session, user, profile, rollup summary, recent activities
+    DASHBOARD_QUERY_BUDGET = 5
+    # session and user only, the page data comes from the cache
+    CACHED_DASHBOARD_QUERY_BUDGET = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='s3cret-pass')
+        UserProfile.objects.create(user=cls.user)
+        cls.car = EmissionFactor.objects.create(
+            category='transport', name='Car', unit='km', co2_per_unit=0.2
+        )
+        cls.beef = EmissionFactor.objects.create(
+            category='food', name='Beef meal', unit='meal', co2_per_unit=3.3
+        )
+
+    def setUp(self):
+        # Drop version stamps so the factor catalogue reloads for this test
+        cache.clear()
+
+    def log(self, factor, quantity, days_ago=0):
+        return Activity.objects.create(
+            user=self.user,
+            emission_factor=factor,
+            quantity=quantity,
+            date=date.today() - timedelta(days=days_ago),
+        )
+
+    def test_category_totals_sum_per_activity_emissions(self):
+        self.log(self.car, 10)
+        self.log(self.car, 30, days_ago=3)
+        self.log(self.beef, 2, days_ago=1)
+
+        summary = dashboard_summary(self.user)
+
+        self.assertEqual(summary['category_data'], [
+            {'category': 'Transport', 'total': 8.0},
+            {'category': 'Food', 'total': 6.6},
+        ])
+        self.assertAlmostEqual(summary['today_emissions'], 2.0)
+        self.assertAlmostEqual(summary['week_emissions'], 14.6)
+        self.assertEqual(len(summary['weekly_data']), 7)
+        self.assertEqual(summary['weekly_data'][-1]['emissions'], 2.0)
+        self.assertEqual(summary['weekly_data'][-2]['emissions'], 6.6)
+
+    def test_rollup_follows_creates_edits_deletes_and_moves(self):
+        def buckets():
+            return {
+                (bucket.user.username, bucket.date, bucket.category):
+                    (round(bucket.total_co2, 3), bucket.activity_count)
+                for bucket in DailyEmission.objects.select_related('user')
+            }
+
+        today = date.today()
+        yesterday = today - timedelta(days=1)
+        bob = User.objects.create_user('bob', password='s3cret-pass')
+        trip = self.log(self.car, 10)
+        self.log(self.car, 5)
+        self.assertEqual(buckets(), {('alice', today, 'transport'): (3.0, 2)})
+
+        # Changing the quantity, date and factor moves the contribution between buckets
+        trip.quantity = 20
+        trip.date = yesterday
+        trip.emission_factor = self.beef
+        trip.save()
+        self.assertEqual(buckets(), {
+            ('alice', today, 'transport'): (1.0, 1),
+            ('alice', yesterday, 'food'): (66.0, 1),
+        })
+
+        # Emptied buckets are dropped
+        trip.user = bob
+        trip.save()
+        self.assertEqual(buckets(), {
+            ('alice', today, 'transport'): (1.0, 1),
+            ('bob', yesterday, 'food'): (66.0, 1),
+        })
+
+        trip.delete()
+        self.assertEqual(buckets(), {('alice', today, 'transport'): (1.0, 1)})
+
+    def test_co2_is_snapshotted_on_save_including_partial_saves(self):
+        trip = self.log(self.car, 10)
+        stored = Activity.objects.values_list('co2_emissions', flat=True)
+        self.assertEqual(stored.get(), 2.0)
+
+        # The stored value is read back as is, not recomputed from the factor
+        EmissionFactor.objects.filter(pk=self.car.pk).update(co2_per_unit=1.0)
+        self.assertEqual(Activity.objects.get().co2_emissions, 2.0)
+
+        # A save limited to other fields still writes the new snapshot
+        trip.quantity = 20
+        trip.save(update_fields=['quantity'])
+        self.assertEqual(stored.get(), 4.0)
+
+    def test_dashboard_query_budget_is_independent_of_history(self):
+        for days_ago in range(30):
+            self.log(self.car, 5, days_ago=days_ago)
+            self.log(self.beef, 1, days_ago=days_ago)
+        self.client.force_login(self.user)
+        get_catalogue()
+
+        with self.assertNumQueries(self.DASHBOARD_QUERY_BUDGET):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_repeat_dashboard_is_served_from_cache_until_data_changes(self):
+        self.log(self.car, 10)
+        self.client.force_login(self.user)
+        get_catalogue()
+        self.client.get(reverse('dashboard'))
+
+        with self.assertNumQueries(self.CACHED_DASHBOARD_QUERY_BUDGET):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['today_emissions'], 2.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.log(self.beef, 1)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['today_emissions'], 5.3)
+        self.assertContains(response, '5.3 kg CO₂')
+
+    def test_timeseries_fills_gaps_and_rejects_bad_ranges(self):
+        Activity.objects.create(user=self.user, emission_factor=self.car, quantity=10, date=date(2025, 3, 4))
+        Activity.objects.create(user=self.user, emission_factor=self.beef, quantity=1, date=date(2025, 3, 17))
+        self.client.force_login(self.user)
+        url = reverse('api_v1_timeseries')
+
+        series = self.client.get(url, {
+            'start': '2025-03-01', 'end': '2025-03-20', 'granularity': 'week', 'by_category': '1',
+        }).json()['series']
+        self.assertEqual([point['start'] for point in series], ['2025-02-24', '2025-03-03', '2025-03-10', '2025-03-17'])
+        self.assertEqual([point['total'] for point in series], [0, 2.0, 0, 3.3])
+        self.assertEqual(series[3]['categories'], {'transport': 0, 'energy': 0, 'food': 3.3, 'digital': 0})
+
+        end_of_calendar = self.client.get(url, {'start': '9999-10-01', 'end': '9999-12-31', 'granularity': 'month'})
+        self.assertEqual(len(end_of_calendar.json()['series']), 3)
+
+        for params in (
+            {'granularity': 'hour'},
+            {'start': '03/01/2025'},
+            {'start': '2025-02-30'},
+            {'start': '2025-03-02', 'end': '2025-03-01'},
+            {'start': '1990-01-01', 'end': '2025-01-01'},
+            {'end': '0001-01-03'},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+
+class ImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('lena', password='s3cret-pass')
+        EmissionFactor.objects.create(category='transport', name='Car', unit='km', co2_per_unit=0.2)
+        EmissionFactor.objects.create(category='food', name='Beef meal', unit='meal', co2_per_unit=3.3)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        csv_file = BytesIO(
+            b'factor,quantity,date,notes\n'
+            b'car,10,2025-03-01,commute\n'
+            b'Bus,1,2025-03-01,\n'
+            b'Car,inf,2025-03-01,\n'
+            b'Car,-1,2025-03-01,\n'
+            b'Car,5,2025-02-30,\n'
+            b'Beef meal,1,2025-03-01,\n'
+        )
+        result = importers.import_activities(self.user, csv_file, 'csv', chunk_size=1)
+        self.assertEqual(result.created, 2)
+        self.assertEqual([line for line, message in result.errors], [3, 4, 5, 6])
+        self.assertIn("Unknown emission factor: 'Bus'", result.errors[0][1])
+        self.assertAlmostEqual(DailyEmission.objects.get(category='transport').total_co2, 2.0)
+        self.assertAlmostEqual(DailyEmission.objects.get(category='food').total_co2, 3.3)
+
+        json_file = BytesIO(b'[{"factor": "Car", "quantity": 1, "date": "2025-03-02"}, "car", {"factor": ')
+        result = importers.import_activities(self.user, json_file, 'json')
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.errors, [
+            (2, 'Expected an object with factor, quantity and date'), (3, 'Malformed JSON'),
+        ])
+
+    def test_strict_imports_and_unreadable_files_roll_back(self):
+        rows = b'factor,quantity,date\nCar,10,2025-03-01\nBus,1,2025-03-01\n'
+        with self.assertRaises(importers.ImportAborted) as aborted:
+            importers.import_activities(self.user, BytesIO(rows), 'csv', strict=True)
+        self.assertEqual(len(aborted.exception.result.errors), 1)
+
+        latin1 = 'factor,quantity,date,notes\nCar,10,2025-03-01,caf\u00e9\n'.encode('latin-1')
+        with self.assertRaisesMessage(importers.ImportAborted, 'could not be read'):
+            importers.import_activities(self.user, BytesIO(latin1), 'csv')
+        self.assertFalse(Activity.objects.exists())
+        self.assertFalse(DailyEmission.objects.exists())
+
+
+class ActivityHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('hana', password='s3cret-pass')
+        cls.car = EmissionFactor.objects.create(
+            category='transport', name='Car', unit='km', co2_per_unit=0.2
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_cursor_pages_are_stable_when_date_and_created_at_tie(self):
+        for quantity in range(7):
+            Activity.objects.create(
+                user=self.user, emission_factor=self.car, quantity=quantity, date=date(2025, 3, 1)
+            )
+        Activity.objects.update(created_at=timezone.now())
+        url = reverse('api_v1_activities')
+
+        seen = []
+        cursor = ''
+        while True:
+            page = self.client.get(url, {'page_size': 2, 'cursor': cursor}).json()
+            seen += [activity['id'] for activity in page['results']]
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        # Ties on (date, created_at) are broken by id, so nothing repeats or goes missing
+        self.assertEqual(seen, sorted(Activity.objects.values_list('pk', flat=True), reverse=True))
+
+        self.assertEqual(self.client.get(url, {'cursor': 'not-a-cursor'}).status_code, 400)
+
+    def test_activity_date_filters_are_validated(self):
+        Activity.objects.create(user=self.user, emission_factor=self.car, quantity=1, date=date(2025, 3, 1))
+        Activity.objects.create(user=self.user, emission_factor=self.car, quantity=2, date=date(2025, 3, 5))
+        url = reverse('api_v1_activities')
+
+        results = self.client.get(url, {'date_from': '2025-03-02'}).json()['results']
+        self.assertEqual([activity['quantity'] for activity in results], [2.0])
+        for page_url in (url, reverse('api_activities_page')):
+            for params in ({'date_from': 'garbage'}, {'date_to': '2025-02-30'}):
+                with self.subTest(url=page_url, params=params):
+                    response = self.client.get(page_url, params)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('error', response.json())
+
+        # The HTML lists drop the bad filter and say so
+        for urlconf in (settings.ROOT_URLCONF, __name__):
+            with self.subTest(urlconf=urlconf), override_settings(ROOT_URLCONF=urlconf):
+                response = self.client.get(reverse('activities_list'), {
+                    'date_from': 'x', 'date_to': '2025-03-02',
+                })
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['total_count'], 1)
+                self.assertContains(response, 'date_from must be a date')
+
+    def test_exports_stream_csv_and_ndjson_in_date_order(self):
+        Activity.objects.create(user=self.user, emission_factor=self.car, quantity=10, date=date(2025, 3, 2))
+        Activity.objects.create(
+            user=self.user, emission_factor=self.car, quantity=5, date=date(2025, 3, 1), notes='to work, by car'
+        )
+        url = reverse('export_activities')
+
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(), [
+            'date,factor,category,quantity,unit,co2_emissions,notes',
+            '2025-03-01,Car,transport,5.0,km,1.0,"to work, by car"',
+            '2025-03-02,Car,transport,10.0,km,2.0,',
+        ])
+
+        response = self.client.get(url, {'format': 'ndjson'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([(row['date'], row['quantity'], row['co2_emissions']) for row in rows], [
+            ('2025-03-01', 5.0, 1.0),
+            ('2025-03-02', 10.0, 2.0),
+        ])
+
+        self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'date_to': '2025-02-30'}).status_code, 400)
+
+    def test_summary_answers_304_until_the_data_changes(self):
+        url = reverse('api_v1_summary')
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(2):  # session and user; the ETag comes from the cache
+            response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            activity = Activity.objects.create(user=self.user, emission_factor=self.car, quantity=10)
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            activity.quantity = 20
+            activity.save()
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('bob', password='s3cret-pass')
+        cls.car = EmissionFactor.objects.create(
+            category='transport', name='Car', unit='km', co2_per_unit=0.2
+        )
+        cls.train = EmissionFactor.objects.create(
+            category='transport', name='Train', unit='km', co2_per_unit=0.03
+        )
+        cls.flight = EmissionFactor.objects.create(
+            category='transport', name='Flight', unit='hour', co2_per_unit=90
+        )
+        cls.beef = EmissionFactor.objects.create(
+            category='food', name='Beef meal', unit='meal', co2_per_unit=3.3
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_categories_rank_by_co2_not_quantity(self):
+        # 100 km is the larger quantity but 1.5 kg less CO2 than 7 meals
+        Activity.objects.create(user=self.user, emission_factor=self.car, quantity=100)
+        Activity.objects.create(user=self.user, emission_factor=self.beef, quantity=7)
+
+        result = recommendations(self.user)
+
+        self.assertEqual([item['category'] for item in result['top_categories']], ['food', 'transport'])
+        self.assertIn("Try 'Meatless Monday' or reduce meat consumption", result['tips'])
+
+    def test_swaps_only_suggest_same_unit_lower_emission_factors(self):
+        Activity.objects.create(user=self.user, emission_factor=self.car, quantity=100)
+
+        swaps = recommendations(self.user)['swaps']
+
+        self.assertEqual(swaps, [
+            {'from': 'Car', 'to': 'Train', 'quantity': 100.0, 'unit': 'km', 'saving': 17.0},
+        ])
+
+    def test_swap_savings_use_the_values_the_activities_were_priced_with(self):
+        UserProfile.objects.create(user=self.user, location='Norway')
+        EmissionFactorVersion.objects.create(
+            factor=self.car, co2_per_unit=0.5, valid_from=date.today() - timedelta(days=10)
+        )
+        RegionalFactor.objects.create(region='norway', factor=self.train, co2_per_unit=0.01)
+        cache.clear()
+        Activity.objects.create(user=self.user, emission_factor=self.car, quantity=100)
+        Activity.objects.create(
+            user=self.user, emission_factor=self.car, quantity=100, date=date.today() - timedelta(days=20)
+        )
+
+        # 50 kg at the current car version plus 20 kg at the base value, against 2 kg by train in Norway
+        swaps = recommendations(self.user)['swaps']
+        self.assertEqual(swaps, [
+            {'from': 'Car', 'to': 'Train', 'quantity': 200.0, 'unit': 'km', 'saving': 68.0},
+        ])
+
+
+class ProjectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('erin', password='s3cret-pass')
+        cls.car = EmissionFactor.objects.create(
+            category='transport', name='Car', unit='km', co2_per_unit=0.2
+        )
+        cls.train = EmissionFactor.objects.create(
+            category='transport', name='Train', unit='km', co2_per_unit=0.05
+        )
+        cls.beef = EmissionFactor.objects.create(
+            category='food', name='Beef meal', unit='meal', co2_per_unit=3.3
+        )
+        cls.today = date(2025, 7, 2)
+        # 10 km by car every day since January 2nd, plus one beef meal a week ago
+        for days_ago in range(182):
+            Activity.objects.create(
+                user=cls.user, emission_factor=cls.car, quantity=10,
+                date=cls.today - timedelta(days=days_ago),
+            )
+        Activity.objects.create(
+            user=cls.user, emission_factor=cls.beef, quantity=1, date=cls.today - timedelta(days=7),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_projection_matches_per_activity_arithmetic(self):
+        with self.assertNumQueries(4):  # history, catalogue factors, versions and regional values
+            result = projection(self.user, [(self.car.pk, self.train.pk, 0.5)], today=self.today)
+
+        annual = result['annual']
+        self.assertEqual(annual['year_to_date'], 367.3)
+        self.assertEqual(annual['daily_rate'], round(183.3 / 90, 3))
+        self.assertEqual(annual['projected_year_total'], round(367.3 + 183.3 / 90 * 182, 3))
+
+        series = result['series']
+        self.assertEqual(series['dates'][-1], '2025-07-02')
+        self.assertEqual(series['daily'][-8], 5.3)
+        self.assertEqual(series['rolling_7'][-1], 2.0)
+        self.assertEqual(series['rolling_7'][-2], round((2 * 7 + 3.3) / 7, 3))
+
+        # Half of 1820 km moved from 0.2 to 0.05 kg/km
+        scenario = result['scenario']
+        self.assertEqual(scenario['swaps'][0]['quantity'], 910.0)
+        self.assertEqual(scenario['saving'], 136.5)
+        self.assertEqual(scenario['scenario'], 230.8)
+        self.assertEqual(scenario['annual_saving'], 136.5)
+
+    def test_scenarios_price_with_factor_versions_and_regional_values(self):
+        EmissionFactorVersion.objects.create(
+            factor=self.car, co2_per_unit=0.4, valid_from=date(2025, 3, 1), valid_to=date(2025, 5, 1)
+        )
+        EmissionFactorVersion.objects.create(factor=self.train, co2_per_unit=0.1, valid_from=date(2025, 4, 1))
+        RegionalFactor.objects.create(region='norway', factor=self.train, co2_per_unit=0.01)
+        cache.clear()
+        days = [self.today - timedelta(days=days_ago) for days_ago in range(0, 200, 3)]
+
+        for region in ('', 'norway'):
+            catalogue = get_catalogue(region)
+            with self.subTest(region=region):
+                for factor in (self.car, self.train, self.beef):
+                    factor = catalogue.get(factor.pk)
+                    prices = unit_prices(
+                        catalogue, np.full(len(days), factor.pk), np.array([day_number(day) for day in days])
+                    )
+                    self.assertEqual(prices.tolist(), [catalogue.value_on(factor, day) for day in days])
+
+                history = History.from_rows(
+                    (self.car.pk, 10, day, 10 * catalogue.value_on(self.car, day)) for day in days
+                )
+                saving = sum(
+                    10 * (catalogue.value_on(self.car, day) - catalogue.value_on(self.train, day)) for day in days
+                )
+                scenario = substitution(history, [(self.car.pk, self.train.pk, 1)], self.today, catalogue)
+                self.assertEqual(scenario['saving'], round(saving, 3))
+
+    def test_api_rejects_swaps_between_units(self):
+        self.client.force_login(self.user)
+        url = reverse('api_v1_projections')
+
+        response = self.client.get(url, {'swap': f'{self.car.pk}:{self.beef.pk}'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cannot be swapped', response.json()['error'])
+        self.assertEqual(self.client.get(url, {'swap': 'car:train'}).status_code, 400)
+        self.assertEqual(self.client.get(url).json()['scenario'], None)
+
+
+class GoalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('frank', password='s3cret-pass')
+        cls.profile = UserProfile.objects.create(user=cls.user, daily_goal=5.0)
+        cls.car = EmissionFactor.objects.create(
+            category='transport', name='Car', unit='km', co2_per_unit=0.2
+        )
+        cls.today = date.today()
+
+    def setUp(self):
+        cache.clear()
+
+    def log(self, quantity, days_ago=0):
+        return Activity.objects.create(
+            user=self.user, emission_factor=self.car, quantity=quantity,
+            date=self.today - timedelta(days=days_ago),
+        )
+
+    def runs(self):
+        return list(GoalStreak.objects.filter(user=self.user).order_by('start').values_list('length', flat=True))
+
+    def snapshot(self):
+        return (
+            self.runs(),
+            sorted(GoalMonth.objects.filter(user=self.user).values_list('month', 'tracked_days', 'hit_days')),
+        )
+
+    def test_editing_an_old_day_splits_and_rejoins_the_streak(self):
+        activities = [self.log(10, days_ago=days_ago) for days_ago in range(6)]
+        self.assertEqual(self.runs(), [6])
+        self.assertEqual(goals.status(self.user)['current_streak']['length'], 6)
+
+        # 40 km is 8 kg, over the 5 kg goal: the run splits around that day
+        middle = activities[3]
+        middle.quantity = 40
+        middle.save()
+        self.assertEqual(self.runs(), [2, 3])
+        status = goals.status(self.user)
+        self.assertEqual(status['current_streak']['length'], 3)
+        self.assertEqual(status['longest_streak']['length'], 3)
+
+        incremental = self.snapshot()
+        goals.rebuild(user_ids=[self.user.pk])
+        self.assertEqual(self.snapshot(), incremental)
+
+        middle.delete()
+        self.assertEqual(self.runs(), [2, 3])
+        self.log(5, days_ago=3)
+        self.assertEqual(self.runs(), [6])
+        month = GoalMonth.objects.get(user=self.user, month=self.today.replace(day=1))
+        self.assertEqual(month.hit_days, month.tracked_days)
+
+    def test_goal_change_rejudges_past_days(self):
+        self.log(30, days_ago=1)
+        self.log(30)
+        self.assertEqual(self.runs(), [])
+
+        self.profile.daily_goal = 8.0
+        self.profile.save()
+        self.assertEqual(self.runs(), [2])
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('api_v1_goals'), {'days': 7})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['current_streak']['length'], 2)
+        self.assertTrue(data['today']['hit'])
+        self.assertEqual([day['total'] for day in data['history']['days']], [6.0, 6.0])
+        self.assertEqual(self.client.get(reverse('api_v1_goals'), {'days': 'x'}).status_code, 400)
+        self.assertContains(self.client.get(reverse('goals')), '2 days')
+
+
+class LeaderboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        car = EmissionFactor.objects.create(
+            category='transport', name='Car', unit='km', co2_per_unit=0.2
+        )
+        cls.today = date(2025, 7, 2)  # a Wednesday
+        # (username, location, km this week); dan and eve tie
+        cls.users = {}
+        for username, location, km in [
+            ('ann', 'Leeds', 10), ('ben', ' leeds ', 40), ('cat', 'York', 20),
+            ('dan', '', 30), ('eve', 'LEEDS', 30),
+        ]:
+            user = User.objects.create_user(username, password='s3cret-pass')
+            UserProfile.objects.create(user=user, location=location)
+            Activity.objects.create(user=user, emission_factor=car, quantity=km, date=cls.today)
+            cls.users[username] = user
+        # Last week's activity is outside the ranked week
+        Activity.objects.create(
+            user=cls.users['ann'], emission_factor=car, quantity=500, date=cls.today - timedelta(days=7),
+        )
+
+    def test_ranks_percentiles_and_location_cohorts(self):
+        self.assertEqual(leaderboard.refresh('week', self.today), 5)
+
+        with self.assertNumQueries(4):  # latest period, entry, cohorts, top
+            board = leaderboard.leaderboard(self.users['eve'], 'week', 'location', today=self.today)
+        self.assertEqual(board['start'], '2025-06-30')
+        self.assertEqual(board['location'], 'leeds')
+        self.assertEqual(board['total'], 6.0)
+        self.assertEqual(board['overall'], {'rank': 3, 'percentile': 20.0, 'size': 5})
+        self.assertEqual(board['local'], {'rank': 2, 'percentile': 33.3, 'size': 3})
+        self.assertEqual(
+            [(item['rank'], item['username'], item['is_you']) for item in board['top']],
+            [(1, 'ann', False), (2, 'eve', True), (3, 'ben', False)],
+        )
+
+        board = leaderboard.leaderboard(self.users['dan'], 'week', today=self.today)
+        self.assertEqual([(item['rank'], item['username']) for item in board['top']], [
+            (1, 'ann'), (2, 'cat'), (3, 'dan'), (3, 'eve'), (5, 'ben'),
+        ])
+        self.assertIsNone(board['local'])
+
+    def test_api_serves_the_latest_refresh(self):
+        self.client.force_login(self.users['ann'])
+        url = reverse('api_v1_leaderboard')
+        self.assertIsNone(self.client.get(url).json()['overall'])
+
+        call_command('refresh_leaderboard', '--date', self.today.isoformat(), stdout=StringIO())
+        data = self.client.get(url, {'period': 'month', 'limit': 2}).json()
+        self.assertEqual(data['start'], '2025-07-01')
+        self.assertEqual(data['overall']['rank'], 1)
+        self.assertEqual(len(data['top']), 2)
+        self.assertEqual(self.client.get(url, {'period': 'year'}).status_code, 400)
+
+
+@override_settings(GREENSTEPS_JOBS_INLINE=False)
+class JobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('gina', password='s3cret-pass')
+        cls.car = EmissionFactor.objects.create(
+            category='transport', name='Car', unit='km', co2_per_unit=0.2
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_factor_edits_queue_one_idempotent_repricing_job(self):
+        Activity.objects.create(user=self.user, emission_factor=self.car, quantity=10)
+        for co2_per_unit in (0.3, 0.4):
+            self.car.co2_per_unit = co2_per_unit
+            self.car.save()
+
+        job = Job.objects.get()
+        self.assertEqual((job.kind, job.status, job.key), ('reprice_factor', Job.QUEUED, f'reprice_factor:{self.car.pk}'))
+        self.assertEqual(Activity.objects.get().co2_emissions, 2.0)
+
+        self.assertEqual(jobs.work(once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.attempts), (Job.DONE, {'repriced': 1}, 1))
+        self.assertAlmostEqual(Activity.objects.get().co2_emissions, 4.0)
+        self.assertAlmostEqual(DailyEmission.objects.get().total_co2, 4.0)
+
+        # Once the queued job has been taken, the next edit queues a new one
+        self.car.co2_per_unit = 0.1
+        self.car.save()
+        self.assertEqual(Job.objects.filter(status=Job.QUEUED).count(), 1)
+
+    def test_repricing_invalidates_cached_pages_and_etags(self):
+        UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            Activity.objects.create(user=self.user, emission_factor=self.car, quantity=10)
+            self.car.co2_per_unit = 1.0
+            self.car.save()
+
+        # Served between the factor edit and the job, from the old totals
+        self.assertEqual(self.client.get(reverse('dashboard')).context['today_emissions'], 2.0)
+        etag = self.client.get(reverse('api_v1_summary'))['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(jobs.work(once=True), 1)
+        self.assertEqual(self.client.get(reverse('dashboard')).context['today_emissions'], 10.0)
+        response = self.client.get(reverse('api_v1_summary'), headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'], 10.0)
+
+    def test_failures_are_retried_with_backoff_then_fail(self):
+        job = jobs.enqueue('rebuild_rollups', max_attempts=2)
+        failing = mock.Mock(side_effect=RuntimeError('disk full'))
+        with mock.patch.dict(jobs.TASKS, rebuild_rollups=failing), self.assertLogs('tracker.jobs', 'ERROR'):
+            jobs.work(once=True)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+            self.assertIn('disk full', job.error)
+            self.assertEqual(jobs.work(once=True), 0)  # not due until the backoff has passed
+
+            Job.objects.filter(pk=job.pk).update(run_after=job.created_at)
+            jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+        # A worker that died mid-job leaves it running until its heartbeat goes stale
+        stale = jobs.enqueue('rebuild_rollups')
+        jobs.claim('lost-worker')
+        self.assertEqual(jobs.requeue_stale(timeout=60), 0)
+        Job.objects.filter(pk=stale.pk).update(heartbeat_at=stale.created_at - timedelta(hours=1))
+        with self.assertLogs('tracker.jobs', 'WARNING'):
+            self.assertEqual(jobs.requeue_stale(timeout=60), 1)
+        self.assertEqual(Job.objects.get(pk=stale.pk).status, Job.QUEUED)
+
+    @override_settings(GREENSTEPS_JOBS_INLINE=True)
+    def test_import_view_queues_the_upload(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile('history.csv', b'factor,quantity,date\nCar,10,2025-03-01\nBus,1,2025-03-01\n')
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('import_activities'), {'file': upload})
+            self.assertRedirects(response, reverse('import_activities'))
+            self.assertEqual(os.listdir(os.path.join(media_root, 'imports', str(self.user.pk))), [])
+
+        job = Job.objects.get(kind='import_activities')
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.result['created'], 1)
+        self.assertContains(self.client.get(reverse('import_activities')), 'Imported 1 activities')
+        self.assertEqual(self.client.get(reverse('api_v1_job_detail', args=[job.pk])).json()['status'], 'done')
+
+    def test_requeued_import_is_applied_once(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            upload = ContentFile(b'factor,quantity,date\nCar,10,2025-03-01\n')
+            path = default_storage.save('imports/history.csv', upload)
+            job = jobs.enqueue('import_activities', {'path': path, 'fmt': 'csv'}, user=self.user)
+            slow = jobs.claim('slow-worker')
+
+            # The slow worker is still importing when its job is handed to another run
+            Job.objects.filter(pk=job.pk).update(heartbeat_at=job.created_at - timedelta(hours=2))
+            with self.assertLogs('tracker.jobs', 'WARNING'):
+                jobs.requeue_stale(timeout=60)
+                jobs.execute(slow)
+            self.assertFalse(Activity.objects.exists())
+            self.assertEqual(Job.objects.get(pk=job.pk).status, Job.QUEUED)
+
+            Job.objects.filter(pk=job.pk).update(run_after=job.created_at)
+            self.assertEqual(jobs.work(once=True), 1)
+            # A late failure from the first run (its file is gone) changes nothing
+            with self.assertLogs('tracker.jobs', 'ERROR'):
+                jobs.execute(slow)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.result['created']), (Job.DONE, 2, 1))
+        self.assertEqual(Activity.objects.count(), 1)
+        self.assertAlmostEqual(DailyEmission.objects.get().total_co2, 2.0)
+
+
+@override_settings(GREENSTEPS_JOBS_INLINE=False)
+class FactorLoaderTests(TestCase):
+    def write(self, directory, filename, content):
+        path = os.path.join(directory, filename)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(content)
+        return path
+
+    def test_reload_updates_in_place_and_keeps_activities(self):
+        user = User.objects.create_user('hana', password='s3cret-pass')
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write(directory, 'base.csv', (
+                'category,name,unit,co2_per_unit,description\n'
+                'transport,Car,km,0.2,\n'
+                'food,Beef meal,meal,3.3,\n'
+            ))
+            result = factor_sets.load([path])
+            self.assertEqual((len(result.created), len(result.updated)), (2, 0))
+            car = EmissionFactor.objects.get(name='Car')
+            activity = Activity.objects.create(user=user, emission_factor=car, quantity=10)
+
+            # Unchanged file: skipped on its checksum
+            with self.assertNumQueries(1):
+                self.assertEqual(factor_sets.load([path]).skipped_sets, ['base'])
+
+            self.write(directory, 'base.csv', (
+                'category,name,unit,co2_per_unit,description\n'
+                'transport,car,km,0.25,Petrol car\n'
+                'energy,Grid electricity,kWh,0.5,\n'
+            ))
+            result = factor_sets.load([path], prune=True)
+
+        self.assertEqual([factor.name for factor in result.created], ['Grid electricity'])
+        self.assertEqual([factor.name for factor in result.repriced], ['car'])
+        self.assertEqual([factor.name for factor in result.removed], ['Beef meal'])
+        car.refresh_from_db()
+        self.assertEqual((car.name, car.co2_per_unit, car.description), ('car', 0.25, 'Petrol car'))
+        self.assertTrue(Activity.objects.filter(pk=activity.pk).exists())
+        job = Job.objects.get()
+        self.assertEqual((job.kind, job.payload), ('reprice_factors', {'factor_ids': [car.pk]}))
+
+    def test_invalid_rows_and_duplicates_are_rejected(self):
+        with tempfile.TemporaryDirectory() as directory:
+            bad = self.write(directory, 'bad.json', '{"factors": [{"category": "space", "name": "Rocket", "unit": "km", "co2_per_unit": 1}]}')
+            with self.assertRaisesMessage(ValueError, "bad.json factor 1: unknown category 'space'"):
+                factor_sets.load([bad])
+            first = self.write(directory, 'a.csv', 'category,name,unit,co2_per_unit\nfood,Coffee,cup,0.21\n')
+            second = self.write(directory, 'b.csv', 'category,name,unit,co2_per_unit\nfood,COFFEE,cup,0.3\n')
+            with self.assertRaisesMessage(ValueError, "is in both a and b"):
+                factor_sets.load([first, second])
+        self.assertFalse(EmissionFactor.objects.exists())
+
+        # The database holds the natural key to the same rule
+        EmissionFactor.objects.create(category='food', name='Coffee', unit='cup', co2_per_unit=0.21)
+        variant = EmissionFactor(category='food', name='COFFEE', unit='cup', co2_per_unit=0.3)
+        with self.assertRaisesMessage(ValidationError, 'already exists in this category'):
+            variant.validate_constraints()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            variant.save()
+
+    def test_regional_sets_write_regional_values(self):
+        with tempfile.TemporaryDirectory() as directory:
+            base = self.write(directory, 'base.csv', (
+                'category,name,unit,co2_per_unit\n'
+                'energy,Grid electricity,kWh,0.5\n'
+            ))
+            uk = self.write(directory, 'uk.json', json.dumps({'region': 'United  Kingdom', 'factors': [
+                {'category': 'energy', 'name': 'grid electricity', 'co2_per_unit': 0.2},
+            ]}))
+            nordic = self.write(directory, 'nordic.csv', (
+                'region,category,name,unit,co2_per_unit\n'
+                'Norway,energy,Grid electricity,kWh,0.02\n'
+                'Sweden,energy,Grid electricity,kWh,0.04\n'
+            ))
+            result = factor_sets.load([base, uk, nordic])
+            self.assertEqual((len(result.created), len(result.regional_created)), (1, 3))
+            grid = EmissionFactor.objects.get()
+            self.assertEqual(
+                sorted(RegionalFactor.objects.values_list('region', 'factor', 'co2_per_unit')),
+                [('norway', grid.pk, 0.02), ('sweden', grid.pk, 0.04), ('united kingdom', grid.pk, 0.2)],
+            )
+
+            Job.objects.all().delete()
+            self.write(directory, 'nordic.csv', (
+                'region,category,name,unit,co2_per_unit\n'
+                'Norway,energy,Grid electricity,kWh,0.03\n'
+            ))
+            result = factor_sets.load([base, uk, nordic], prune=True)
+            self.assertEqual([regional.co2_per_unit for regional in result.regional_updated], [0.03])
+            self.assertEqual([regional.region for regional in result.regional_removed], ['sweden'])
+            self.assertEqual(list(Job.objects.values_list('kind', 'payload')), [
+                ('reprice_factor', {'factor_id': grid.pk}),
+            ])
+
+            for content, message in (
+                ('region,category,name,unit,co2_per_unit\nNorway,energy,Wind power,kWh,0.01\n', 'has no global factor'),
+                ('region,category,name,unit,co2_per_unit\nNorway,energy,Grid electricity,MWh,30\n', 'is in MWh'),
+            ):
+                with self.subTest(message=message), self.assertRaisesMessage(ValueError, message):
+                    factor_sets.load([base, self.write(directory, 'nordic.csv', content)], force=True)
+
+    def test_bundled_data_files_load(self):
+        result = factor_sets.load()
+        self.assertEqual(len(result.created), EmissionFactor.objects.count())
+        grid = EmissionFactor.objects.get(category='energy', name='Grid electricity')
+        self.assertEqual(
+            dict(RegionalFactor.objects.filter(factor=grid).values_list('region', 'co2_per_unit')),
+            {'france': 0.052, 'united kingdom': 0.207},
+        )
+
+
+@override_settings(GREENSTEPS_JOBS_INLINE=False)
+class FactorVersionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ivan', password='s3cret-pass')
+        cls.grid = EmissionFactor.objects.create(
+            category='energy', name='Grid electricity', unit='kWh', co2_per_unit=0.4
+        )
+        EmissionFactorVersion.objects.create(
+            factor=cls.grid, co2_per_unit=0.5, valid_from=date(2024, 1, 1), valid_to=date(2025, 1, 1)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_activities_are_priced_with_the_value_valid_on_their_date(self):
+        catalogue = get_catalogue()
+        self.assertEqual(catalogue.value_on(self.grid, date(2023, 12, 31)), 0.4)
+        self.assertEqual(catalogue.value_on(self.grid, date(2024, 1, 1)), 0.5)
+        self.assertEqual(catalogue.value_on(self.grid, date(2025, 1, 1)), 0.4)
+
+        old = Activity.objects.create(user=self.user, emission_factor=self.grid, quantity=10, date=date(2024, 6, 1))
+        new = Activity.objects.create(user=self.user, emission_factor=self.grid, quantity=10, date=date(2025, 6, 1))
+        self.assertEqual((old.co2_emissions, new.co2_emissions), (5.0, 4.0))
+
+        overlapping = EmissionFactorVersion(factor=self.grid, co2_per_unit=0.3, valid_from=date(2024, 12, 1))
+        with self.assertRaisesMessage(ValidationError, 'Overlaps the version valid from 2024-01-01 to 2025-01-01'):
+            overlapping.full_clean()
+
+    def test_version_edits_reprice_only_their_range(self):
+        activities = [
+            Activity.objects.create(user=self.user, emission_factor=self.grid, quantity=10, date=day)
+            for day in (date(2023, 6, 1), date(2024, 6, 1), date(2025, 6, 1))
+        ]
+        EmissionFactorVersion.objects.create(factor=self.grid, co2_per_unit=0.3, valid_from=date(2025, 1, 1))
+
+        job = Job.objects.latest('pk')
+        self.assertEqual(job.payload, {'factor_id': self.grid.pk, 'start': '2025-01-01', 'end': None})
+        Job.objects.exclude(pk=job.pk).delete()  # queued by setUpTestData's version
+        self.assertEqual(jobs.work(once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.result, {'repriced': 1})
+        for activity in activities:
+            activity.refresh_from_db()
+        self.assertEqual([activity.co2_emissions for activity in activities], [4.0, 5.0, 3.0])
+        self.assertAlmostEqual(DailyEmission.objects.get(date=date(2025, 6, 1)).total_co2, 3.0)
+
+
+@override_settings(GREENSTEPS_JOBS_INLINE=False)
+class RegionalFactorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.grid = EmissionFactor.objects.create(
+            category='energy', name='Grid electricity', unit='kWh', co2_per_unit=0.4
+        )
+        cls.oslo = User.objects.create_user('jo', password='s3cret-pass')
+        UserProfile.objects.create(user=cls.oslo, location='  Oslo ')
+        cls.elsewhere = User.objects.create_user('kim', password='s3cret-pass')
+        UserProfile.objects.create(user=cls.elsewhere)
+        RegionalFactor.objects.create(region='OSLO', factor=cls.grid, co2_per_unit=0.02)
+        Job.objects.all().delete()
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_activities_and_forms_use_the_users_region(self):
+        self.client.force_login(self.oslo)
+        self.assertContains(self.client.get(reverse('add_activity')), 'Grid electricity (0.02 kg CO2/kWh)')
+        self.client.post(reverse('add_activity'), {
+            'emission_factor': self.grid.pk, 'quantity': 100, 'date': '2025-03-01', 'notes': '',
+        })
+        other = Activity.objects.create(user=self.elsewhere, emission_factor=self.grid, quantity=100)
+        self.assertEqual(Activity.objects.get(user=self.oslo).co2_emissions, 2.0)
+        self.assertEqual(other.co2_emissions, 40.0)
+
+        factors = self.client.get(reverse('api_v1_factors'), {'region': 'oslo'}).json()
+        self.assertEqual(factors['region'], 'oslo')
+        self.assertEqual(factors['categories'][0]['factors'][0]['co2_per_unit'], 0.02)
+        self.assertEqual(get_catalogue('oslo').value_on(self.grid, date(2025, 3, 1)), 0.02)
+        self.assertIs(get_catalogue('bergen'), get_catalogue())
+
+    def test_regional_changes_reprice_in_the_background(self):
+        mine = Activity.objects.create(user=self.oslo, emission_factor=self.grid, quantity=100)
+        theirs = Activity.objects.create(user=self.elsewhere, emission_factor=self.grid, quantity=100)
+
+        RegionalFactor.objects.filter(region='oslo').update(co2_per_unit=0.03)
+        RegionalFactor.objects.create(region='Bergen', factor=self.grid, co2_per_unit=0.01)
+        profile = self.elsewhere.userprofile
+        profile.location = 'bergen'
+        profile.save()
+        self.assertEqual(sorted(Job.objects.values_list('kind', flat=True)), ['reprice_factor', 'reprice_user'])
+
+        jobs.work(once=True)
+        mine.refresh_from_db()
+        theirs.refresh_from_db()
+        self.assertAlmostEqual(mine.co2_emissions, 3.0)
+        self.assertAlmostEqual(theirs.co2_emissions, 1.0)
+        self.assertAlmostEqual(DailyEmission.objects.get(user=self.elsewhere).total_co2, 1.0)
+
+    def test_profiles_store_their_region_for_sql_lookups(self):
+        profile = self.elsewhere.userprofile
+        profile.location = ' Bergen'
+        profile.save(update_fields=['location'])
+        profile.refresh_from_db()
+        self.assertEqual((self.oslo.userprofile.region, profile.region), ('oslo', 'bergen'))
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                pricing.users_by_region({'oslo', 'bergen', 'paris'}),
+                {'oslo': [self.oslo.pk], 'bergen': [self.elsewhere.pk]},
+            )
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('carol', password='s3cret-pass')
+        car = EmissionFactor.objects.create(
+            category='transport', name='Car', unit='km', co2_per_unit=0.2
+        )
+        for days_ago in range(3):
+            Activity.objects.create(
+                user=cls.user, emission_factor=car, quantity=10,
+                date=date.today() - timedelta(days=days_ago),
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_read_views_match_their_sync_counterparts(self):
+        dashboard = self.client.get(reverse('dashboard'))
+        self.assertEqual(dashboard.context['today_emissions'], 2.0)
+        self.assertEqual(dashboard.context['week_emissions'], 6.0)
+        self.assertEqual(self.client.get(reverse('home')).context['goal_percentage'], 20.0)
+
+        activities = self.client.get(reverse('activities_list'), {'page_size': 2})
+        self.assertEqual(activities.context['total_count'], 3)
+        self.assertEqual(len(activities.context['activities']), 2)
+        self.assertIsNotNone(activities.context['next_cursor'])
+
+        weekly = self.client.get(reverse('api_weekly_data'))
+        self.assertEqual([point['emissions'] for point in weekly.json()['data']][-3:], [2.0, 2.0, 2.0])
+        not_modified = self.client.get(reverse('api_weekly_data'), HTTP_IF_NONE_MATCH=weekly['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+
+@override_settings(
+    GREENSTEPS_PERF=True,
+    GREENSTEPS_PERF_QUERY_BUDGET=3,
+    GREENSTEPS_PERF_LOG=None,
+    TEMPLATES=[{
+        'BACKEND': 'tracker.perf.TimedDjangoTemplates',
+        'APP_DIRS': True,
+        'OPTIONS': {'context_processors': [
+            'django.template.context_processors.request',
+            'django.contrib.auth.context_processors.auth',
+            'django.contrib.messages.context_processors.messages',
+        ]},
+    }],
+)
+class PerformanceMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('dave', password='s3cret-pass', is_staff=True)
+        UserProfile.objects.create(user=cls.staff)
+
+    def setUp(self):
+        cache.clear()
+        perf.clear()
+        self.client.force_login(self.staff)
+        get_catalogue()
+
+    def test_records_costs_and_warns_over_query_budget(self):
+        with self.assertLogs('tracker.perf', level='WARNING') as logs:
+            self.client.get(reverse('dashboard'))
+
+        entry = perf.recent()[-1]
+        self.assertEqual(entry['view'], 'dashboard')
+        self.assertEqual(entry['queries'], 5)
+        self.assertGreater(entry['template_ms'], 0)
+        self.assertGreaterEqual(entry['total_ms'], entry['db_ms'])
+        self.assertIn('dashboard ran 5 queries (budget 3)', logs.output[0])
+
+        stats = self.client.get(reverse('perf_stats')).json()
+        self.assertEqual(stats['views'][0]['view'], 'dashboard')
+
+
+class SQLiteProfileTests(SimpleTestCase):
+    THREADS = 4
+    TRANSACTIONS = 20
+
+    def test_asgi_turns_off_persistent_connections(self):
+        from GreenSteps.settings.base import database_settings
+
+        self.assertEqual(database_settings('tuned', 'wsgi')['default']['CONN_MAX_AGE'], 600)
+        self.assertEqual(database_settings('tuned', 'asgi')['default']['CONN_MAX_AGE'], 0)
+
+    def write_load(self, profile):
+        """
+        Run read-then-write transactions (like get_or_create or a rollup
+        update) from several threads against a scratch database file and
+        return (committed, failed).
+        """
+        options = settings.GREENSTEPS_DB_PROFILES[profile]
+        mode = options.get('OPTIONS', {}).get('transaction_mode', 'DEFERRED')
+        with tempfile.TemporaryDirectory() as directory:
+            handler = ConnectionHandler({'default': {}, 'load': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(directory, 'load.sqlite3'),
+                **options,
+            }})
+            with handler['load'].cursor() as cursor:
+                cursor.execute('CREATE TABLE entry (id INTEGER PRIMARY KEY, n INTEGER)')
+            handler['load'].close()
+
+            failures = []
+
+            def worker():
+                connection = handler['load']
+                try:
+                    for n in range(self.TRANSACTIONS):
+                        with connection.cursor() as cursor:
+                            try:
+                                cursor.execute(f'BEGIN {mode}')
+                                cursor.execute('SELECT COUNT(*) FROM entry')
+                                time.sleep(0.001)
+                                cursor.execute('INSERT INTO entry (n) VALUES (%s)', [n])
+                                cursor.execute('COMMIT')
+                            except OperationalError:
+                                failures.append(n)
+                                if connection.connection.in_transaction:
+                                    cursor.execute('ROLLBACK')
+                finally:
+                    connection.close()
+
+            threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            with handler['load'].cursor() as cursor:
+                cursor.execute('SELECT COUNT(*) FROM entry')
+                committed = cursor.fetchone()[0]
+            handler['load'].close()
+        return committed, len(failures)
+
+    def test_tuned_profile_queues_concurrent_writers_instead_of_failing(self):
+        committed, failed = self.write_load('default')
+        self.assertGreater(failed, 0)
+        self.assertLess(committed, self.THREADS * self.TRANSACTIONS)
+
+        committed, failed = self.write_load('tuned')
+        self.assertEqual(failed, 0)
+        self.assertEqual(committed, self.THREADS * self.TRANSACTIONS)
+
+
+class ProductionChecksTests(SimpleTestCase):
+    def check_ids(self):
+        return sorted(message.id for message in checks.check_production_performance(None))
+
+    def test_flags_hostile_settings_only_in_production(self):
+        hostile = {
+            'DEBUG': True,
+            'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+            'GREENSTEPS_PERF': True,
+            'GREENSTEPS_JOBS_INLINE': True,
+        }
+        with override_settings(GREENSTEPS_ENV='dev', **hostile):
+            self.assertEqual(self.check_ids(), [])
+        with override_settings(GREENSTEPS_ENV='prod', **hostile):
+            self.assertEqual(self.check_ids(), [
+                'greensteps.W001', 'greensteps.W002', 'greensteps.W004',
+                'greensteps.W005', 'greensteps.W007', 'greensteps.W008', 'greensteps.W008',
+                'greensteps.W009', 'greensteps.W010',
+            ])
+
+    def test_flags_shared_cache_at_django_default_size(self):
+        small = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                 'LOCATION': tempfile.gettempdir()}
+        with override_settings(GREENSTEPS_ENV='prod', CACHES={'default': small}):
+            self.assertIn('greensteps.W011', self.check_ids())
+        sized = {**small, 'OPTIONS': {'MAX_ENTRIES': checks.MIN_CACHE_ENTRIES}}
+        with override_settings(GREENSTEPS_ENV='prod', CACHES={'default': sized}):
+            self.assertNotIn('greensteps.W011', self.check_ids())
+
+    def test_flags_sessions_that_do_not_suit_the_cache(self):
+        file_cache = {**settings.CACHE_BACKENDS['file'], 'LOCATION': tempfile.gettempdir()}
+        for cache_settings, engine, expected in (
+            (file_cache, 'db', ['greensteps.W003']),
+            (file_cache, 'cached_db', []),
+            (settings.CACHE_BACKENDS['db'], 'cached_db', ['greensteps.W013']),
+            (settings.CACHE_BACKENDS['db'], 'db', []),
+        ):
+            with self.subTest(cache=cache_settings['BACKEND'], engine=engine), override_settings(
+                GREENSTEPS_ENV='prod', CACHES={'default': cache_settings},
+                SESSION_ENGINE=f'django.contrib.sessions.backends.{engine}',
+            ):
+                sessions = {'greensteps.W003', 'greensteps.W013'}
+                self.assertEqual([message for message in self.check_ids() if message in sessions], expected)
+
+    def test_flags_persistent_connections_under_asgi(self):
+        tuned = {**settings.DATABASES['default'], **settings.GREENSTEPS_DB_PROFILES['tuned']}
+        asgi = {'GREENSTEPS_ENV': 'prod', 'GREENSTEPS_SERVER': 'asgi'}
+        # The check only reads DATABASES; no connection is opened
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            with override_settings(DATABASES={'default': tuned}, **asgi):
+                self.assertIn('greensteps.W012', self.check_ids())
+                self.assertNotIn('greensteps.W004', self.check_ids())
+            with override_settings(DATABASES={'default': {**tuned, 'CONN_MAX_AGE': 0}}, **asgi):
+                self.assertNotIn('greensteps.W012', self.check_ids())
+                self.assertNotIn('greensteps.W004', self.check_ids())
+
+    def test_production_defaults_pass(self):
+        database = {**settings.DATABASES['default'], **settings.GREENSTEPS_DB_PROFILES['tuned']}
+        production = override_settings(
+            GREENSTEPS_ENV='prod',
+            DEBUG=False,
+            GREENSTEPS_PERF=False,
+            GREENSTEPS_JOBS_INLINE=False,
+            CACHES={'default': settings.CACHE_BACKENDS['db']},
+            SESSION_ENGINE='django.contrib.sessions.backends.db',
+            STORAGES={**settings.STORAGES, 'staticfiles': {
+                'BACKEND': 'tracker.assets.CompressedManifestStaticFilesStorage',
+            }},
+            DATABASES={'default': database},
+            MIDDLEWARE=settings.MIDDLEWARE + [
+                'django.middleware.gzip.GZipMiddleware',
+                'django.middleware.http.ConditionalGetMiddleware',
+            ],
+        )
+        # The check only reads DATABASES; no connection is opened
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            with production:
+                self.assertEqual(self.check_ids(), [])
+
+
+class StaticAssetTests(SimpleTestCase):
+    def test_collected_bundles_are_hashed_precompressed_and_cached_long_term(self):
+        with tempfile.TemporaryDirectory() as static_root, override_settings(
+            STATIC_ROOT=static_root,
+            STORAGES={**settings.STORAGES, 'staticfiles': {
+                'BACKEND': 'tracker.assets.CompressedManifestStaticFilesStorage',
+            }},
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            hashed = staticfiles_storage.stored_name('css/tips.css')
+            self.assertRegex(hashed, r'^css/tips\.[0-9a-f]{12}\.css$')
+            self.assertTrue(os.path.exists(os.path.join(static_root, hashed + '.gz')))
+
+            request = RequestFactory().get('/static/' + hashed, HTTP_ACCEPT_ENCODING='gzip')
+            response = assets.serve(request, hashed)
+            body = gzip.decompress(b''.join(response.streaming_content))
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response['Content-Type'], 'text/css')
+            self.assertIn('immutable', response['Cache-Control'])
+            self.assertIn('.tips-container', body.decode())
+
+            plain = assets.serve(RequestFactory().get('/static/css/tips.css'), 'css/tips.css')
+            self.assertFalse(plain.has_header('Content-Encoding'))
+            self.assertNotIn('immutable', plain['Cache-Control'])
+            plain.close()
+            response.close()
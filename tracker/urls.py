@@ -1,13 +1,33 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
+
+# Async variants of the read-heavy views, for ASGI deployments
+reads = async_views if settings.GREENSTEPS_ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('', views.home, name='home'),
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path('', reads.home, name='home'),
+    path('dashboard/', reads.dashboard, name='dashboard'),
     path('add/', views.add_activity, name='add_activity'),
-    path('activities/', views.activities_list, name='activities_list'),
+    path('activities/', reads.activities_list, name='activities_list'),
+    path('activities/import/', views.import_activities, name='import_activities'),
+    path('activities/export/', views.export_activities, name='export_activities'),
+    path('activities/page/', views.api_activities_page, name='api_activities_page'),
     path('activities/delete/<int:activity_id>/', views.delete_activity, name='delete_activity'),
     path('tips/', views.tips, name='tips'),
+    path('goals/', views.goals, name='goals'),
+    path('leaderboard/', views.leaderboard, name='leaderboard'),
+    path('projections/', views.projections, name='projections'),
     path('register/', views.register, name='register'),
-    path('api/weekly-data/', views.api_weekly_data, name='api_weekly_data'),
+    path('api/weekly-data/', reads.api_weekly_data, name='api_weekly_data'),
+    path('api/v1/activities/', api.activities, name='api_v1_activities'),
+    path('api/v1/activities/<int:activity_id>/', api.activity_detail, name='api_v1_activity_detail'),
+    path('api/v1/summary/', api.summary, name='api_v1_summary'),
+    path('api/v1/timeseries/', api.timeseries, name='api_v1_timeseries'),
+    path('api/v1/factors/', api.factors, name='api_v1_factors'),
+    path('api/v1/goals/', api.goals, name='api_v1_goals'),
+    path('api/v1/leaderboard/', api.leaderboard, name='api_v1_leaderboard'),
+    path('api/v1/jobs/<int:job_id>/', api.job_detail, name='api_v1_job_detail'),
+    path('api/v1/projections/', api.projections, name='api_v1_projections'),
+    path('perf/stats/', views.perf_stats, name='perf_stats'),
 ]
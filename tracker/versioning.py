@@ -0,0 +1,74 @@
+"""
+Version stamps kept in the default cache.
+
+A version is an opaque integer that changes whenever the data it guards
+changes. Readers compare the stamp they built something from against the
+current one and rebuild on mismatch. Stamps are derived from the clock, so
+a stamp that is evicted from the cache comes back as a new value and never
+matches stale data.
+
+A stamp is only as shared as the cache holding it. With the default
+process-local LocMemCache a bump is seen by the process that made it and no
+other; invalidation across web and worker processes needs a shared backend
+(see CACHE_BACKENDS in the settings).
+"""
+import time
+
+from django.core.cache import cache
+
+KEY_PREFIX = 'greensteps:version:'
+
+
+def _new_stamp():
+    return time.time_ns() // 1000
+
+
+def get_version(name):
+    """Return the current stamp for name, creating one if none exists"""
+    key = KEY_PREFIX + name
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_stamp(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(name):
+    """Async get_version(), for use from async views"""
+    key = KEY_PREFIX + name
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _new_stamp(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(name):
+    """Give name a new stamp, invalidating everything built from the old one"""
+    version = _new_stamp()
+    cache.set(KEY_PREFIX + name, version, timeout=None)
+    return version
+
+
+def user_data_key(user_id):
+    return f'user-data:{user_id}'
+
+
+def get_user_version(user_id):
+    """Stamp that changes whenever the user's activities change"""
+    return get_version(user_data_key(user_id))
+
+
+async def aget_user_version(user_id):
+    return await aget_version(user_data_key(user_id))
+
+
+def bump_user_version(user_id):
+    return bump_version(user_data_key(user_id))
+
+
+def bump_user_versions(user_ids):
+    """bump_user_version() for many users with a single cache write"""
+    version = _new_stamp()
+    cache.set_many({KEY_PREFIX + user_data_key(user_id): version for user_id in user_ids}, timeout=None)
+    return version
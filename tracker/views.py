@@ -1,97 +1,102 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login
 from django.contrib.auth.forms import UserCreationForm
+from django.conf import settings
 from django.contrib import messages
-from django.db.models import Sum, Q
+from django.db.models import Count, Sum, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from datetime import date, timedelta
+from django.core.files.storage import default_storage
 from django.http import JsonResponse
-import json
-
-from .models import Activity, EmissionFactor, UserProfile
-from .forms import ActivityForm, UserRegistrationForm
+from django.template.loader import render_to_string
+
+from .models import Activity, Job, UserProfile
+from .forms import ActivityForm, ActivityImportForm, ScenarioForm, UserRegistrationForm
+from . import exporters, importers, jobs, perf, recommendations, versioning
+from .analytics import dashboard_summary, timeseries
+from .catalogue import get_catalogue, region_for
+from .conditional import user_data_condition
+from .pagecache import cached_context
+from .pagination import InvalidCursor, paginate, page_size_from
+from .goals import history as goal_history, status as goal_status
+from .leaderboard import PERIODS as LEADERBOARD_PERIODS, leaderboard as build_leaderboard
+from .projections import projection as build_projection
+
+# Count and CO2 totals over a filtered activity history, in one aggregate
+ACTIVITY_TOTALS = {'count': Count('id'), 'co2': Sum('co2_emissions')}
+# Recent import jobs listed on the import page
+IMPORT_HISTORY = 5
+# Weeks of goal days shown on the goals page
+GOAL_CALENDAR_WEEKS = 12
 
 def home(request):
     """Homepage with overview stats"""
     context = {}
     if request.user.is_authenticated:
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
-        today_emissions = profile.get_daily_emissions()
-        week_emissions = profile.get_weekly_emissions()
-
-        # Calculate goal percentage safely
-        goal_percentage = 0
-        if profile.daily_goal > 0:
-            goal_percentage = (today_emissions / profile.daily_goal) * 100
-
-        # Calculate over goal amount
-        over_goal = max(0, today_emissions - profile.daily_goal)
-
-        context.update({
-            'today_emissions': round(today_emissions, 2),
-            'week_emissions': round(week_emissions, 2),
-            'daily_goal': profile.daily_goal,
-            'goal_percentage': round(goal_percentage, 1),
-            'over_goal': round(over_goal, 1),
-        })
+        context = cached_context(request.user, 'home', lambda: _home_stats(request.user))
 
     return render(request, 'tracker/home.html', context)
 
+def _home_stats(user):
+    profile, created = UserProfile.objects.get_or_create(user=user)
+    return home_stats_context(profile, profile.get_daily_emissions(), profile.get_weekly_emissions())
+
+def home_stats_context(profile, today_emissions, week_emissions):
+    """Homepage stats from the user's profile and emission totals"""
+    # Calculate goal percentage safely
+    goal_percentage = 0
+    if profile.daily_goal > 0:
+        goal_percentage = (today_emissions / profile.daily_goal) * 100
+
+    # Calculate over goal amount
+    over_goal = max(0, today_emissions - profile.daily_goal)
+
+    return {
+        'today_emissions': round(today_emissions, 2),
+        'week_emissions': round(week_emissions, 2),
+        'daily_goal': profile.daily_goal,
+        'goal_percentage': round(goal_percentage, 1),
+        'over_goal': round(over_goal, 1),
+    }
+
 @login_required
 def dashboard(request):
     """Main dashboard with detailed analytics"""
-    profile, created = UserProfile.objects.get_or_create(user=request.user)
+    context = cached_context(request.user, 'dashboard', lambda: _dashboard_context(request.user))
+    return render(request, 'tracker/dashboard.html', context)
+
+def _dashboard_context(user):
+    profile, created = UserProfile.objects.get_or_create(user=user)
 
     # Get recent activities
-    recent_activities = Activity.objects.filter(user=request.user)[:10]
-
-    # Calculate weekly data for chart
-    weekly_data = []
-    for i in range(7):
-        target_date = date.today() - timedelta(days=i)
-        daily_total = profile.get_daily_emissions(target_date)
-        weekly_data.append({
-            'date': target_date.strftime('%a'),
-            'emissions': round(daily_total, 2)
-        })
-    weekly_data.reverse()
-
-    # Category breakdown
-    categories = EmissionFactor.objects.values('category').distinct()
-    category_data = []
-    for cat in categories:
-        category_name = cat['category']
-        total = Activity.objects.filter(
-            user=request.user,
-            emission_factor__category=category_name,
-            date__gte=date.today() - timedelta(days=30)
-        ).aggregate(
-            total=Sum('quantity') * Sum('emission_factor__co2_per_unit')
-        )['total'] or 0
-
-        if total > 0:
-            category_data.append({
-                'category': category_name.title(),
-                'total': round(total, 2)
-            })
+    recent_activities = get_catalogue().attach(
+        list(Activity.objects.filter(user=user)[:10])
+    )
+
+    # Chart series, category breakdown and totals from one rollup query
+    summary = dashboard_summary(user)
+
+    return dashboard_context(profile, recent_activities, summary)
 
-    context = {
+def dashboard_context(profile, recent_activities, summary):
+    """Dashboard template context from its three independent inputs"""
+    return {
         'profile': profile,
         'recent_activities': recent_activities,
-        'weekly_data': json.dumps(weekly_data),
-        'category_data': json.dumps(category_data),
-        'today_emissions': round(profile.get_daily_emissions(), 2),
-        'week_emissions': round(profile.get_weekly_emissions(), 2),
+        'weekly_data': summary['weekly_data'],
+        'category_data': summary['category_data'],
+        'today_emissions': round(summary['today_emissions'], 2),
+        'week_emissions': round(summary['week_emissions'], 2),
     }
 
-    return render(request, 'tracker/dashboard.html', context)
-
 @login_required
 def add_activity(request):
     """Add new activity"""
     if request.method == 'POST':
-        form = ActivityForm(request.POST)
+        form = ActivityForm(request.POST, region=region_for(request.user))
         if form.is_valid():
             activity = form.save(commit=False)
             activity.user = request.user
@@ -99,38 +104,142 @@ def add_activity(request):
             messages.success(request, f'Activity added! CO₂ impact: {activity.co2_emissions:.2f} kg')
             return redirect('dashboard')
     else:
-        form = ActivityForm()
+        form = ActivityForm(region=region_for(request.user))
 
     return render(request, 'tracker/add_activity.html', {'form': form})
 
+@login_required
+def import_activities(request):
+    """Queue an uploaded CSV or JSON file for import and show the user's recent imports"""
+    if request.method == 'POST':
+        form = ActivityImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            fmt = form.cleaned_data['format'] or importers.detect_format(upload.name)
+            path = default_storage.save(f'imports/{request.user.pk}/{upload.name}', upload)
+            jobs.enqueue('import_activities', {'path': path, 'fmt': fmt}, user=request.user)
+            messages.info(request, f'{upload.name} has been queued for import.')
+            return redirect('import_activities')
+    else:
+        form = ActivityImportForm()
+
+    imports = Job.objects.filter(user=request.user, kind='import_activities')[:IMPORT_HISTORY]
+    return render(request, 'tracker/import_activities.html', {'form': form, 'imports': imports})
+
+def _filter_date(request, name):
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None  # well-formed but not a real date, such as 2025-02-30
+    if day is None:
+        raise ValueError(f'{name} must be a date (YYYY-MM-DD)')
+    return day
+
+def filter_activities(request, activities, catalogue=None, ignore_invalid=False):
+    """
+    Apply the category and date range filters from the query string; raises
+    ValueError for a date that cannot be parsed, or with ignore_invalid
+    drops that filter and reports it as filter_error
+    """
+    category = request.GET.get('category')
+    if category:
+        if catalogue is None:
+            catalogue = get_catalogue()
+        # Filter on factor ids so the (user, emission_factor, date) index applies
+        activities = activities.filter(
+            emission_factor_id__in=catalogue.ids_for_category(category)
+        )
+
+    filters = {'selected_category': category}
+    # Filter by date range
+    for name, lookup in (('date_from', 'date__gte'), ('date_to', 'date__lte')):
+        filters[name] = request.GET.get(name)
+        try:
+            day = _filter_date(request, name)
+        except ValueError as exc:
+            if not ignore_invalid:
+                raise
+            filters[name] = ''
+            filters['filter_error'] = str(exc)
+            continue
+        if day:
+            activities = activities.filter(**{lookup: day})
+    return activities, filters
+
 @login_required
 def activities_list(request):
-    """List all user activities with filtering"""
+    """List user activities with filtering, one keyset page at a time"""
+    catalogue = get_catalogue()
     activities = Activity.objects.filter(user=request.user)
+    activities, filters = filter_activities(request, activities, catalogue, ignore_invalid=True)
 
-    # Filter by category if specified
-    category = request.GET.get('category')
-    if category:
-        activities = activities.filter(emission_factor__category=category)
+    # Totals for the whole filtered history in a single aggregate
+    totals = activities.aggregate(**ACTIVITY_TOTALS)
 
-    # Filter by date range
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
-    if date_from:
-        activities = activities.filter(date__gte=date_from)
-    if date_to:
-        activities = activities.filter(date__lte=date_to)
-
-    context = {
-        'activities': activities,
-        'categories': EmissionFactor.CATEGORY_CHOICES,
-        'selected_category': category,
-        'date_from': date_from,
-        'date_to': date_to,
-    }
+    try:
+        page, next_cursor = paginate(activities, request.GET.get('cursor'), page_size_from(request))
+    except InvalidCursor:
+        page, next_cursor = paginate(activities, None, page_size_from(request))
+    catalogue.attach(page)
 
+    context = activities_list_context(request, page, next_cursor, totals, filters, catalogue)
     return render(request, 'tracker/activities_list.html', context)
 
+def activities_list_context(request, page, next_cursor, totals, filters, catalogue):
+    next_params = request.GET.copy()
+    next_params['cursor'] = next_cursor or ''
+
+    return {
+        'activities': page,
+        'total_count': totals['count'],
+        'total_emissions': totals['co2'] or 0,
+        'next_cursor': next_cursor,
+        'next_query': next_params.urlencode(),
+        'categories': catalogue.category_choices,
+        **filters,
+    }
+
+@login_required
+def export_activities(request):
+    """Stream the user's activities as CSV or NDJSON, honouring list filters"""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exporters.FORMATS:
+        return JsonResponse({'error': f'Unsupported export format: {fmt}'}, status=400)
+
+    # Validated before streaming starts, while an error status can still be sent
+    try:
+        activities, _ = filter_activities(request, Activity.objects.filter(user=request.user))
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return exporters.export_response(activities, fmt)
+
+@login_required
+def api_activities_page(request):
+    """JSON page of activities for infinite scroll on the activities list"""
+    activities = Activity.objects.filter(user=request.user)
+    try:
+        activities, filters = filter_activities(request, activities)
+        page, next_cursor = paginate(activities, request.GET.get('cursor'), page_size_from(request))
+    except ValueError as exc:
+        # InvalidCursor is a ValueError too
+        return JsonResponse({'error': str(exc)}, status=400)
+    get_catalogue().attach(page)
+
+    next_params = request.GET.copy()
+    next_params['cursor'] = next_cursor or ''
+
+    return JsonResponse({
+        'results': [activity.as_dict() for activity in page],
+        'html': render_to_string(
+            'tracker/_activity_cards.html', {'activities': page}, request=request
+        ),
+        'next_cursor': next_cursor,
+        'next_query': next_params.urlencode() if next_cursor else None,
+    })
+
 @login_required
 def delete_activity(request, activity_id):
     """Delete an activity"""
@@ -157,80 +266,117 @@ def register(request):
     return render(request, 'registration/register.html', {'form': form})
 
 @login_required
+@user_data_condition
 def api_weekly_data(request):
-    """API endpoint for weekly emissions data"""
-    profile, created = UserProfile.objects.get_or_create(user=request.user)
-
-    weekly_data = []
-    for i in range(7):
-        target_date = date.today() - timedelta(days=i)
-        daily_total = profile.get_daily_emissions(target_date)
-        weekly_data.append({
-            'date': target_date.strftime('%Y-%m-%d'),
-            'day': target_date.strftime('%a'),
-            'emissions': round(daily_total, 2)
-        })
-
-    return JsonResponse({'data': weekly_data[::-1]})
+    """API endpoint for daily emissions over the last week (or ?days=N)"""
+    days = weekly_days(request)
+    end = date.today()
+    series = timeseries(request.user, end - timedelta(days=days - 1), end, 'day')
+    return weekly_data_response(series)
+
+def weekly_days(request, default=7):
+    """Read ?days= for the weekly data API, between 1 and 366"""
+    try:
+        return max(1, min(int(request.GET.get('days', default)), 366))
+    except ValueError:
+        return default
+
+def weekly_data_response(series):
+    weekly_data = [
+        {
+            'date': point['start'],
+            'day': date.fromisoformat(point['start']).strftime('%a'),
+            'emissions': round(point['total'], 2),
+        }
+        for point in series
+    ]
+
+    return JsonResponse({'data': weekly_data})
 
 @login_required
 def tips(request):
     """Sustainability tips based on user's highest emission categories"""
-    # Find user's top emission categories from last 30 days
-    thirty_days_ago = date.today() - timedelta(days=30)
-    top_categories = Activity.objects.filter(
-        user=request.user,
-        date__gte=thirty_days_ago
-    ).values('emission_factor__category').annotate(
-        total=Sum('quantity')
-    ).order_by('-total')[:3]
-
-    # Define tips for each category
-    tips_data = {
-        'transport': [
-            "Try walking or cycling for trips under 2km",
-            "Use public transport instead of driving alone",
-            "Consider carpooling for longer journeys",
-            "Work from home when possible to reduce commuting",
-        ],
-        'energy': [
-            "Switch to LED light bulbs",
-            "Unplug electronics when not in use",
-            "Set your thermostat 1-2 degrees lower in winter",
-            "Use energy-efficient appliances",
-        ],
-        'food': [
-            "Try 'Meatless Monday' or reduce meat consumption",
-            "Buy local and seasonal produce",
-            "Reduce food waste by meal planning",
-            "Choose organic options when possible",
-        ],
-        'digital': [
-            "Stream videos in lower quality when possible",
-            "Reduce email subscriptions and delete unused accounts",
-            "Use cloud storage efficiently",
-            "Choose dark mode to save device energy",
-        ]
-    }
+    # Tip edits change the page too, so the tips stamp is part of the name
+    name = f'tips:{versioning.get_version(recommendations.VERSION_KEY)}'
+    context = cached_context(request.user, name, lambda: _tips_context(request.user))
+    return render(request, 'tracker/tips.html', context)
 
-    personalized_tips = []
-    for cat_data in top_categories:
-        category = cat_data['emission_factor__category']
-        if category in tips_data:
-            personalized_tips.extend(tips_data[category])
-
-    # Add general tips if no specific categories found
-    if not personalized_tips:
-        personalized_tips = [
-            "Start tracking your daily activities to identify improvement areas",
-            "Set a daily CO₂ goal and try to stay under it",
-            "Make one small sustainable change each week",
-            "Share your progress with friends to stay motivated",
-        ]
-
-    context = {
-        'tips': personalized_tips[:8],  # Show max 8 tips
-        'top_categories': [cat['emission_factor__category'].title() for cat in top_categories]
+def _tips_context(user):
+    result = recommendations.recommendations(user)
+    return {
+        'tips': result['tips'],
+        'top_categories': [item['category'].title() for item in result['top_categories']],
+        'category_totals': result['top_categories'],
+        'swaps': result['swaps'],
     }
 
-    return render(request, 'tracker/tips.html', context)
+@login_required
+def goals(request):
+    """Streaks, this month's goal-hit ratio, badges and the last weeks' goal days"""
+    context = cached_context(request.user, 'goals', lambda: _goals_context(request.user))
+    return render(request, 'tracker/goals.html', context)
+
+def _goals_context(user):
+    today = date.today()
+    # Whole weeks, Monday first, ending with the current one
+    start = today - timedelta(days=today.weekday() + 7 * (GOAL_CALENDAR_WEEKS - 1))
+    logged = {item['date']: item for item in goal_history(user, start, today)['days']}
+    calendar = []
+    for week in range(GOAL_CALENDAR_WEEKS):
+        days = []
+        for offset in range(7):
+            day = start + timedelta(days=week * 7 + offset)
+            item = logged.get(day.isoformat())
+            days.append({
+                'date': day,
+                'state': 'future' if day > today else 'empty' if item is None else 'hit' if item['hit'] else 'miss',
+                'total': item['total'] if item else None,
+            })
+        calendar.append(days)
+    return {'status': goal_status(user, today), 'calendar': calendar}
+
+@login_required
+def leaderboard(request):
+    """Where the user ranks this week or month, overall or in their location"""
+    period = request.GET.get('period', 'week')
+    scope = request.GET.get('scope', 'all')
+    if period not in LEADERBOARD_PERIODS:
+        period = 'week'
+    if scope != 'location':
+        scope = 'all'
+    board = build_leaderboard(request.user, period, scope)
+    return render(request, 'tracker/leaderboard.html', {
+        'board': board,
+        'periods': LEADERBOARD_PERIODS,
+        'refreshed_at': parse_datetime(board['refreshed_at']) if board['refreshed_at'] else None,
+    })
+
+@login_required
+def projections(request):
+    """Rolling averages, year-end projection and a what-if factor swap"""
+    form = ScenarioForm(request.GET or None, region=region_for(request.user))
+    swaps = form.swaps() if form.is_valid() else []
+    result = build_projection(request.user, swaps)
+    return render(request, 'tracker/projections.html', {
+        'form': form,
+        'annual': result['annual'],
+        'scenario': result['scenario'],
+        'series': result['series'],
+    })
+
+@staff_member_required
+def perf_stats(request):
+    """Per-view request costs recorded by tracker.perf (staff only)"""
+    try:
+        limit = max(0, min(int(request.GET.get('recent', 20)), perf.BUFFER_SIZE))
+    except ValueError:
+        limit = 20
+    entries = perf.recent()
+
+    return JsonResponse({
+        'enabled': settings.GREENSTEPS_PERF,
+        'query_budget': settings.GREENSTEPS_PERF_QUERY_BUDGET,
+        'buffered': len(entries),
+        'views': perf.summarize(entries),
+        'recent': entries[-limit:] if limit else [],
+    })